@@ -0,0 +1,5 @@
+"""Benchmarks for the scoring hot paths.
+
+Seeded synthetic scenarios over recorded Directions/OpenWeatherMap fixtures;
+see ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+
+from .scenarios import FIXTURE_DIR, FORECAST_LOCATION, TRIPS
+from .suite import compare, run
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def record():
+    """Re-record the fixtures from the configured Directions and forecast endpoints"""
+    from engine import APIService, Config
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    http = APIService.http()
+    for trip, (origin, destination) in TRIPS.items():
+        response = http.get(Config.DIRECTIONS_URL, endpoint="directions", params={
+            "origin": origin, "destination": destination, "alternatives": "true",
+            "key": Config.GOOGLE_MAPS_API_KEY
+        })
+        with open(os.path.join(FIXTURE_DIR, f"directions_{trip}.json"), "w") as f:
+            json.dump(response.json(), f)
+    response = http.get(Config.WEATHER_URL, endpoint="forecast", params={
+        "lat": FORECAST_LOCATION[0], "lon": FORECAST_LOCATION[1],
+        "appid": Config.OPENWEATHERMAP_API_KEY, "units": "metric"
+    })
+    with open(os.path.join(FIXTURE_DIR, "forecast.json"), "w") as f:
+        json.dump(response.json(), f)
+
+
+def print_comparison(baseline, current, threshold):
+    rows = compare(baseline, current, threshold)
+    print(f"{'case':<48} {'base p50':>10} {'p50':>10} {'ratio':>7}")
+    for name, before, after, ratio, status in rows:
+        print(f"{name:<48} {before:>8.3f}ms {after:>8.3f}ms {ratio:>6.2f}x {status}")
+    return any(status == "slower" for *_, status in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the scoring hot paths")
+    commands = parser.add_subparsers(dest="command")
+
+    run_parser = commands.add_parser("run", help="run the suite (default)")
+    run_parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this")
+    run_parser.add_argument("--min-time", type=float, default=1.0, help="seconds per case")
+    run_parser.add_argument("--out", help="results file (default: benchmarks/results/<commit>-<time>.json)")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier results file")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as a regression")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    commands.add_parser("record", help="re-record the fixtures (honours DIRECTIONS_URL and WEATHER_URL)")
+
+    args = parser.parse_args(sys.argv[1:] or ["run"])
+    if args.command == "record":
+        record()
+        sys.exit(0)
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        sys.exit(1 if print_comparison(baseline, current, args.threshold) else 0)
+
+    document = run(args.pattern, args.min_time)
+    out = args.out
+    if not out:
+        env = document["environment"]
+        stamp = env["timestamp"].replace(":", "").replace("-", "")
+        out = os.path.join(RESULTS_DIR, f"{env['commit'] or 'local'}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(1 if print_comparison(baseline, document, args.threshold) else 0)
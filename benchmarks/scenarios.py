@@ -0,0 +1,111 @@
+import json
+import os
+import random
+
+import numpy as np
+
+from engine import APIService, Config, DataProcessor, DistanceEngine, Polyline
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Recorded trips: fixture name -> (origin, destination)
+TRIPS = {
+    "short": ("San Jose, CA", "Santa Cruz, CA"),
+    "long": ("San Diego, CA", "Sacramento, CA")
+}
+
+# Forecast fixture position (Sacramento)
+FORECAST_LOCATION = (38.5816, -121.4944)
+
+# Hazard fields: "route" is the app's default clusters around the trip,
+# "statewide" spreads STATEWIDE_ZONES zones per hazard type over California
+CALIFORNIA_BBOX = (32.5, -124.4, 42.0, -114.1)
+STATEWIDE_ZONES = 20000
+FIELDS = ("route", "statewide")
+
+# Route alternatives per scenario; beyond the recorded ones, alternatives
+# are seeded detours of them
+ALTERNATIVES = (3, 10, 50)
+
+# Points per turn-by-turn step of a synthetic alternative
+STEP_POINTS = 20
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def detour(route, rng):
+    """A Directions-shaped copy of route bowed sideways by up to 0.3 degrees"""
+    path = Polyline.route_path(route)
+    t = np.linspace(0, 1, len(path))
+    bow = rng.uniform(-0.3, 0.3) * np.sin(np.pi * t * rng.integers(1, 4))
+    path = path + np.column_stack((bow, -bow))
+
+    leg = route["legs"][0]
+    stretch = 1 + rng.uniform(0, 0.3)
+    steps = []
+    for first in range(0, len(path) - 1, STEP_POINTS):
+        part = path[first:first + STEP_POINTS + 1]
+        steps.append({
+            "start_location": {"lat": float(part[0, 0]), "lng": float(part[0, 1])},
+            "end_location": {"lat": float(part[-1, 0]), "lng": float(part[-1, 1])},
+            "html_instructions": "Continue",
+            "distance": {"text": "", "value": 0},
+            "duration": {"text": "", "value": 0},
+            "polyline": {"points": Polyline.encode(part)}
+        })
+    return {
+        "summary": f"Detour of {route.get('summary', 'route')}",
+        "overview_polyline": {"points": Polyline.encode(path)},
+        "legs": [dict(leg,
+                      distance=dict(leg["distance"], value=int(leg["distance"]["value"] * stretch)),
+                      duration=dict(leg["duration"], value=int(leg["duration"]["value"] * stretch)),
+                      steps=steps)]
+    }
+
+
+def alternatives(routes, count, seed=0):
+    """count routes: the recorded ones first, then seeded detours of them"""
+    rng = np.random.default_rng(seed)
+    result = list(routes[:count])
+    while len(result) < count:
+        result.append(detour(routes[len(result) % len(routes)], rng))
+    return result
+
+
+def hazard_fields(field, start_lat, start_lon, end_lat, end_lon, seed=0):
+    """Snow, fire and rain zones for a field kind, scaled by the default 0.5 factors"""
+    if field == "route":
+        zones = DataProcessor.generate_zone_fields(start_lat, start_lon, end_lat, end_lon, seed=seed)
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(3)
+        zones = [DataProcessor.generate_hazard_field(CALIFORNIA_BBOX,
+                                                     dict(Config.HAZARD_SPECS[kind], points=STATEWIDE_ZONES),
+                                                     kind_seed)
+                 for kind, kind_seed in zip(("snow", "fire", "rain"), seeds)]
+    return tuple(DataProcessor.apply_intensity_factor(zones_of_kind, 0.5) for zones_of_kind in zones)
+
+
+# Seeded benchmark input
+class Scenario:
+    """Everything one scoring pass needs: routes, forecast, traffic, zones and their index.
+
+    The same (trip, field, routes, seed) always builds the same scenario.
+    """
+    def __init__(self, trip="long", field="route", n_routes=3, seed=0):
+        self.name = f"{trip},{field},{n_routes}"
+        random.seed(seed)
+        self.routes = alternatives(load_fixture(f"directions_{trip}")["routes"], n_routes, seed)
+        leg = self.routes[0]["legs"][0]
+        self.start = (leg["start_location"]["lat"], leg["start_location"]["lng"])
+        self.end = (leg["end_location"]["lat"], leg["end_location"]["lng"])
+
+        self.weather_data = APIService.parse_forecast(load_fixture("forecast"))
+        self.traffic_data = APIService.get_traffic_data(
+            DistanceEngine.route_points(self.routes[0], Config.TRAFFIC_SAMPLE_SPACING_KM).tolist())
+        self.snow_zones, self.fire_zones, self.rain_zones = hazard_fields(field, *self.start, *self.end, seed=seed)
+        self.zones = (self.snow_zones, self.fire_zones, self.rain_zones)
+        self.hazard_index = DataProcessor.build_hazard_index(*self.zones)
+        self.factors = (0.5, 0.5, 0.5)
@@ -0,0 +1,158 @@
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from engine import (Config, DataProcessor, DeparturePlanner, HazardScoreCache, HazardSimulation, Polyline,
+                    SafetyRaster, generate_exit_analytics)
+
+from .scenarios import ALTERNATIVES, CALIFORNIA_BBOX, FIELDS, TRIPS, Scenario, hazard_fields
+
+
+def cases():
+    """Yield (name, setup) pairs; setup() builds the inputs and returns the callable to time"""
+    for field in FIELDS:
+        yield f"generate_zones[{field}]", lambda field=field: (
+            lambda: hazard_fields(field, 32.7157, -117.1611, 38.5816, -121.4944))
+
+    for trip in TRIPS:
+        for field in FIELDS:
+            for n_routes in ALTERNATIVES:
+                def setup(trip=trip, field=field, n_routes=n_routes):
+                    s = Scenario(trip, field, n_routes)
+                    return lambda: DataProcessor.select_best_route(s.routes, *s.zones, *s.factors, s.hazard_index)
+                yield f"select_best_route[{trip},{field},{n_routes}]", setup
+
+    for field in FIELDS:
+        def route_order(field=field):
+            s = Scenario("long", field, max(ALTERNATIVES))
+            cache = HazardScoreCache(*s.zones, s.hazard_index)
+            cache.cache_routes(s.routes)
+            return lambda: cache.route_order(*s.factors)
+        yield f"route_order[long,{field},{max(ALTERNATIVES)}]", route_order
+
+        def safe_exits(field=field):
+            s = Scenario("long", field)
+            return lambda: DataProcessor.suggest_safe_exits(*s.start, s.weather_data, s.traffic_data,
+                                                            *s.zones, *s.factors, s.hazard_index)
+        yield f"suggest_safe_exits[{field}]", safe_exits
+
+        def risk(field=field):
+            s = Scenario("long", field)
+            return lambda: DataProcessor.calculate_emergency_risk(s.weather_data, s.traffic_data,
+                                                                  *s.zones, *s.factors)
+        yield f"calculate_emergency_risk[{field}]", risk
+
+        def analytics(field=field):
+            s = Scenario("long", field)
+            exit_point = DataProcessor.suggest_safe_exits(*s.start, s.weather_data, s.traffic_data,
+                                                          *s.zones, *s.factors, s.hazard_index)[0]
+            return lambda: generate_exit_analytics(exit_point, *s.zones, *s.factors, s.hazard_index, s.weather_data)
+        yield f"generate_exit_analytics[{field}]", analytics
+
+        def simulation(field=field):
+            s = Scenario("long", field)
+            bbox = CALIFORNIA_BBOX if field == "statewide" else DataProcessor.route_bbox(*s.start, *s.end)
+            return lambda: HazardSimulation(bbox, *s.zones, s.weather_data,
+                                            start_time=s.weather_data[0]["timestamp"]).run()
+        yield f"hazard_simulation[{field}]", simulation
+
+    for n_routes in ALTERNATIVES:
+        def departures(n_routes=n_routes):
+            s = Scenario("long", "route", n_routes)
+            return lambda: DeparturePlanner(s.routes, *s.zones, s.weather_data,
+                                            start_time=s.weather_data[0]["timestamp"]).plan(*s.factors, top_k=10)
+        yield f"plan_departures[long,route,{n_routes}]", departures
+
+
+    for field in FIELDS:
+        def raster(field=field):
+            """Scenario and a safety raster of its region, built in a directory that lives as long as it does"""
+            s = Scenario("long", field)
+            s.raster_dir = tempfile.TemporaryDirectory(prefix="ers-tiles-")
+            s.raster = SafetyRaster(DataProcessor.route_bbox(*s.start, *s.end, Config.TILE_MARGIN_DEG),
+                                    directory=s.raster_dir.name)
+            s.raster.update(*s.zones)
+            return s
+
+        def raster_exits(raster=raster):
+            s = raster()
+            candidates = DataProcessor.exit_candidates(*s.start)
+            return lambda: s.raster.exit_impacts(candidates["lat"], candidates["lon"], *s.factors)
+        yield f"safety_raster_exits[{field}]", raster_exits
+
+        def raster_path(raster=raster):
+            s = raster()
+            path = Polyline.route_path(s.routes[0])
+            return lambda: s.raster.path_risk(path, *s.factors)
+        yield f"safety_raster_path[{field}]", raster_path
+
+
+def measure(fn, min_time=1.0, min_iterations=5, max_iterations=10000):
+    """Time repeated calls of fn after one warm-up call; returns ops/sec and latency percentiles (ms)"""
+    fn()
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_iterations and (len(timings) < min_iterations or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings) * 1000
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": 1000 * len(timings) / timings.sum(),
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "min_ms": float(timings.min())
+    }
+
+
+def environment():
+    """Where and on what code the results were taken"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform()
+    }
+
+
+def run(pattern=None, min_time=1.0, log=sys.stderr):
+    """Run every case whose name contains pattern; returns the results document"""
+    results = {}
+    for name, setup in cases():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(setup(), min_time)
+        print(f"{name:<48} {results[name]['ops_per_sec']:>10.1f} ops/s  "
+              f"p50 {results[name]['p50_ms']:>9.3f} ms  p99 {results[name]['p99_ms']:>9.3f} ms", file=log)
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline, current, threshold=0.10):
+    """Rows of (name, baseline p50, current p50, ratio, status) for cases in both documents
+
+    A case regresses when its p50 grows by more than threshold (a fraction).
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before, after = baseline["results"][name]["p50_ms"], result["p50_ms"]
+        ratio = after / before if before else float("inf")
+        status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        rows.append((name, before, after, ratio, status))
+    return rows
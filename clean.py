@@ -1,22 +1,28 @@
+import argparse
+import io
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
 
 # Database connection details
 db_user = "postgres"
 db_password = "ashwin999"
 db_host = "localhost:5432"
 db_name = "postgres"
-db_schema = "insight_data" 
+db_schema = "insight_data"
 
-# Create a connection to PostgreSQL
-engine = create_engine(f"postgresql://{db_user}:{db_password}@{db_host}/{db_name}")
+DEFAULT_TARGET = f"postgresql://{db_user}:{db_password}@{db_host}/{db_name}"
+DEFAULT_CSV = "climate-data-cali.csv"
+TABLE_NAME = "climate_data"
 
-# Load the CSV file
-csv_file = "climate-data-cali.csv"
-df = pd.read_csv(csv_file)
+# Rows per chunk; peak memory depends on this, not on the file size
+CHUNK_SIZE = 50_000
 
-# Ensure column names match your table schema
-df.rename(columns={
+# CSV columns renamed to match the table schema
+COLUMN_RENAMES = {
     "STATION": "station_id",
     "DATE": "date",
     "DLY-CLDD-BASE40": "cooling_degree_days",
@@ -25,32 +31,276 @@ df.rename(columns={
     "DLY-PRCP-80PCTL": "precip_80th_percentile",
     "DLY-TMAX-NORMAL": "temp_max_normal",
     "DLY-TMIN-NORMAL": "temp_min_normal"
-}, inplace=True)
+}
+
+# Declarative schema of the NOAA normals CSV: dtype of each source column.
+# Station ids and MM-DD dates repeat on every row, so they are categorical;
+# normals (DLY-/MTD-/YTD-*) and calendar parts are float32, which keeps
+# missing values as NaN (nullable integer columns parse several times slower).
+KEY_DTYPES = {"STATION": "category", "DATE": "category"}
+CALENDAR_COLUMNS = ("day", "hour", "month")
+NORMALS_PREFIXES = ("DLY-", "MTD-", "YTD-")
+NUMERIC_DTYPE = "float32"
+
+# Normals are keyed by MM-DD; a fixed year turns them into dates
+DATE_YEAR = "2023"
+
+
+def schema_dtypes(columns):
+    """Source column -> dtype for every column of the CSV header"""
+    dtypes = {}
+    for col in columns:
+        if col in KEY_DTYPES:
+            dtypes[col] = KEY_DTYPES[col]
+        elif col in CALENDAR_COLUMNS or col.startswith(NORMALS_PREFIXES):
+            dtypes[col] = NUMERIC_DTYPE
+    return dtypes
+
+
+def read_chunks(csv_file, chunk_size=CHUNK_SIZE):
+    """Stream the CSV as DataFrames of at most chunk_size rows, typed by the schema
+
+    Values are parsed straight into their schema dtypes by the C parser. If a
+    column holds something non-numeric, the rest of the file is read untyped
+    and clean_chunk coerces it instead.
+    """
+    header = pd.read_csv(csv_file, nrows=0).columns
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_file, chunksize=chunk_size, dtype=schema_dtypes(header)):
+            rows += len(chunk)
+            yield chunk
+        return
+    except (ValueError, TypeError):
+        pass
+    yield from pd.read_csv(csv_file, chunksize=chunk_size, dtype=KEY_DTYPES, skiprows=range(1, rows + 1))
+
+
+def clean_chunk(chunk, carry):
+    """Rename, parse dates, coerce numbers and forward-fill one chunk per station
+
+    carry holds the last known value of every column per station from the
+    previous chunks (indexed by station_id) and is returned updated, so the
+    forward-fill continues across chunk boundaries without leaking values
+    from one station into the next.
+    """
+    df = chunk.rename(columns=COLUMN_RENAMES)
+    value_columns = [col for col in df.columns if col not in ["station_id", "date"]]
+    stations = df["station_id"].astype("category")
+
+    # Dates repeat on every station, so parse each distinct MM-DD once
+    dates = df["date"].astype("category")
+    parsed = pd.to_datetime(DATE_YEAR + "-" + dates.cat.categories.astype(str), format="%Y-%m-%d",
+                            errors="coerce").to_numpy()
+    codes = dates.cat.codes.to_numpy()
+    date_values = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.datetime64("NaT"))
+
+    # One float32 block; only a failed typed parse needs per-column coercion
+    block = df[value_columns]
+    if any(dtype != NUMERIC_DTYPE for dtype in block.dtypes):
+        block = block.apply(pd.to_numeric, errors="coerce")
+    values = block.to_numpy(dtype=NUMERIC_DTYPE)
+
+    # Forward-fill within each station; whatever is still missing is a
+    # station's leading gap and takes its values from the previous chunks
+    station_codes = stations.cat.codes.to_numpy()
+    filled = pd.DataFrame(values, copy=False).groupby(station_codes, sort=False).ffill().to_numpy(
+        dtype=NUMERIC_DTYPE, copy=False)
+    names = stations.cat.categories.astype(str)
+    if carry is not None and len(carry):
+        previous = carry.reindex(names)[value_columns].to_numpy(dtype=NUMERIC_DTYPE)
+        filled = np.where(np.isnan(filled), previous[station_codes], filled)
+
+    cleaned = pd.DataFrame(filled, columns=value_columns, index=df.index, copy=False)
+    cleaned.insert(0, "station_id", stations)
+    cleaned.insert(1, "date", date_values)
+    if list(cleaned.columns) != list(df.columns):
+        cleaned = cleaned[list(df.columns)]
+
+    # Last row of each station in this chunk becomes its carry
+    present, from_end = np.unique(station_codes[::-1], return_index=True)
+    last = pd.DataFrame(filled[len(station_codes) - 1 - from_end], columns=value_columns, index=names[present])
+    carry = last if carry is None else pd.concat([carry.drop(last.index, errors="ignore"), last])
+    return cleaned, carry
+
+
+def legacy_clean(csv_file, per_station=False):
+    """The original whole-file cleaning, kept as the benchmark baseline
+
+    per_station groups the forward-fill by station like clean_chunk does,
+    for a like-for-like comparison.
+    """
+    df = pd.read_csv(csv_file)
+    df.rename(columns=COLUMN_RENAMES, inplace=True)
+    df["date"] = pd.to_datetime(DATE_YEAR + "-" + df["date"], format="%Y-%m-%d", errors="coerce")
+    if per_station:
+        value_columns = [col for col in df.columns if col not in ["station_id", "date"]]
+        df[value_columns] = df.groupby("station_id", sort=False)[value_columns].ffill()
+    else:
+        df = df.ffill()
+    for col in df.columns:
+        if col not in ["station_id", "date"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def benchmark(csv_file=DEFAULT_CSV, repeats=5):
+    """Time and size the legacy whole-file cleaning against the typed chunked path"""
+    def best_of(fn):
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    def chunked():
+        carry = None
+        frames = []
+        for chunk in read_chunks(csv_file):
+            df, carry = clean_chunk(chunk, carry)
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    results = {}
+    for name, fn in (("legacy", lambda: legacy_clean(csv_file)),
+                     ("legacy per station", lambda: legacy_clean(csv_file, per_station=True)),
+                     ("typed", chunked)):
+        seconds, df = best_of(fn)
+        results[name] = {"seconds": seconds, "bytes": int(df.memory_usage(deep=True).sum())}
+    return results
+
+
+# Bulk-load targets: create(df) makes the table from a chunk's columns,
+# write(df) appends a chunk, close() commits
+class PostgresTarget:
+    """PostgreSQL via COPY FROM STDIN, one CSV buffer per chunk"""
+    def __init__(self, url, schema=db_schema, table=TABLE_NAME):
+        from sqlalchemy import create_engine
+
+        self.engine = create_engine(url)
+        self.schema = schema
+        self.table = table
+        self.connection = self.engine.raw_connection()
+
+    def create(self, df):
+        df.head(0).to_sql(self.table, self.engine, schema=self.schema, if_exists="append", index=False)
+
+    def write(self, df):
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY "{self.schema}"."{self.table}" ({columns}) FROM STDIN WITH (FORMAT csv)',
+                               buffer)
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+class SQLiteTarget:
+    """Local SQLite file; each chunk is one executemany in a single transaction"""
+    def __init__(self, path, table=TABLE_NAME):
+        self.connection = sqlite3.connect(path)
+        self.table = table
+
+    def create(self, df):
+        df.head(0).to_sql(self.table, self.connection, if_exists="append", index=False)
+
+    def write(self, df):
+        rows = df.assign(date=df["date"].dt.strftime("%Y-%m-%d")).astype(object)
+        rows = rows.where(rows.notna(), None)
+        placeholders = ", ".join("?" * len(df.columns))
+        self.connection.executemany(f'INSERT INTO "{self.table}" VALUES ({placeholders})',
+                                    rows.itertuples(index=False, name=None))
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+class DuckDBTarget:
+    """Local DuckDB file, inserting each chunk straight from the DataFrame"""
+    def __init__(self, path, table=TABLE_NAME):
+        import duckdb
+
+        self.connection = duckdb.connect(path)
+        self.table = table
+
+    def create(self, df):
+        self.connection.register("chunk", df.head(0))
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" AS SELECT * FROM chunk')
+        self.connection.unregister("chunk")
+
+    def write(self, df):
+        self.connection.register("chunk", df)
+        self.connection.execute(f'INSERT INTO "{self.table}" SELECT * FROM chunk')
+        self.connection.unregister("chunk")
+
+    def close(self):
+        self.connection.close()
 
-# Fix date column (assuming MM-DD format, adding a default year)
-df["date"] = "2023-" + df["date"]  # Add year manually
-df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")  # Ensure correct conversion
 
-# Check for invalid date values
-if df["date"].isnull().sum() > 0:
-    print("Warning: Some date values could not be parsed!")
+def open_target(url, schema=db_schema, table=TABLE_NAME):
+    """Target for a postgresql://, sqlite:///path or duckdb:///path URL"""
+    scheme = urlsplit(url).scheme
+    if scheme.startswith("postgresql"):
+        return PostgresTarget(url, schema, table)
+    # Local targets follow the SQLAlchemy convention: scheme:///relative or scheme:////absolute
+    path = url.split(":///", 1)[1] if ":///" in url else ""
+    if scheme == "sqlite":
+        return SQLiteTarget(path, table)
+    if scheme == "duckdb":
+        return DuckDBTarget(path, table)
+    raise ValueError(f"Unsupported target: {url}")
 
-# Fill missing values (forward fill for continuity)
-df.fillna(method="ffill", inplace=True)
 
-# Convert numerical columns to correct data type
-for col in df.columns:
-    if col not in ["station_id", "date"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+def load(csv_file=DEFAULT_CSV, target_url=DEFAULT_TARGET, schema=db_schema, table=TABLE_NAME,
+         chunk_size=CHUNK_SIZE):
+    """Stream csv_file into the target chunk by chunk; returns (rows, unparsed dates)"""
+    target = open_target(target_url, schema, table)
+    carry = None
+    rows = 0
+    bad_dates = 0
+    try:
+        for chunk in read_chunks(csv_file, chunk_size):
+            df, carry = clean_chunk(chunk, carry)
+            bad_dates += int(df["date"].isnull().sum())
+            if rows == 0:
+                target.create(df)
+            target.write(df)
+            rows += len(df)
+    finally:
+        target.close()
+    return rows, bad_dates
 
-# Upload cleaned data to PostgreSQL
-# print("First 5 rows of the dataset:")
-# print(df.head())
 
-# print(f"Total rows loaded: {len(df)}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the climate normals CSV into a database")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="NOAA normals CSV")
+    parser.add_argument("--target", default=DEFAULT_TARGET,
+                        help="postgresql://..., sqlite:///path.db or duckdb:///path.duckdb")
+    parser.add_argument("--schema", default=db_schema, help="PostgreSQL schema")
+    parser.add_argument("--table", default=TABLE_NAME)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare against the legacy whole-file cleaning instead of loading")
+    args = parser.parse_args()
 
-df.to_sql("climate_data", engine, schema=db_schema, if_exists="append", index=False, method="multi")
+    if args.benchmark:
+        results = benchmark(args.csv)
+        typed = results["typed"]
+        for name, result in results.items():
+            print(f"{name:>18}: {result['seconds'] * 1000:8.1f} ms  {result['bytes'] / 1e6:7.2f} MB  "
+                  f"time x{typed['seconds'] / result['seconds']:.2f}, memory x{typed['bytes'] / result['bytes']:.2f}")
+        raise SystemExit
 
-# df.to_sql("climate_data", engine, if_exists="append", index=False)
+    started = time.perf_counter()
+    rows, bad_dates = load(args.csv, args.target, args.schema, args.table, args.chunk_size)
 
-print("Data cleaned and uploaded successfully!")
+    # Check for invalid date values
+    if bad_dates:
+        print("Warning: Some date values could not be parsed!")
+    print(f"Data cleaned and uploaded successfully! ({rows} rows in {time.perf_counter() - started:.1f}s)")
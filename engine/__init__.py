@@ -0,0 +1,23 @@
+"""Routing and hazard scoring engine, importable without the Streamlit UI.
+
+The engine depends only on NumPy and the standard library at import time;
+requests (HTTP) and pandas (ZoneSet.to_frame) load on first use. Check the
+cold import cost with ``python -m engine.importtime``.
+"""
+from .api import APIService
+from .cache import ResponseCache
+from .config import Config
+from .departures import DeparturePlanner
+from .evolution import HazardSimulation
+from .geo import DistanceEngine, Geohash, Polyline
+from .lod import MapDetail
+from .processing import DataProcessor, HazardScoreCache, generate_exit_analytics
+from .spatial import HazardIndex, RouteExposure
+from .tiles import SafetyRaster
+from .zones import ZoneSet
+
+__all__ = [
+    "APIService", "Config", "DataProcessor", "DeparturePlanner", "DistanceEngine", "Geohash", "HazardIndex",
+    "HazardScoreCache", "HazardSimulation", "MapDetail", "Polyline", "ResponseCache", "RouteExposure",
+    "SafetyRaster", "ZoneSet", "generate_exit_analytics"
+]
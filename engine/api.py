@@ -0,0 +1,275 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .cache import ResponseCache, shared_resource
+from .config import Config
+from .geo import DistanceEngine, Geohash
+
+# API Service class for all external API calls
+class APIService:
+    """External API calls. Failures are returned as values, never shown:
+    the caller (UI, routing service, benchmark) decides how to report them.
+
+    Shared resources are created once per process, so they are shared across
+    Streamlit sessions and reruns as well as across service requests.
+    """
+    @staticmethod
+    @shared_resource
+    def directions_cache():
+        """Directions response cache shared across sessions and reruns"""
+        return ResponseCache(os.path.join(Config.CACHE_DIR, "directions.sqlite"),
+                             ttl_seconds=Config.DIRECTIONS_CACHE_TTL,
+                             max_entries=Config.DIRECTIONS_CACHE_MEMORY_ENTRIES,
+                             max_disk_entries=Config.DIRECTIONS_CACHE_DISK_ENTRIES)
+    
+    @staticmethod
+    @shared_resource
+    def weather_cache():
+        """Forecast cache keyed by geohash cell, shared across sessions and reruns"""
+        return ResponseCache(os.path.join(Config.CACHE_DIR, "weather.sqlite"),
+                             max_entries=Config.WEATHER_CACHE_MEMORY_ENTRIES,
+                             max_disk_entries=Config.WEATHER_CACHE_DISK_ENTRIES)
+    
+    @staticmethod
+    def get_directions(start, end, alternatives=True):
+        """Get directions from Google Maps API; returns (directions, error message or None)"""
+        try:
+            # Serve repeated origin/destination pairs from the cache
+            cache = APIService.directions_cache()
+            key = ResponseCache.make_key("directions", start, end, bool(alternatives))
+            directions = cache.get(key)
+            if directions is not None:
+                return directions, None
+            
+            # Send the GET request to the Directions API
+            response = APIService.http().get(Config.DIRECTIONS_URL, endpoint="directions", params={
+                "origin": start,
+                "destination": end,
+                "alternatives": str(alternatives).lower(),
+                "departure_time": "now",
+                "traffic_model": "best_guess",
+                "key": Config.GOOGLE_MAPS_API_KEY
+            })
+            
+            # Parse the JSON response
+            directions = response.json()
+
+            # Check if the request was successful
+            if directions["status"] == "OK":
+                cache.set(key, directions)
+                return directions, None
+            else:
+                return None, f"Error fetching directions: {directions['status']}"
+        except Exception as e:
+            return None, f"Failed to get directions: {str(e)}"
+    
+    @staticmethod
+    @shared_resource
+    def http():
+        """Pooled HTTP client shared by every outbound call"""
+        # requests is imported on first use, keeping it out of the engine import
+        from .http import HTTPClient
+        
+        return HTTPClient(pool_size=Config.HTTP_POOL_SIZE,
+                          max_per_host=Config.HTTP_MAX_PER_HOST,
+                          max_retries=Config.HTTP_MAX_RETRIES,
+                          budgets=Config.HTTP_BUDGETS)
+    
+    @staticmethod
+    @shared_resource
+    def executor():
+        """Thread pool for concurrent API calls, shared across sessions and reruns"""
+        return ThreadPoolExecutor(max_workers=Config.API_MAX_WORKERS, thread_name_prefix="api")
+    
+    @staticmethod
+    def fetch_route_bundle(start, end, zone_generator=None, max_routes=3):
+        """Fetch routes, then everything that depends on them concurrently
+
+        Once directions arrive, the start-point forecast, forecasts at
+        Config.WEATHER_SAMPLES_PER_ROUTE points along every route, traffic and
+        (optionally) zone_generator(start_lat, start_lon, end_lat, end_lon)
+        all run on the shared pool, so latency is bounded by the slowest call.
+        Failures are collected in "errors" for the caller to report; when no
+        routes were found, "routes" is empty and nothing else is fetched.
+        """
+        directions, error = APIService.get_directions(start, end, alternatives=True)
+        if not directions or not directions.get("routes"):
+            return {"routes": [], "weather_data": [], "route_weather": [], "traffic_data": [],
+                    "zones": None, "errors": [error or "No routes found"]}
+        
+        routes = directions["routes"][:max_routes]
+        leg = routes[0]["legs"][0]
+        start_lat, start_lon = leg["start_location"]["lat"], leg["start_location"]["lng"]
+        end_lat, end_lon = leg["end_location"]["lat"], leg["end_location"]["lng"]
+        
+        executor = APIService.executor()
+        weather_future = executor.submit(APIService._cached_forecast, start_lat, start_lon)
+        sample_futures = [
+            [(lat, lon, executor.submit(APIService._cached_forecast, lat, lon))
+             for lat, lon in APIService.route_sample_points(route, Config.WEATHER_SAMPLES_PER_ROUTE)]
+            for route in routes
+        ]
+        route_points = DistanceEngine.route_points(routes[0], Config.TRAFFIC_SAMPLE_SPACING_KM).tolist()
+        traffic_future = executor.submit(APIService.get_traffic_data, route_points)
+        zones_future = (executor.submit(zone_generator, start_lat, start_lon, end_lat, end_lon)
+                        if zone_generator else None)
+        
+        errors = []
+        
+        def result(future, default):
+            try:
+                return future.result()
+            except Exception as e:
+                if str(e) not in errors:
+                    errors.append(str(e))
+                return default
+        
+        return {
+            "routes": routes,
+            "weather_data": result(weather_future, []),
+            "route_weather": [
+                [{"lat": lat, "lon": lon, "forecast": result(future, [])} for lat, lon, future in samples]
+                for samples in sample_futures
+            ],
+            "traffic_data": result(traffic_future, []),
+            "zones": result(zones_future, None) if zones_future else None,
+            "errors": errors
+        }
+    
+    @staticmethod
+    def route_sample_points(route, count):
+        """Pick count points spread evenly along a route, start and end included"""
+        points = DistanceEngine.route_points(route)
+        positions = np.unique(np.linspace(0, len(points) - 1, count).round().astype(int))
+        return [(float(points[i, 0]), float(points[i, 1])) for i in positions]
+    
+    @staticmethod
+    def get_weather_data(lat, lon):
+        """Fetch weather data; returns (forecast, error message or None)"""
+        try:
+            return APIService._cached_forecast(lat, lon), None
+        except Exception as e:
+            return [], f"Failed to get weather data: {str(e)}"
+    
+    @staticmethod
+    def _cached_forecast(lat, lon):
+        """Forecast for a position via the geohash-cell cache; raises on failure"""
+        # Forecasts are cached per geohash cell and fetched for the cell
+        # centre, so nearby requests share one upstream call. Entries
+        # expire at the next forecast issuance.
+        cell = Geohash.encode(lat, lon, Config.WEATHER_CACHE_PRECISION)
+        cell_lat, cell_lon = Geohash.decode(cell)
+        
+        return APIService.weather_cache().get_or_fetch(
+            ResponseCache.make_key("forecast", cell),
+            lambda: APIService._fetch_forecast(cell_lat, cell_lon),
+            ttl_seconds=APIService.forecast_ttl
+        )
+    
+    @staticmethod
+    def forecast_ttl(forecast):
+        """Seconds until the issuance that supersedes a parsed forecast"""
+        # The first entry is the slot the forecast was issued for; the next
+        # issuance follows one interval later. The provider's schedule need
+        # not line up with the UTC clock, so the expiry is taken from the
+        # response rather than from the current time. A response already
+        # older than that expires at once.
+        issued = forecast[0].get("timestamp")
+        if issued is None:
+            return Config.WEATHER_ISSUE_INTERVAL
+        return max(issued + Config.WEATHER_ISSUE_INTERVAL - time.time(), 0)
+    
+    @staticmethod
+    def _fetch_forecast(lat, lon):
+        """Fetch and flatten the 5-day / 3-hour forecast for a position"""
+        response = APIService.http().get(Config.WEATHER_URL, endpoint="forecast", params={
+            "lat": lat,
+            "lon": lon,
+            "appid": Config.OPENWEATHERMAP_API_KEY,
+            "units": "metric"
+        })
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"Weather API error: {response.status_code}")
+            
+        return APIService.parse_forecast(response.json())
+    
+    @staticmethod
+    def parse_forecast(data):
+        """Flatten an OpenWeatherMap forecast response into hourly entries"""
+        hourly_data = []
+        
+        # Process the hourly weather data
+        for entry in data.get('list', []):
+            timestamp = entry.get('dt')
+            temperature = entry.get('main', {}).get('temp')
+            humidity = entry.get('main', {}).get('humidity')
+            rain = entry.get('rain', {}).get('3h', 0)  # Rain in the last 3 hours
+            snow = entry.get('snow', {}).get('3h', 0)  # Snow in the last 3 hours
+            wind_speed = entry.get('wind', {}).get('speed')  # m/s
+            wind_deg = entry.get('wind', {}).get('deg')  # direction the wind blows from
+            
+            hourly_data.append({
+                'timestamp': timestamp,
+                'temperature': temperature,
+                'humidity': humidity,
+                'rain': rain,
+                'snow': snow,
+                'wind_speed': wind_speed,
+                'wind_deg': wind_deg
+            })
+        
+        return hourly_data
+
+    @staticmethod
+    def get_traffic_data(route_points):
+        """Get traffic data for route points"""
+        # Simulated traffic data for demonstration
+        traffic_data = []
+        for i, (lat, lon) in enumerate(route_points):
+            severity = "High" if i % 3 == 0 else "Medium" if i % 3 == 1 else "Low"
+            traffic_data.append({
+                "lat": lat, 
+                "lon": lon, 
+                "severity": severity,
+                "name": f"Traffic Point {i+1}"
+            })
+        return traffic_data
+
+    @staticmethod
+    def get_nearby_cities_and_exits(lat, lon, radius_km=50):
+        """Get nearby cities and highway exits; returns (cities, exits, error message or None)"""
+        try:
+            # Simulate nearby cities
+            nearby_cities = []
+            for i in range(5):
+                city_lat = lat + ((-1)**i) * (i * 0.05)
+                city_lon = lon + ((-1)**(i+1)) * (i * 0.05)
+                distance = float(DistanceEngine.haversine(lat, lon, city_lat, city_lon))
+                
+                nearby_cities.append({
+                    "city": f"City {i+1}",
+                    "latitude": city_lat,
+                    "longitude": city_lon,
+                    "distance_km": distance
+                })
+            
+            # Simulate highway exits
+            highway_exits = []
+            for i in range(3):
+                exit_lat = lat + ((-1)**i) * (i * 0.03)
+                exit_lon = lon + ((-1)**(i+1)) * (i * 0.04)
+                
+                highway_exits.append({
+                    "exit_name": f"Exit {i+1}",
+                    "exit_lat": exit_lat,
+                    "exit_lon": exit_lon,
+                    "distance_km": float(DistanceEngine.haversine(lat, lon, exit_lat, exit_lon))
+                })
+            
+            return nearby_cities, highway_exits, None
+        except Exception as e:
+            return [], [], f"Failed to get nearby locations: {str(e)}"
@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def shared_resource(factory):
+    """Decorator for a zero-argument factory of a process-wide resource
+
+    Like lru_cache, but the first call builds the resource once even when
+    several threads make it at the same time (lru_cache would build one per
+    thread and hand them out, splitting pools, caches and coalescing).
+    cache_clear() drops it so the next call builds a new one.
+    """
+    lock = threading.Lock()
+    built = []
+
+    @functools.wraps(factory)
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+    get.cache_clear = built.clear
+    return get
+
+# Two-tier cache for API responses
+class ResponseCache:
+    """TTL + LRU response cache: an in-process tier in front of a SQLite tier.
+
+    The memory tier answers repeated requests within the process; the SQLite
+    tier survives Streamlit reruns and container restarts. Both tiers are
+    size-bounded and evict the least recently used entries first. Cached
+    values are shared between callers and must be treated as read-only.
+    """
+    def __init__(self, path=None, ttl_seconds=900, max_entries=256, max_disk_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                       "coalesced": 0}
+        self._inflight = {}  # key -> Future of the upstream call in progress
+        self._db = None
+        
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                             "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                             "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(*parts):
+        """Build a cache key from case-folded, whitespace-normalized parts"""
+        return "|".join(" ".join(str(part).split()).lower() for part in parts)
+    
+    @staticmethod
+    def content_key(*parts):
+        """Build a cache key from a hash of the parts' content
+
+        Parts may nest dicts, lists, tuples, scalars, NumPy arrays and
+        ZoneSets; equal content gives the same key across calls and processes.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        ResponseCache._hash_into(digest, parts)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _hash_into(digest, value):
+        if isinstance(value, dict):
+            digest.update(b"{%d" % len(value))
+            for key in sorted(value, key=str):
+                ResponseCache._hash_into(digest, key)
+                ResponseCache._hash_into(digest, value[key])
+        elif isinstance(value, (list, tuple)):
+            digest.update(b"[%d" % len(value))
+            for item in value:
+                ResponseCache._hash_into(digest, item)
+        elif isinstance(value, np.ndarray):
+            digest.update(f"<{value.dtype.str}{value.shape}".encode())
+            digest.update(np.ascontiguousarray(value).data)
+        elif hasattr(value, "effective_intensity"):
+            # ZoneSet: everything a rendering of the zones can depend on
+            ResponseCache._hash_into(digest, (value.label, value.lat, value.lon, value.intensity,
+                                              value.effective_intensity, value.effective_radius))
+        else:
+            digest.update(f"{type(value).__name__}:{value!r};".encode())
+    
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired"""
+        with self._lock:
+            return self._lookup(key)
+    
+    def _lookup(self, key):
+        """get() with the lock held"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+        
+        if self._db is not None:
+            row = self._db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                self._stats["disk_hits"] += 1
+                return value
+        
+        self._stats["misses"] += 1
+        return None
+    
+    def set(self, key, value, ttl_seconds=None):
+        """Store a JSON-serializable value in both tiers"""
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._stats["stores"] += 1
+            
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                 (key, json.dumps(value), expires_at, now))
+                # Drop expired rows, then the least recently used beyond the size bound
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                self._db.execute("DELETE FROM responses WHERE key IN ("
+                                 "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                                 (self.max_disk_entries,))
+                self._db.commit()
+    
+    def get_or_fetch(self, key, fetch, ttl_seconds=None):
+        """Return the cached value for key, calling fetch() once on a miss
+
+        Concurrent misses on the same key are coalesced: the first caller
+        runs fetch() and the others wait for its result (or its exception).
+        Falsy results are returned but not cached. ttl_seconds may be a
+        function of the fetched value, for entries whose lifetime depends
+        on their content.
+        """
+        # Looking the key up and becoming the leader under one lock means a
+        # caller arriving just after a leader stored its result finds it
+        # cached instead of fetching again
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self._stats["coalesced"] += 1
+        
+        if not is_leader:
+            return future.result()
+        
+        try:
+            value = fetch()
+            if value:
+                self.set(key, value, ttl_seconds(value) if callable(ttl_seconds) else ttl_seconds)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def stats(self):
+        """Hit/miss counters, tier sizes and the overall hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = (self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                                     if self._db is not None else 0)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        """Empty both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+# Source normals and the directory the columnar store is written to, both
+# in the project root unless overridden
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(BASE_DIR, "climate-data-cali.csv")
+DEFAULT_STORE_DIR = os.environ.get("ERS_CLIMATE_STORE", os.path.join(BASE_DIR, ".climate_store"))
+
+# Days on the (leap-year) day-of-year axis of every column
+DAYS = 366
+
+# NOAA normals mark missing and suppressed values with these sentinels
+MISSING_VALUES = (-9999, -8888, -6666)
+
+# Normals columns carried into the store
+COLUMN_PREFIXES = ("DLY-", "MTD-", "YTD-")
+
+MANIFEST = "manifest.json"
+
+# Daily hazard probability columns (% of years): measurable snowfall or snow
+# on the ground, and at least 0.10 in of precipitation
+PRIOR_COLUMNS = {
+    "snow": ("DLY-SNOW-PCTALL-GE001TI", "DLY-SNWD-PCTALL-GE001WI"),
+    "rain": ("DLY-PRCP-PCTALL-GE010HI",)
+}
+
+
+def day_of_year(when):
+    """0-based index of a date or "MM-DD" string on a leap-year calendar (0..365)"""
+    if isinstance(when, str):
+        month, day = (int(part) for part in when.split("-"))
+    elif isinstance(when, (date, datetime)):
+        month, day = when.month, when.day
+    else:
+        raise TypeError(f"Unsupported date value: {when!r}")
+    return date(2000, month, day).timetuple().tm_yday - 1
+
+
+def build_store(csv_path=DEFAULT_CSV, store_dir=DEFAULT_STORE_DIR):
+    """Convert the normals CSV into one (stations x 366) float32 .npy file per column"""
+    import pandas as pd
+
+    frame = pd.read_csv(csv_path, dtype={"STATION": str, "DATE": str})
+    columns = [column for column in frame.columns if column.startswith(COLUMN_PREFIXES)]
+    stations = sorted(frame["STATION"].unique())
+
+    rows = frame["STATION"].map({station: i for i, station in enumerate(stations)}).to_numpy()
+    days = frame["DATE"].map(day_of_year).to_numpy()
+
+    os.makedirs(store_dir, exist_ok=True)
+    for column in columns:
+        values = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float32)
+        values[np.isin(values, MISSING_VALUES)] = np.nan
+        table = np.full((len(stations), DAYS), np.nan, dtype=np.float32)
+        table[rows, days] = values
+        np.save(os.path.join(store_dir, f"{column}.npy"), table)
+
+    # The manifest is written last, so a store with a manifest is complete
+    source = os.stat(csv_path)
+    with open(os.path.join(store_dir, MANIFEST), "w") as f:
+        json.dump({
+            "source": os.path.basename(csv_path),
+            "source_size": source.st_size,
+            "source_mtime": source.st_mtime,
+            "stations": stations,
+            "columns": columns
+        }, f, indent=2)
+    return ClimateStore(store_dir)
+
+
+# Columnar climate normals
+class ClimateStore:
+    """Read-only view of a store written by build_store.
+
+    Each column is a (stations x 366) float32 array memory-mapped on first
+    use, so opening the store parses nothing and a lookup is a single index
+    into pages the OS already caches. Missing normals are NaN.
+    """
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.stations = self.manifest["stations"]
+        self.columns = self.manifest["columns"]
+        self.station_index = {station: i for i, station in enumerate(self.stations)}
+        self._arrays = {}
+
+    @classmethod
+    def open(cls, store_dir=DEFAULT_STORE_DIR, csv_path=DEFAULT_CSV):
+        """Open the store, (re)building it first if it is missing or older than the CSV"""
+        if cls.is_stale(store_dir, csv_path):
+            return build_store(csv_path, store_dir)
+        return cls(store_dir)
+
+    @staticmethod
+    def is_stale(store_dir=DEFAULT_STORE_DIR, csv_path=DEFAULT_CSV):
+        """Whether the store needs building from csv_path"""
+        try:
+            with open(os.path.join(store_dir, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return True
+        if not os.path.exists(csv_path):
+            return False
+        source = os.stat(csv_path)
+        return (manifest.get("source_size") != source.st_size or
+                manifest.get("source_mtime") != source.st_mtime)
+
+    def column(self, name):
+        """The (stations x 366) array of a column"""
+        if name not in self._arrays:
+            if name not in self.columns:
+                raise KeyError(f"Unknown climate column: {name}")
+            self._arrays[name] = np.load(os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def value(self, name, station, when):
+        """Normal of a column at a station on a date, day-of-year index or "MM-DD" (NaN if missing)"""
+        day = when if isinstance(when, (int, np.integer)) else day_of_year(when)
+        return float(self.column(name)[self.station_index[station], day])
+
+    def day(self, name, when):
+        """Values of a column at every station on one day"""
+        day = when if isinstance(when, (int, np.integer)) else day_of_year(when)
+        return self.column(name)[:, day]
+
+
+def load_station_coordinates(path):
+    """Read {station: (lat, lon)} from a CSV with STATION, LATITUDE and LONGITUDE columns"""
+    import csv
+
+    with open(path, newline="") as f:
+        return {row["STATION"]: (float(row["LATITUDE"]), float(row["LONGITUDE"])) for row in csv.DictReader(f)}
+
+
+# Climatological hazard priors
+class ClimatePriors:
+    """Per-location, per-day hazard probabilities from the station normals.
+
+    The (hazard x station x day) probability table is built once from the
+    store and kept in memory. With station coordinates a location gets the
+    inverse-distance weighted probabilities of its nearest stations;
+    without them (the normals CSV carries none) every location gets the
+    statewide mean for the day.
+    """
+    def __init__(self, store, coordinates=None, neighbours=3):
+        self.kinds = tuple(PRIOR_COLUMNS)
+        tables = []
+        for columns in PRIOR_COLUMNS.values():
+            present = [store.column(column) for column in columns if column in store.columns]
+            if present:
+                tables.append(np.fmax.reduce(np.stack(present)) / 100)
+            else:
+                tables.append(np.full((len(store.stations), DAYS), np.nan, dtype=np.float32))
+        table = np.stack(tables).astype(np.float32)
+
+        # Stations without any value for a day fall back to the statewide mean
+        with np.errstate(invalid="ignore"):
+            counts = np.sum(~np.isnan(table), axis=1)
+            statewide = np.where(counts > 0, np.nansum(table, axis=1) / np.maximum(counts, 1), 0.0)
+        self.statewide = statewide.astype(np.float32)
+
+        coordinates = coordinates or {}
+        located = [i for i, station in enumerate(store.stations) if station in coordinates]
+        self.neighbours = neighbours
+        self.station_lat = np.array([coordinates[store.stations[i]][0] for i in located])
+        self.station_lon = np.array([coordinates[store.stations[i]][1] for i in located])
+        self.table = np.where(np.isnan(table), self.statewide[:, None, :], table)[:, located, :]
+
+    def prior(self, lat, lon, when):
+        """{hazard: probability 0-1} at a location on a date, day-of-year index or "MM-DD" """
+        day = when if isinstance(when, (int, np.integer)) else day_of_year(when)
+        if not len(self.station_lat):
+            return dict(zip(self.kinds, self.statewide[:, day].tolist()))
+
+        # Equirectangular distance is plenty to rank and weight stations
+        dy = self.station_lat - lat
+        dx = (self.station_lon - lon) * np.cos(np.radians(lat))
+        dist = np.hypot(dx, dy)
+        k = min(self.neighbours, len(dist))
+        nearest = np.argpartition(dist, k - 1)[:k]
+        weights = 1 / np.maximum(dist[nearest], 1e-6)
+        values = self.table[:, nearest, day] @ weights / weights.sum()
+        return dict(zip(self.kinds, values.tolist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped climate normals store")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="NOAA normals CSV")
+    parser.add_argument("--out", default=DEFAULT_STORE_DIR, help="store directory")
+    args = parser.parse_args()
+
+    store = build_store(args.csv, args.out)
+    print(f"Wrote {len(store.columns)} columns for {len(store.stations)} stations to {args.out}")
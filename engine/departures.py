@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+
+from .config import Config
+from .evolution import HAZARD_KINDS, HazardSimulation
+from .geo import DistanceEngine, Polyline
+
+# Departure-time planning
+class DeparturePlanner:
+    """Score every route at every departure time over the next day.
+
+    Each route is cut into segments of about Config.DEPARTURE_SAMPLE_KM,
+    and each segment is reached at departure + its share of the route's
+    duration. A route's exposure at a departure is the sum over its segments
+    of the simulated hazard intensity where and when the segment is driven,
+    plus the forecast rain and snow in force there, per km. All routes,
+    departures and segments are scored in one batch, and the per-hazard
+    exposures are kept, so a slider change only reweights them.
+
+    The hazard part is not select_best_route's score. Once the zones evolve
+    they only exist as the simulation's grid of cell intensities, with no
+    circles to measure road length inside (RouteExposure) or clearance to,
+    so each km counts the intensity it is driven through. The hazards are
+    weighted by ROUTE_HAZARD_RULES and the squared slider factors as in
+    route selection, but the totals are on their own scale: they rank
+    (route, departure) pairs against each other, not against risk_score.
+    """
+    def __init__(self, routes, snow_zones, fire_zones, rain_zones, forecast=None, route_weather=None,
+                 simulation=None, start_time=None, step_minutes=None, horizon_hours=None):
+        """Cut the routes into timed segments and compute their exposure at every departure
+
+        route_weather is fetch_route_bundle's list of forecasts sampled
+        along each route; routes without one use forecast. simulation
+        defaults to a HazardSimulation over the routes that covers the last
+        departure plus the longest trip.
+        """
+        self.routes = routes
+        self.start_time = time.time() if start_time is None else start_time
+        step_minutes = step_minutes or Config.DEPARTURE_STEP_MINUTES
+        horizon_hours = Config.DEPARTURE_HORIZON_HOURS if horizon_hours is None else horizon_hours
+        self.departures = np.arange(0, horizon_hours * 60 + 1, step_minutes) / 60  # hours
+        self.travel_minutes = np.array([route["legs"][0]["duration"]["value"] / 60 for route in routes])
+
+        # Segment midpoints of every route, concatenated, with their length
+        # and the hours into the trip they are reached
+        lat, lon, length, elapsed, starts, position = [], [], [], [], [], []
+        for route, minutes in zip(routes, self.travel_minutes):
+            points = Polyline.resample(Polyline.route_path(route), Config.DEPARTURE_SAMPLE_KM)
+            if len(points) < 2:
+                points = np.vstack((points, points))
+            km = DistanceEngine.haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+            mid_km = np.cumsum(km) - km / 2
+            starts.append(sum(len(part) for part in lat))
+            lat.append((points[:-1, 0] + points[1:, 0]) / 2)
+            lon.append((points[:-1, 1] + points[1:, 1]) / 2)
+            length.append(km)
+            position.append(mid_km / max(km.sum(), 1e-9))
+            elapsed.append(position[-1] * minutes / 60)
+        self.lat, self.lon, self.length, self.elapsed, self.position = (
+            np.concatenate(parts) for parts in (lat, lon, length, elapsed, position))
+        self.starts = np.array(starts)
+
+        if simulation is None:
+            simulation = HazardSimulation(
+                (self.lat.min() - 0.5, self.lon.min() - 0.5, self.lat.max() + 0.5, self.lon.max() + 0.5),
+                snow_zones, fire_zones, rain_zones, forecast, start_time=self.start_time
+            ).run(self.departures[-1] + self.elapsed.max() + Config.SIM_STEP_HOURS)
+        self.simulation = simulation
+        self.exposure = self._exposure(forecast, route_weather or [])
+
+    def _exposure(self, forecast, route_weather):
+        """(routes, departures, 5) exposure: snow, fire and rain hazards, then forecast rain and snow"""
+        hours = self.departures[:, None] + self.elapsed[None, :]
+        # The simulation may have been started at another time
+        sim_hours = hours + (self.start_time - self.simulation.start_time) / 3600
+        columns = [self.simulation.sample(kind, sim_hours, self.lat, self.lon) * self.length
+                   for kind in HAZARD_KINDS]
+
+        # Forecast precipitation where each segment is driven: the sample
+        # along its route nearest to it, or forecast for routes without samples
+        when = self.start_time + hours * 3600
+        precipitation = np.zeros((2,) + hours.shape)
+        route_ids = np.repeat(np.arange(len(self.routes)), np.diff(np.append(self.starts, len(self.lat))))
+        for route in range(len(self.routes)):
+            samples = route_weather[route] if route < len(route_weather) else []
+            segments = np.flatnonzero(route_ids == route)
+            nearest = (np.round(self.position[segments] * (len(samples) - 1)).astype(np.int64) if samples
+                       else np.zeros(len(segments), dtype=np.int64))
+            for sample in range(max(len(samples), 1)):
+                entries = samples[sample]["forecast"] if samples else forecast or []
+                if not entries:
+                    continue
+                chosen = segments[nearest == sample]
+                stamps = np.array([entry.get("timestamp") or 0 for entry in entries], dtype=np.float64)
+                current = np.clip(np.searchsorted(stamps, when[:, chosen], side="right") - 1, 0, len(entries) - 1)
+                for row, key in enumerate(("rain", "snow")):
+                    amounts = np.array([entry.get(key) or 0 for entry in entries], dtype=np.float64)
+                    precipitation[row][:, chosen] = amounts[current] * self.length[chosen]
+
+        per_segment = np.stack(columns + list(precipitation), axis=-1)  # (departures, segments, 5)
+        return np.add.reduceat(per_segment, self.starts, axis=1).transpose(1, 0, 2)
+
+    def _weighted(self, snow_factor, fire_factor, rain_factor):
+        """(routes, departures) hazard and weather exposure for the given factors"""
+        factors = {"snow": snow_factor, "fire": fire_factor, "rain": rain_factor}
+        hazard_weights = np.array([Config.ROUTE_HAZARD_RULES[kind][1] * factors[kind] ** 2 for kind in HAZARD_KINDS])
+        weather_weights = np.array([Config.DEPARTURE_WEATHER_WEIGHTS[kind] for kind in ("rain", "snow")])
+        return self.exposure[:, :, :3] @ hazard_weights, self.exposure[:, :, 3:] @ weather_weights
+
+    def scores(self, snow_factor, fire_factor, rain_factor):
+        """(routes, departures) total scores: weighted exposure plus travel minutes"""
+        hazard, weather = self._weighted(snow_factor, fire_factor, rain_factor)
+        return hazard + weather + self.travel_minutes[:, None]
+
+    def plan(self, snow_factor, fire_factor, rain_factor, top_k=None):
+        """(route, departure) pairs ranked from best to worst total score, as dicts"""
+        hazard, weather = self._weighted(snow_factor, fire_factor, rain_factor)
+        total = hazard + weather + self.travel_minutes[:, None]
+        order = np.argsort(total, axis=None, kind="stable")[:top_k]
+        routes, departures = np.unravel_index(order, total.shape)
+
+        return [{
+            "route": int(route),
+            "summary": self.routes[route].get("summary", ""),
+            "departure_minutes": int(round(self.departures[departure] * 60)),
+            "departure_time": self.start_time + self.departures[departure] * 3600,
+            "arrival_time": self.start_time + self.departures[departure] * 3600 + self.travel_minutes[route] * 60,
+            "hazard_exposure": float(hazard[route, departure]),
+            "weather_exposure": float(weather[route, departure]),
+            "travel_minutes": float(self.travel_minutes[route]),
+            "total_score": float(total[route, departure])
+        } for route, departure in zip(routes, departures)]
@@ -0,0 +1,231 @@
+import time
+
+import numpy as np
+
+from .config import Config
+from .geo import DistanceEngine
+from .zones import ZoneSet
+
+HAZARD_KINDS = ("snow", "fire", "rain")
+
+# Time-stepped hazard fields
+class HazardSimulation:
+    """Snow, fire and rain intensity evolving on a lat/lon grid.
+
+    The zones are deposited onto a grid of cell_km cells (each zone adds its
+    base intensity to the cell it lies in, so sums over an area match the
+    zone sums the scores use) and stepped forward with the forecast in force
+    at each step: fire spreads to neighbouring cells, faster downwind and
+    slower in humid air or under rain, and burns out as its fuel is used up;
+    rain and snow cells drift downwind, grow while the forecast has
+    precipitation and decay otherwise, snow also melting above freezing.
+    Wind and weather are uniform over the grid and change with the 3-hour
+    forecast steps. Rates come from Config.HAZARD_EVOLUTION.
+
+    Every step is kept (as float16), so the field can be queried at any time
+    within the horizon, interpolating linearly between steps.
+    """
+    KM_PER_DEG_LAT = np.pi * DistanceEngine.EARTH_RADIUS_KM / 180
+
+    def __init__(self, bbox, snow_zones, fire_zones, rain_zones, forecast=None, cell_km=None, start_time=None):
+        """Deposit the zones onto a grid covering bbox (min_lat, min_lon, max_lat, max_lon)"""
+        self.cell_km = cell_km or Config.SIM_CELL_KM
+        self.min_lat, self.min_lon, max_lat, max_lon = bbox
+        self.cell_lat = self.cell_km / self.KM_PER_DEG_LAT
+        self.cell_lon = self.cell_lat / np.cos(np.radians((self.min_lat + max_lat) / 2))
+        self.shape = (max(1, int(np.ceil((max_lat - self.min_lat) / self.cell_lat))),
+                      max(1, int(np.ceil((max_lon - self.min_lon) / self.cell_lon))))
+        self.forecast = sorted(forecast or [], key=lambda entry: entry.get("timestamp") or 0)
+        self.start_time = time.time() if start_time is None else start_time
+
+        self.labels = {}
+        self.state = {}
+        for kind, zones in zip(HAZARD_KINDS, (snow_zones, fire_zones, rain_zones)):
+            zones = ZoneSet.coerce(zones, Config.HAZARD_SPECS[kind]["label"])
+            self.labels[kind] = zones.label
+            self.state[kind] = self._deposit(zones.lat, zones.lon, zones.intensity)
+        self.fuel = np.ones(self.shape, dtype=np.float32)
+        self.step_hours = Config.SIM_STEP_HOURS
+        self.history = None
+
+    @classmethod
+    def around(cls, lat, lon, snow_zones, fire_zones, rain_zones, forecast=None, margin_km=None, **kwargs):
+        """Simulation over a square margin_km (default Config.SIM_MARGIN_KM) around a point"""
+        margin_lat = (margin_km or Config.SIM_MARGIN_KM) / cls.KM_PER_DEG_LAT
+        margin_lon = margin_lat / np.cos(np.radians(lat))
+        return cls((lat - margin_lat, lon - margin_lon, lat + margin_lat, lon + margin_lon),
+                   snow_zones, fire_zones, rain_zones, forecast, **kwargs)
+
+    def _cells(self, lat, lon):
+        """Fractional (row, col) grid positions of points; cell centres are whole numbers"""
+        return ((np.asarray(lat, dtype=np.float64) - self.min_lat) / self.cell_lat - 0.5,
+                (np.asarray(lon, dtype=np.float64) - self.min_lon) / self.cell_lon - 0.5)
+
+    def _deposit(self, lat, lon, intensity):
+        grid = np.zeros(self.shape, dtype=np.float32)
+        rows, cols = (np.round(part).astype(np.int64) for part in self._cells(lat, lon))
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        np.add.at(grid, (rows[inside], cols[inside]), np.asarray(intensity, dtype=np.float32)[inside])
+        return grid
+
+    def weather_at(self, hours):
+        """Forecast entry in force the given number of hours after the start"""
+        when = self.start_time + hours * 3600
+        current = {}
+        for entry in self.forecast:
+            if current and (entry.get("timestamp") or 0) > when:
+                break
+            current = entry
+        return current
+
+    @staticmethod
+    def _shift_add(out, grid, rows, cols, weight):
+        """Add weight * grid moved by whole cells (north/east positive) into out"""
+        n_rows, n_cols = grid.shape
+        if abs(rows) >= n_rows or abs(cols) >= n_cols:
+            return
+        target = out[max(rows, 0):n_rows + min(rows, 0), max(cols, 0):n_cols + min(cols, 0)]
+        target += np.float32(weight) * grid[max(-rows, 0):n_rows + min(-rows, 0), max(-cols, 0):n_cols + min(-cols, 0)]
+
+    @staticmethod
+    def _advect(grid, rows, cols):
+        """grid moved by a fractional number of cells, splitting each cell bilinearly"""
+        whole_rows, whole_cols = int(np.floor(rows)), int(np.floor(cols))
+        frac_rows, frac_cols = rows - whole_rows, cols - whole_cols
+        moved = np.zeros_like(grid)
+        for d_row, w_row in ((0, 1 - frac_rows), (1, frac_rows)):
+            for d_col, w_col in ((0, 1 - frac_cols), (1, frac_cols)):
+                if w_row * w_col > 0:
+                    HazardSimulation._shift_add(moved, grid, whole_rows + d_row, whole_cols + d_col, w_row * w_col)
+        return moved
+
+    def step(self, hours, dt):
+        """Advance the state by dt hours under the forecast in force at the given hour"""
+        weather = self.weather_at(hours)
+        rules = Config.HAZARD_EVOLUTION
+        speed = float(weather.get("wind_speed") or 0.0)
+        # Meteorological degrees give where the wind blows from
+        to_north = -float(np.cos(np.radians(weather.get("wind_deg") or 0.0)))
+        to_east = -float(np.sin(np.radians(weather.get("wind_deg") or 0.0)))
+        humidity = weather.get("humidity")
+        humidity = 50 if humidity is None else humidity
+        temperature = weather.get("temperature")
+        rain_mm = (weather.get("rain") or 0) / 3  # forecast amounts are per 3 hours
+        snow_mm = (weather.get("snow") or 0) / 3
+
+        # Fire: every burning cell ignites its 8 neighbours at a rate raised
+        # downwind and lowered across and against the wind
+        fire, rain, snow = self.state["fire"], self.state["rain"], self.state["snow"]
+        spec = rules["fire"]
+        spread = np.zeros_like(fire)
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                if d_row or d_col:
+                    alignment = (d_row * to_north + d_col * to_east) / np.hypot(d_row, d_col)
+                    rate = spec["spread_rate"] * np.exp(spec["wind_coupling"] * speed * alignment) / np.hypot(d_row, d_col)
+                    self._shift_add(spread, fire, d_row, d_col, rate)
+        damping = np.float32(dt * (1 - spec["humidity_damping"] * humidity / 100)) * np.exp(
+            np.float32(-spec["rain_suppression"]) * rain)
+        growth = damping * spread * self.fuel * np.clip(1 - fire, 0, None)
+        self.fuel = np.clip(self.fuel - np.float32(dt / spec["burnout_hours"]) * fire, 0, 1)
+        fire = (fire + growth) * np.float32(np.exp(-dt / spec["burnout_hours"]))
+
+        # Rain and snow drift with the wind, grow under forecast precipitation
+        # and decay otherwise
+        drift_cells = speed * 3.6 * dt / self.cell_km
+        spec = rules["rain"]
+        rain = self._advect(rain, spec["drift"] * drift_cells * to_north, spec["drift"] * drift_cells * to_east)
+        rain *= np.float32(np.exp(-dt / spec["lifetime_hours"]) * (1 + dt * spec["growth_per_mm"] * rain_mm))
+        spec = rules["snow"]
+        melt = spec["melt_rate"] * max(0.0, temperature - spec["freezing_c"]) if temperature is not None else 0.0
+        snow = self._advect(snow, spec["drift"] * drift_cells * to_north, spec["drift"] * drift_cells * to_east)
+        snow *= np.float32(np.exp(-dt / spec["lifetime_hours"] - dt * melt) * (1 + dt * spec["growth_per_mm"] * snow_mm))
+
+        self.state = {"snow": snow, "fire": fire, "rain": rain}
+
+    def run(self, horizon_hours=None, step_hours=None):
+        """Step the field across the horizon, keeping every step; returns self"""
+        horizon_hours = horizon_hours or Config.SIM_HORIZON_HOURS
+        self.step_hours = step_hours or Config.SIM_STEP_HOURS
+        n_steps = int(np.ceil(horizon_hours / self.step_hours))
+        self.history = np.empty((n_steps + 1, len(HAZARD_KINDS)) + self.shape, dtype=np.float16)
+        self.history[0] = [self.state[kind] for kind in HAZARD_KINDS]
+        for i in range(n_steps):
+            self.step(i * self.step_hours, self.step_hours)
+            self.history[i + 1] = [self.state[kind] for kind in HAZARD_KINDS]
+        return self
+
+    @property
+    def horizon_hours(self):
+        return (len(self.history) - 1) * self.step_hours
+
+    def _steps(self, hours):
+        """Bracketing step indices and interpolation weight for times in hours"""
+        last = len(self.history) - 1
+        position = np.clip(np.asarray(hours, dtype=np.float64) / self.step_hours, 0, last)
+        before = np.minimum(np.floor(position).astype(np.int64), max(last - 1, 0))
+        return before, np.minimum(before + 1, last), position - before
+
+    def field(self, kind, hours):
+        """Intensity grid of one hazard kind at a time within the horizon"""
+        before, after, weight = self._steps(hours)
+        k = HAZARD_KINDS.index(kind)
+        return ((1 - weight) * self.history[before, k].astype(np.float32) +
+                weight * self.history[after, k].astype(np.float32))
+
+    def sample(self, kind, hours, lat, lon):
+        """Intensity per cell at points and times (broadcasting), interpolated bilinearly"""
+        rows, cols = np.broadcast_arrays(*self._cells(lat, lon))
+        k = HAZARD_KINDS.index(kind)
+
+        # Interpolate in space at every step once per point, then in time
+        # for every (point, time) pair
+        row0 = np.clip(np.floor(rows).astype(np.int64), 0, self.shape[0] - 1).ravel()
+        col0 = np.clip(np.floor(cols).astype(np.int64), 0, self.shape[1] - 1).ravel()
+        row1, col1 = np.minimum(row0 + 1, self.shape[0] - 1), np.minimum(col0 + 1, self.shape[1] - 1)
+        fr, fc = np.clip(rows.ravel() - row0, 0, 1), np.clip(cols.ravel() - col0, 0, 1)
+        grid = self.history[:, k]
+        at_steps = ((1 - fr) * (1 - fc) * grid[:, row0, col0] + (1 - fr) * fc * grid[:, row0, col1] +
+                    fr * (1 - fc) * grid[:, row1, col0] + fr * fc * grid[:, row1, col1])
+        inside = (rows > -1) & (rows < self.shape[0]) & (cols > -1) & (cols < self.shape[1])
+        at_steps *= inside.ravel()
+
+        hours = np.asarray(hours, dtype=np.float64)
+        point = np.broadcast_to(np.arange(rows.size).reshape(rows.shape), np.broadcast_shapes(hours.shape, rows.shape))
+        before, after, weight = self._steps(np.broadcast_to(hours, point.shape))
+        return (1 - weight) * at_steps[before, point] + weight * at_steps[after, point]
+
+    def sum_within(self, kind, lat, lon, radius_km):
+        """Total intensity within radius_km of a point at every step, as an array over steps"""
+        rows = np.arange(self.shape[0])
+        cols = np.arange(self.shape[1])
+        cell_lat = self.min_lat + (rows + 0.5) * self.cell_lat
+        cell_lon = self.min_lon + (cols + 0.5) * self.cell_lon
+        near_rows = rows[np.abs(cell_lat - lat) <= radius_km / self.KM_PER_DEG_LAT + self.cell_lat]
+        near_cols = cols[np.abs(cell_lon - lon) <= radius_km / self.KM_PER_DEG_LAT / np.cos(np.radians(lat))
+                         + self.cell_lon]
+        if not len(near_rows) or not len(near_cols):
+            return np.zeros(len(self.history))
+        mask = DistanceEngine.haversine(cell_lat[near_rows][:, None], cell_lon[near_cols][None, :],
+                                        lat, lon) <= radius_km
+        window = self.history[:, HAZARD_KINDS.index(kind)][:, near_rows][:, :, near_cols].astype(np.float64)
+        return (window * mask).sum(axis=(1, 2))
+
+    def zones(self, hours, min_intensity=None):
+        """Snow, fire and rain ZoneSets at a time, one zone per cell above min_intensity
+
+        The zones can be scored like generated ones; each is a circle of the
+        cell's area, so route exposure reflects the simulated extent.
+        """
+        min_intensity = Config.SIM_MIN_INTENSITY if min_intensity is None else min_intensity
+        radius_m = 1000 * self.cell_km / np.sqrt(np.pi)
+        zone_sets = []
+        for kind in HAZARD_KINDS:
+            grid = self.field(kind, hours)
+            rows, cols = np.nonzero(grid > min_intensity)
+            zone_sets.append(ZoneSet(self.labels[kind],
+                                     self.min_lat + (rows + 0.5) * self.cell_lat,
+                                     self.min_lon + (cols + 0.5) * self.cell_lon,
+                                     grid[rows, cols],
+                                     np.full(len(rows), radius_m)))
+        return tuple(zone_sets)
@@ -0,0 +1,222 @@
+import numpy as np
+
+from .config import Config
+
+# Geohash encoding for spatial cache keys
+class Geohash:
+    BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+    
+    @staticmethod
+    def encode(lat, lon, precision=5):
+        """Encode a position as a geohash of the given number of characters"""
+        lat_range = [-90.0, 90.0]
+        lon_range = [-180.0, 180.0]
+        chars = []
+        bits = 0
+        value = 0
+        even = True
+        while len(chars) < precision:
+            # Bits alternate between longitude and latitude, longitude first
+            interval, coord = (lon_range, lon) if even else (lat_range, lat)
+            mid = (interval[0] + interval[1]) / 2
+            if coord >= mid:
+                value = (value << 1) | 1
+                interval[0] = mid
+            else:
+                value <<= 1
+                interval[1] = mid
+            even = not even
+            bits += 1
+            if bits == 5:
+                chars.append(Geohash.BASE32[value])
+                bits = 0
+                value = 0
+        return "".join(chars)
+    
+    @staticmethod
+    def decode(geohash):
+        """Return the (lat, lon) centre of a geohash cell"""
+        lat_range = [-90.0, 90.0]
+        lon_range = [-180.0, 180.0]
+        even = True
+        for char in geohash:
+            value = Geohash.BASE32.index(char)
+            for shift in range(4, -1, -1):
+                interval = lon_range if even else lat_range
+                mid = (interval[0] + interval[1]) / 2
+                if (value >> shift) & 1:
+                    interval[0] = mid
+                else:
+                    interval[1] = mid
+                even = not even
+        return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+# Encoded polyline decoding and resampling
+class Polyline:
+    """Google encoded polylines as (n, 2) lat/lon arrays.
+
+    Directions responses carry the full road geometry only as encoded
+    polylines (overview_polyline and one per step); step start_locations are
+    just the manoeuvre points, which can be tens of km apart on highways.
+    """
+    @staticmethod
+    def decode(encoded, precision=5):
+        """Decode an encoded polyline into an (n, 2) float64 lat/lon array"""
+        if not encoded:
+            return np.empty((0, 2))
+        chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+
+        # Each value is a run of 5-bit chunks, least significant first; the
+        # 0x20 bit is set on every chunk except the last one of a value
+        ends = np.flatnonzero((chunks & 0x20) == 0)
+        if len(ends) < 2:
+            return np.empty((0, 2))
+        chunks = chunks[:ends[-1] + 1]
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        shifts = 5 * (np.arange(len(chunks)) - np.repeat(starts, ends - starts + 1))
+        values = np.bitwise_or.reduceat((chunks & 0x1f) << shifts, starts)
+
+        # Undo the zigzag sign encoding, then the delta encoding
+        deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+        deltas = deltas[:len(deltas) // 2 * 2].reshape(-1, 2)
+        return np.cumsum(deltas, axis=0) / 10.0 ** precision
+
+    @staticmethod
+    def encode(points, precision=5):
+        """Encode an (n, 2) lat/lon sequence as a polyline string"""
+        points = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 2) * 10.0 ** precision).astype(np.int64)
+        deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+        chars = []
+        for value in deltas.tolist():
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                chars.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chars.append(chr(value + 63))
+        return "".join(chars)
+
+    @staticmethod
+    def resample(points, spacing_km=0.5):
+        """Return points spaced spacing_km apart along a path, both ends included"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 2:
+            return points
+        steps = DistanceEngine.haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+        travelled = np.concatenate(([0.0], np.cumsum(steps)))
+        if travelled[-1] == 0:
+            return points[:1]
+
+        targets = np.append(np.arange(0.0, travelled[-1], spacing_km), travelled[-1])
+        return np.column_stack((np.interp(targets, travelled, points[:, 0]),
+                                np.interp(targets, travelled, points[:, 1])))
+
+    @staticmethod
+    def densify(points, max_segment_km):
+        """Insert points so that no segment of a path is longer than max_segment_km"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 2:
+            return points
+        lengths = DistanceEngine.haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+        pieces = np.maximum(1, np.ceil(lengths / max_segment_km).astype(np.int64))
+        if pieces.max() == 1:
+            return points
+
+        # Segment i contributes pieces[i] points at fractions 0, 1/k, ... (k-1)/k
+        segment = np.repeat(np.arange(len(lengths)), pieces)
+        first = np.cumsum(pieces) - pieces
+        fraction = (np.arange(len(segment)) - first[segment]) / pieces[segment]
+        start, end = points[segment], points[segment + 1]
+        return np.vstack((start + (end - start) * fraction[:, None], points[-1:]))
+
+    @staticmethod
+    def route_path(route):
+        """Full (n, 2) lat/lon geometry of a route's first leg
+
+        Uses the step polylines when every step has one, then the (coarser)
+        overview_polyline, and falls back to step start points otherwise.
+        """
+        leg = route["legs"][0]
+        steps = leg["steps"]
+        if steps and all(step.get("polyline", {}).get("points") for step in steps):
+            parts = [Polyline.decode(step["polyline"]["points"]) for step in steps]
+            # Consecutive steps share their boundary point
+            parts = [parts[0]] + [part[1:] for part in parts[1:]]
+            path = np.concatenate(parts)
+            if len(path):
+                return path
+
+        overview = route.get("overview_polyline", {}).get("points")
+        if overview:
+            path = Polyline.decode(overview)
+            if len(path):
+                return path
+
+        points = [(step["start_location"]["lat"], step["start_location"]["lng"]) for step in steps]
+        points.append((leg["end_location"]["lat"], leg["end_location"]["lng"]))
+        return np.asarray(points, dtype=np.float64)
+
+# Vectorized distance engine
+class DistanceEngine:
+    """Great-circle distances computed with NumPy broadcasting.
+
+    Haversine on the mean Earth sphere differs from the WGS-84 geodesic used
+    by geopy by at most ~0.5% (about 100 m at the 20 km snow threshold), so
+    only zone/point pairs lying that close to a threshold can be counted
+    differently; every other pair contributes exactly as before.
+    """
+    EARTH_RADIUS_KM = 6371.0088
+
+    @staticmethod
+    def haversine(lat1, lon1, lat2, lon2):
+        """Element-wise (broadcasting) great-circle distance in km"""
+        lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        return 2 * DistanceEngine.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    @staticmethod
+    def destination(lat, lon, bearing_deg, distance_km):
+        """Element-wise (broadcasting) (lat, lon) reached from a point along a bearing"""
+        lat1, lon1, bearing = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat, lon, bearing_deg))
+        delta = np.asarray(distance_km, dtype=np.float64) / DistanceEngine.EARTH_RADIUS_KM
+
+        lat2 = np.arcsin(np.sin(lat1) * np.cos(delta) + np.cos(lat1) * np.sin(delta) * np.cos(bearing))
+        lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(delta) * np.cos(lat1),
+                                 np.cos(delta) - np.sin(lat1) * np.sin(lat2))
+        return np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180
+
+    @staticmethod
+    def haversine_matrix(lat1, lon1, lat2, lon2):
+        """Return the (len(lat1), len(lat2)) matrix of distances in km"""
+        return DistanceEngine.haversine(np.asarray(lat1, dtype=np.float64)[:, None],
+                                        np.asarray(lon1, dtype=np.float64)[:, None],
+                                        np.asarray(lat2, dtype=np.float64)[None, :],
+                                        np.asarray(lon2, dtype=np.float64)[None, :])
+
+    @staticmethod
+    def unit_vectors(lat, lon):
+        """(n, 3) unit vectors of lat/lon points; places are closer than d where their dot product exceeds cos(d / R)"""
+        lat = np.radians(np.asarray(lat, dtype=np.float64))
+        lon = np.radians(np.asarray(lon, dtype=np.float64))
+        return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+    @staticmethod
+    def zone_arrays(zones):
+        """Return lat, lon and effective intensity arrays for a ZoneSet or list of zones"""
+        if hasattr(zones, "effective_intensity"):
+            return zones.lat, zones.lon, zones.effective_intensity.astype(np.float64)
+        lat = np.fromiter((zone['lat'] for zone in zones), dtype=np.float64, count=len(zones))
+        lon = np.fromiter((zone['lon'] for zone in zones), dtype=np.float64, count=len(zones))
+        intensity = np.fromiter((zone.get('adjusted_intensity', zone['intensity']) for zone in zones),
+                                dtype=np.float64, count=len(zones))
+        return lat, lon, intensity
+
+    @staticmethod
+    def route_points(route, spacing_km=None):
+        """Return the (n, 2) lat/lon array of points every spacing_km along a route
+
+        spacing_km defaults to Config.ROUTE_SAMPLE_SPACING_KM.
+        """
+        spacing_km = spacing_km or Config.ROUTE_SAMPLE_SPACING_KM
+        return Polyline.resample(Polyline.route_path(route), spacing_km)
@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# Shared HTTP client for outbound API calls
+class HTTPClient:
+    """Pooled HTTP client with retries, per-host limits and latency histograms.
+
+    One keep-alive session is shared by every caller so repeated requests to
+    the same upstream reuse TCP/TLS connections. At most max_per_host requests
+    run against a host at once. 429/5xx responses and connection errors are
+    retried with exponential backoff and full jitter (honouring Retry-After),
+    within a per-endpoint time budget that covers every attempt and sleep.
+    """
+    def __init__(self, pool_size=32, max_per_host=8, max_retries=3,
+                 backoff_base=0.5, backoff_cap=8.0, budgets=None, default_budget=10.0):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._latency = {}
+
+    @contextmanager
+    def _host_slot(self, host):
+        with self._lock:
+            slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with slot:
+            yield
+
+    def _backoff(self, attempt, response):
+        """Seconds to wait before the next attempt"""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _record(self, endpoint, elapsed_ms, outcome):
+        with self._lock:
+            stats = self._latency.setdefault(endpoint, {
+                "count": 0, "total_ms": 0.0, "errors": 0, "retries": 0,
+                "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            })
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            if outcome != "ok":
+                stats["errors"] += 1
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound),
+                          len(LATENCY_BUCKETS_MS))
+            stats["buckets"][bucket] += 1
+
+    def _count_retry(self, endpoint):
+        with self._lock:
+            self._latency[endpoint]["retries"] += 1
+
+    def get(self, url, params=None, endpoint=None):
+        """GET url with pooling, retries and the endpoint's time budget
+
+        endpoint names the budget and histogram to use (defaults to the host).
+        Returns the final response, which may still be a 429/5xx once retries
+        or the budget run out; raises the last connection error otherwise.
+        """
+        host = urlsplit(url).netloc
+        endpoint = endpoint or host
+        deadline = time.monotonic() + self.budgets.get(endpoint, self.default_budget)
+        attempt = 0
+
+        while True:
+            response = None
+            error = None
+            with self._host_slot(host):
+                remaining = deadline - time.monotonic()
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params, timeout=max(remaining, 0.001))
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                retryable = error is not None or response.status_code in RETRY_STATUSES
+                self._record(endpoint, (time.perf_counter() - started) * 1000,
+                             "error" if retryable else "ok")
+
+            delay = self._backoff(attempt, response) if attempt < self.max_retries else None
+            if not retryable or delay is None or time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+
+            self._count_retry(endpoint)
+            time.sleep(delay)
+            attempt += 1
+
+    def latency_stats(self):
+        """Per-endpoint request counts, mean latency, retries and histogram"""
+        with self._lock:
+            stats = {}
+            for endpoint, entry in self._latency.items():
+                labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+                stats[endpoint] = {
+                    "count": entry["count"],
+                    "mean_ms": entry["total_ms"] / entry["count"] if entry["count"] else 0.0,
+                    "errors": entry["errors"],
+                    "retries": entry["retries"],
+                    "histogram": dict(zip(labels, entry["buckets"]))
+                }
+            return stats
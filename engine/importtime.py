@@ -0,0 +1,45 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Cold import budget (s) for the engine: median of fresh interpreters
+IMPORT_BUDGET_S = 0.3
+
+# Modules the engine must not pull in at import time
+HEAVY_MODULES = ("streamlit", "pydeck", "plotly", "pandas", "requests")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": sorted(set(sys.modules) & set({heavy!r}))}}))
+"""
+
+
+def measure(module="engine", repeats=5):
+    """Import module in repeats fresh interpreters; returns (median seconds, heavy modules loaded)"""
+    probe = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    timings, loaded = [], set()
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return statistics.median(timings), sorted(loaded)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the cold import time of the engine")
+    parser.add_argument("--module", default="engine")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_S, help="seconds")
+    args = parser.parse_args()
+
+    seconds, loaded = measure(args.module, args.repeats)
+    print(f"import {args.module}: {seconds * 1000:.0f} ms median of {args.repeats} (budget {args.budget * 1000:.0f} ms)")
+    if loaded:
+        print(f"heavy modules imported: {', '.join(loaded)}")
+    sys.exit(1 if seconds > args.budget or loaded else 0)
@@ -0,0 +1,133 @@
+import numpy as np
+
+from .config import Config
+from .geo import DistanceEngine
+
+# Level-of-detail reduction for map payloads
+class MapDetail:
+    """Reduce map geometry to what is visible at the zoom the map opens at.
+
+    deck.gl receives every path vertex and point as JSON, so before a layer
+    is built paths are simplified to a pixel tolerance (Douglas-Peucker),
+    point fields beyond Config.MAP_ZONE_POINT_LIMIT are aggregated into
+    hexagonal bins and coordinates are rounded to Config.MAP_COORD_DECIMALS.
+    Distances use a local equirectangular projection, which is accurate to
+    well under a pixel over the extent of one map view.
+    """
+    KM_PER_DEG_LAT = np.pi * DistanceEngine.EARTH_RADIUS_KM / 180
+    # deck.gl's Web Mercator world is 512 px wide at zoom 0
+    KM_PER_PX_ZOOM0 = 2 * np.pi * DistanceEngine.EARTH_RADIUS_KM / 512
+
+    @staticmethod
+    def km_per_px(zoom, lat=0.0):
+        """Ground size of one screen pixel (km) at a zoom level and latitude"""
+        return MapDetail.KM_PER_PX_ZOOM0 * np.cos(np.radians(lat)) / 2 ** zoom
+
+    @staticmethod
+    def fit_view(points, width_px=None, height_px=None):
+        """Centre (lat, lon) and the highest zoom that shows every point of an (n, 2) lat/lon array"""
+        width_px = width_px or Config.MAP_VIEW_WIDTH_PX
+        height_px = height_px or Config.MAP_VIEW_HEIGHT_PX
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        south, west = points.min(axis=0)
+        north, east = points.max(axis=0)
+        lat, lon = (south + north) / 2, (west + east) / 2
+
+        # The span that fills the view decides the zoom; Mercator stretches
+        # both axes by 1 / cos(lat), which km_per_px already accounts for
+        span_km = max((east - west) * MapDetail.KM_PER_DEG_LAT * np.cos(np.radians(lat)) / width_px,
+                      (north - south) * MapDetail.KM_PER_DEG_LAT / height_px)
+        if span_km <= 0:
+            return float(lat), float(lon), Config.MAP_MAX_ZOOM
+        zoom = np.floor(np.log2(MapDetail.km_per_px(0, lat) / span_km))
+        return float(lat), float(lon), int(np.clip(zoom, Config.MAP_MIN_ZOOM, Config.MAP_MAX_ZOOM))
+
+    @staticmethod
+    def _project(points, lat0):
+        """Local planar (x, y) km coordinates of lat/lon points"""
+        return np.column_stack((points[:, 1] * MapDetail.KM_PER_DEG_LAT * np.cos(np.radians(lat0)),
+                                points[:, 0] * MapDetail.KM_PER_DEG_LAT))
+
+    @staticmethod
+    def simplify(points, tolerance_km):
+        """Douglas-Peucker simplification of an (n, 2) lat/lon path
+
+        Keeps both ends and every vertex needed so that no dropped vertex
+        lies further than tolerance_km from the simplified path.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 3 or tolerance_km <= 0:
+            return points
+        xy = MapDetail._project(points, points[:, 0].mean())
+
+        keep = np.zeros(len(points), dtype=bool)
+        keep[[0, -1]] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            inner = xy[first + 1:last]
+            start, end = xy[first], xy[last]
+            segment = end - start
+            length_sq = segment @ segment
+
+            # Distance to the segment (not the infinite line), so paths that
+            # double back are kept
+            t = np.clip((inner - start) @ segment / length_sq, 0, 1) if length_sq else np.zeros(len(inner))
+            distance = np.hypot(*(inner - start - t[:, None] * segment).T)
+            farthest = int(distance.argmax())
+            if distance[farthest] > tolerance_km:
+                split = first + 1 + farthest
+                keep[split] = True
+                stack.append((first, split))
+                stack.append((split, last))
+        return points[keep]
+
+    @staticmethod
+    def hex_bin(lat, lon, size_km, **weights):
+        """Aggregate points into flat-topped hexagons size_km from centre to corner
+
+        Returns a dict of arrays: bin centres ("lat", "lon"), point counts
+        ("count") and, for each named weight array, its largest value in
+        each bin under the same name.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        weights = {name: np.asarray(weight, dtype=np.float64) for name, weight in weights.items()}
+        if not len(lat):
+            return dict(weights, lat=lat, lon=lon, count=np.empty(0, dtype=np.int64))
+        lat0 = float(lat.mean())
+        x, y = MapDetail._project(np.column_stack((lat, lon)), lat0).T
+
+        # Axial coordinates, rounded to the nearest hexagon in cube space
+        q = 2 / 3 * x / size_km
+        r = (-x / 3 + np.sqrt(3) / 3 * y) / size_km
+        s = -q - r
+        rq, rr, rs = np.round(q), np.round(r), np.round(s)
+        dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+        fix_q = (dq > dr) & (dq > ds)
+        fix_r = ~fix_q & (dr > ds)
+        rq = np.where(fix_q, -rr - rs, rq)
+        rr = np.where(fix_r, -rq - rs, rr)
+
+        cells, bins = np.unique(np.column_stack((rq, rr)).astype(np.int64), axis=0, return_inverse=True)
+        bins = bins.ravel()
+
+        cx = size_km * 1.5 * cells[:, 0]
+        cy = size_km * np.sqrt(3) * (cells[:, 1] + cells[:, 0] / 2)
+        result = {
+            "lat": cy / MapDetail.KM_PER_DEG_LAT,
+            "lon": cx / (MapDetail.KM_PER_DEG_LAT * np.cos(np.radians(lat0))),
+            "count": np.bincount(bins, minlength=len(cells))
+        }
+        for name, weight in weights.items():
+            result[name] = np.full(len(cells), -np.inf)
+            np.maximum.at(result[name], bins, weight)
+        return result
+
+    @staticmethod
+    def round_coords(values, decimals=None):
+        """Coordinates rounded for the wire; Config.MAP_COORD_DECIMALS by default"""
+        return np.round(np.asarray(values, dtype=np.float64),
+                        Config.MAP_COORD_DECIMALS if decimals is None else decimals)
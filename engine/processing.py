@@ -0,0 +1,741 @@
+import csv
+import heapq
+import os
+import random
+
+import numpy as np
+
+from .cache import shared_resource
+from .config import Config
+from .evolution import HazardSimulation
+from .geo import DistanceEngine, Polyline
+from .spatial import HazardIndex, RouteExposure
+from .zones import ZoneSet
+
+# Data processing class
+class DataProcessor:
+    @staticmethod
+    def route_bbox(start_lat, start_lon, end_lat, end_lon, margin=0.5):
+        """Bounding box (min_lat, min_lon, max_lat, max_lon) around a route's endpoints"""
+        return (min(start_lat, end_lat) - margin, min(start_lon, end_lon) - margin,
+                max(start_lat, end_lat) + margin, max(start_lon, end_lon) + margin)
+
+    @staticmethod
+    def generate_hazard_field(bbox, spec, seed=None):
+        """Generate a clustered hazard field with a handful of batched NumPy draws
+
+        spec is a Config.HAZARD_SPECS key or a dict with the same fields; an
+        optional "points" entry fixes the total number of zones, which are
+        then spread uniformly over the clusters. seed may be an int, a
+        SeedSequence or a numpy Generator; the same seed gives the same field.
+        """
+        if isinstance(spec, str):
+            spec = Config.HAZARD_SPECS[spec]
+        rng = np.random.default_rng(seed)
+        min_lat, min_lon, max_lat, max_lon = bbox
+        n_clusters = spec["clusters"]
+        if n_clusters <= 0:
+            return ZoneSet(spec["label"], [], [], [], [])
+
+        # Cluster centres, biased north for hazards that favour higher latitudes
+        lat_bias = spec.get("lat_bias", 0.0)
+        center_lat = rng.uniform(min_lat + lat_bias, max_lat + lat_bias, n_clusters)
+        center_lon = rng.uniform(min_lon, max_lon, n_clusters)
+
+        # Cluster membership of every point
+        if spec.get("points") is not None:
+            cluster = np.sort(rng.integers(0, n_clusters, spec["points"]))
+        else:
+            low, high = spec["cluster_size"]
+            cluster = np.repeat(np.arange(n_clusters), rng.integers(low, high + 1, n_clusters))
+
+        # Points scattered around their cluster centre
+        n_points = len(cluster)
+        offsets = rng.uniform(-spec["spread"], spec["spread"], (2, n_points))
+        intensity = rng.uniform(*spec["intensity"], n_points)
+        radius = rng.uniform(*spec["radius"], n_points)
+
+        return ZoneSet(spec["label"], center_lat[cluster] + offsets[0], center_lon[cluster] + offsets[1],
+                       intensity, radius)
+
+    @staticmethod
+    def generate_snow_zones(start_lat, start_lon, end_lat, end_lon, num_zones=10, seed=None):
+        """Generate realistic snow zone clusters"""
+        # Snow clusters are biased toward the north (see Config.HAZARD_SPECS)
+        return DataProcessor.generate_hazard_field(
+            DataProcessor.route_bbox(start_lat, start_lon, end_lat, end_lon),
+            dict(Config.HAZARD_SPECS["snow"], clusters=num_zones), seed)
+    
+    @staticmethod
+    def generate_fire_zones(start_lat, start_lon, end_lat, end_lon, num_zones=8, seed=None):
+        """Generate realistic fire zone clusters"""
+        return DataProcessor.generate_hazard_field(
+            DataProcessor.route_bbox(start_lat, start_lon, end_lat, end_lon),
+            dict(Config.HAZARD_SPECS["fire"], clusters=num_zones), seed)
+    
+    @staticmethod
+    def generate_rain_zones(start_lat, start_lon, end_lat, end_lon, num_zones=12, seed=None):
+        """Generate realistic rain zone clusters"""
+        return DataProcessor.generate_hazard_field(
+            DataProcessor.route_bbox(start_lat, start_lon, end_lat, end_lon),
+            dict(Config.HAZARD_SPECS["rain"], clusters=num_zones), seed)
+    
+    @staticmethod
+    def generate_zone_fields(start_lat, start_lon, end_lat, end_lon, seed=None):
+        """Generate snow, fire and rain zones from independent streams of one seed"""
+        snow_seed, fire_seed, rain_seed = np.random.SeedSequence(seed).spawn(3)
+        return (DataProcessor.generate_snow_zones(start_lat, start_lon, end_lat, end_lon, seed=snow_seed),
+                DataProcessor.generate_fire_zones(start_lat, start_lon, end_lat, end_lon, seed=fire_seed),
+                DataProcessor.generate_rain_zones(start_lat, start_lon, end_lat, end_lon, seed=rain_seed))
+    
+    @staticmethod
+    def apply_intensity_factor(zones, intensity_factor):
+        """Apply intensity factor to weather zones"""
+        zones = ZoneSet.coerce(zones)
+        zones.adjusted_intensity = zones.intensity * np.float32(intensity_factor)
+        # Also adjust the radius based on intensity
+        zones.adjusted_radius = zones.radius * DataProcessor.radius_factor(intensity_factor)
+        return zones
+
+    @staticmethod
+    def radius_factor(intensity_factor):
+        """Scale apply_intensity_factor applies to zone radii"""
+        return np.float32(0.5 + intensity_factor * 0.5)
+
+    @staticmethod
+    def build_hazard_index(snow_zones, fire_zones, rain_zones):
+        """Build a spatial index for each hazard type"""
+        return {
+            "snow": HazardIndex(snow_zones),
+            "fire": HazardIndex(fire_zones),
+            "rain": HazardIndex(rain_zones)
+        }
+    
+    @staticmethod
+    def exit_candidates(lat, lon, highway_exits=None):
+        """Exit candidate positions around a location, as a dict of arrays
+
+        Candidates are Config.EXIT_RING_POINTS points on a ring at each of
+        Config.EXIT_RING_RADII_KM, the given highway exits (as returned by
+        APIService.get_nearby_cities_and_exits) and the points of interest
+        of Config.EXIT_POI_PATH within the outer ring. Besides "lat" and
+        "lon", "name" labels each one and "distance_km" is its distance
+        from the location.
+        """
+        bearings, radii, ring_names = DataProcessor.exit_ring()
+        ring_lat, ring_lon = DistanceEngine.destination(lat, lon, bearings, radii)
+        names = list(ring_names)
+        lats, lons, distances = [ring_lat], [ring_lon], [radii]
+        
+        if highway_exits:
+            names += [exit_point["exit_name"] for exit_point in highway_exits]
+            lats.append(np.array([exit_point["exit_lat"] for exit_point in highway_exits], dtype=np.float64))
+            lons.append(np.array([exit_point["exit_lon"] for exit_point in highway_exits], dtype=np.float64))
+            distances.append(DistanceEngine.haversine(lat, lon, lats[-1], lons[-1]))
+        
+        pois = DataProcessor.exit_pois()
+        if pois is not None:
+            poi_names, poi_lat, poi_lon = pois
+            poi_distance = DistanceEngine.haversine(lat, lon, poi_lat, poi_lon)
+            near = np.flatnonzero(poi_distance <= radii.max())
+            names += [poi_names[i] for i in near]
+            lats.append(poi_lat[near])
+            lons.append(poi_lon[near])
+            distances.append(poi_distance[near])
+        
+        return {
+            "lat": np.concatenate(lats),
+            "lon": np.concatenate(lons),
+            "name": names,
+            "distance_km": np.concatenate(distances)
+        }
+    
+    @staticmethod
+    @shared_resource
+    def exit_ring():
+        """Bearings (degrees), radii (km) and names of the ring candidates of exit_candidates"""
+        radii = np.repeat(np.asarray(Config.EXIT_RING_RADII_KM, dtype=np.float64), Config.EXIT_RING_POINTS)
+        bearings = np.tile(np.arange(Config.EXIT_RING_POINTS) * 360 / Config.EXIT_RING_POINTS,
+                           len(Config.EXIT_RING_RADII_KM))
+        compass = ["North", "Northeast", "East", "Southeast", "South", "Southwest", "West", "Northwest"]
+        names = tuple(f"{compass[int(round(bearing / 45)) % 8]} {radius:g} km ({bearing:.0f}°)"
+                      for bearing, radius in zip(bearings.tolist(), radii.tolist()))
+        return bearings, radii, names
+    
+    @staticmethod
+    @shared_resource
+    def exit_pois():
+        """Shared points of interest offered as exits, (names, lat, lon), or None when none are configured"""
+        path = Config.EXIT_POI_PATH
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        return ([row["name"] for row in rows],
+                np.array([float(row["lat"]) for row in rows]),
+                np.array([float(row["lon"]) for row in rows]))
+    
+    @staticmethod
+    def build_exit_candidates(lat, lon, weather_data=None, traffic_data=None, highway_exits=None):
+        """Build the exit candidates around a location, scored for distance, weather and traffic only
+
+        Returns exit_candidates() with a "base_score" array added.
+        """
+        candidates = DataProcessor.exit_candidates(lat, lon, highway_exits)
+        
+        # Farther exits take longer to reach
+        safety_score = 100 - Config.EXIT_DISTANCE_PENALTY * candidates["distance_km"]
+        
+        # Adjust for weather if available
+        if weather_data and len(weather_data) > 0:
+            # Reduce safety for high snow or rain
+            snow = weather_data[0].get('snow', 0)
+            rain = weather_data[0].get('rain', 0)
+            safety_score -= (snow * 10 + rain * 5)
+        
+        # Adjust for the traffic at each exit: the nearest traffic point, if close enough
+        if traffic_data:
+            cosines = DistanceEngine.unit_vectors(candidates["lat"], candidates["lon"]) @ DistanceEngine.unit_vectors(
+                [point['lat'] for point in traffic_data], [point['lon'] for point in traffic_data]).T
+            nearest = cosines.argmax(axis=1)
+            penalties = np.array([Config.EXIT_TRAFFIC_PENALTIES.get(point['severity'], 0) for point in traffic_data])
+            close = (cosines[np.arange(len(nearest)), nearest] >
+                     np.cos(Config.EXIT_TRAFFIC_RADIUS_KM / DistanceEngine.EARTH_RADIUS_KM))
+            safety_score -= np.where(close, penalties[nearest], 0)
+        
+        candidates["base_score"] = safety_score
+        return candidates
+
+    @staticmethod
+    def exit_details():
+        """Simulated emergency services, history and road data of one exit"""
+        # Generate simulated emergency services data
+        emergency_services = []
+        for service_type in ["Hospital", "Police", "Fire Station"]:
+            distance = random.uniform(2, 15)
+            emergency_services.append({
+                "type": service_type,
+                "distance_km": distance,
+                "response_time_min": distance * 1.2  # Approximate response time
+            })
+        
+        # Generate historical safety data
+        historical_safety = {
+            "past_incidents": random.randint(0, 20),
+            "avg_response_time": random.uniform(5, 15),
+            "evacuation_success_rate": random.uniform(70, 98)
+        }
+        
+        # Generate road condition data (visibility is reduced by hazards when ranked)
+        road_conditions = {
+            "road_quality": random.uniform(50, 100),
+            "traffic_flow": random.uniform(40, 100),
+            "visibility": random.uniform(60, 100)
+        }
+        
+        return {
+            "emergency_services": emergency_services,
+            "historical_safety": historical_safety,
+            "road_conditions": road_conditions,
+            "terrain_difficulty": random.uniform(10, 50),
+            "cell_coverage": random.uniform(60, 100)
+        }
+
+    @staticmethod
+    def rank_exit_candidates(candidates, impacts, top_k=3, details=None):
+        """Apply per-candidate (snow, fire, rain) impacts and return the top_k safest exits
+
+        Candidates come off a heap from safest to least safe, ties going to
+        the nearer one, and any within Config.EXIT_MIN_SEPARATION_KM of an
+        exit already chosen is passed over, so the suggestions lead away in
+        different directions. Only the chosen ones become exit records;
+        details, if given, keeps their simulated data by candidate position,
+        so re-ranking the same candidates shows the same data for an exit.
+        """
+        # Ensure safety score is within bounds
+        safety_scores = np.clip(candidates["base_score"] - impacts.sum(axis=1), 0, 100)
+        heap = list(zip((-safety_scores).tolist(), candidates["distance_km"].tolist(), range(len(safety_scores))))
+        heapq.heapify(heap)
+        vectors = DistanceEngine.unit_vectors(candidates["lat"], candidates["lon"])
+        min_cosine = np.cos(Config.EXIT_MIN_SEPARATION_KM / DistanceEngine.EARTH_RADIUS_KM)
+        best = []
+        while heap and len(best) < top_k:
+            neg_score, _, i = heapq.heappop(heap)
+            if best and (vectors[[j for _, j in best]] @ vectors[i]).max() > min_cosine:
+                continue
+            best.append((-neg_score, i))
+        
+        exit_suggestions = []
+        for safety_score, i in best:
+            snow_impact, fire_impact, rain_impact = impacts[i]
+            if details is None or i not in details:
+                exit_details = DataProcessor.exit_details()
+                if details is not None:
+                    details[i] = exit_details
+            else:
+                exit_details = details[i]
+            
+            exit_point = dict(exit_details,
+                              lat=float(candidates["lat"][i]),
+                              lon=float(candidates["lon"][i]),
+                              direction=candidates["name"][i],
+                              distance_km=float(candidates["distance_km"][i]))
+            exit_point["safety_score"] = safety_score
+            exit_point["recommendation"] = ("Highly Recommended" if safety_score > 80 else
+                                            "Recommended" if safety_score > 60 else
+                                            "Use with Caution" if safety_score > 40 else "Not Recommended")
+            exit_point["weather_impacts"] = {
+                "snow_impact": float(snow_impact),
+                "fire_impact": float(fire_impact),
+                "rain_impact": float(rain_impact)
+            }
+            exit_point["road_conditions"] = dict(
+                exit_details["road_conditions"],
+                visibility=exit_details["road_conditions"]["visibility"] - (snow_impact * 0.5) - (rain_impact * 0.3)
+            )
+            exit_suggestions.append(exit_point)
+        
+        return exit_suggestions
+
+    @staticmethod
+    def suggest_safe_exits(lat, lon, weather_data=None, traffic_data=None, 
+                          snow_zones=None, fire_zones=None, rain_zones=None,
+                          snow_factor=0.5, fire_factor=0.5, rain_factor=0.5, hazard_index=None,
+                          highway_exits=None):
+        """Suggest safe exit places based on current location, weather, and traffic"""
+        if hazard_index is None:
+            hazard_index = DataProcessor.build_hazard_index(snow_zones, fire_zones, rain_zones)
+        
+        candidates = DataProcessor.build_exit_candidates(lat, lon, weather_data, traffic_data, highway_exits)
+        exit_lats, exit_lons = candidates["lat"], candidates["lon"]
+        
+        # Every zone within a hazard's threshold of an exit lowers its safety score
+        impacts = np.zeros((len(exit_lats), 3))
+        hazards = [("snow", snow_zones, snow_factor), ("fire", fire_zones, fire_factor), ("rain", rain_zones, rain_factor)]
+        for column, (kind, zones, factor) in enumerate(hazards):
+            if not zones:
+                continue
+            threshold_km, weight = Config.EXIT_HAZARD_RULES[kind]
+            intensity = ZoneSet.coerce(zones).effective_intensity
+            impacts[:, column] = weight * factor * hazard_index[kind].sum_within_dense(
+                exit_lats, exit_lons, threshold_km, intensity)
+        
+        return DataProcessor.rank_exit_candidates(candidates, impacts)  # Top 3 safest exits
+
+    @staticmethod
+    def calculate_emergency_risk(weather_data, traffic_data, snow_zones=None, fire_zones=None, rain_zones=None,
+                               snow_factor=0.5, fire_factor=0.5, rain_factor=0.5, climate_priors=None):
+        """Calculate overall emergency risk based on weather and traffic
+
+        climate_priors optionally maps "snow"/"rain" to the climatological
+        probability (0-1) of that hazard for the place and day.
+        """
+        # Initialize risk factors
+        snow_risk = 0
+        rain_risk = 0
+        fire_risk = 0
+        traffic_risk = 0
+        
+        # Calculate weather risks
+        if weather_data and len(weather_data) > 0:
+            snow_values = [entry.get('snow', 0) for entry in weather_data]
+            rain_values = [entry.get('rain', 0) for entry in weather_data]
+            
+            max_snow = max(snow_values) if snow_values else 0
+            max_rain = max(rain_values) if rain_values else 0
+            
+            # Scale to 0-100
+            snow_risk = min(100, max_snow * 20)
+            rain_risk = min(100, max_rain * 10)
+        
+        # Calculate traffic risk
+        if traffic_data:
+            severity_counts = {"High": 0, "Medium": 0, "Low": 0}
+            for point in traffic_data:
+                severity_counts[point.get('severity', "Low")] += 1
+            
+            # Weight by severity
+            traffic_risk = (severity_counts["High"] * 10 + severity_counts["Medium"] * 5) / max(1, len(traffic_data)) * 10
+            traffic_risk = min(100, traffic_risk)
+        
+        # Calculate snow risk from snow zones
+        if snow_zones:
+            avg_snow_intensity = float(ZoneSet.coerce(snow_zones).effective_intensity.mean())
+            snow_risk = max(snow_risk, avg_snow_intensity * 100 * snow_factor)
+        
+        # Calculate fire risk from fire zones
+        if fire_zones:
+            avg_fire_intensity = float(ZoneSet.coerce(fire_zones).effective_intensity.mean())
+            fire_risk = avg_fire_intensity * 100 * fire_factor
+        
+        # Calculate rain risk from rain zones
+        if rain_zones:
+            avg_rain_intensity = float(ZoneSet.coerce(rain_zones).effective_intensity.mean())
+            rain_risk = max(rain_risk, avg_rain_intensity * 100 * rain_factor)
+        
+        # Climatology acts as an independent chance of the hazard:
+        # risk = 1 - (1 - risk) * (1 - prior)
+        if climate_priors:
+            snow_risk = 100 - (100 - snow_risk) * (1 - climate_priors.get("snow", 0))
+            rain_risk = 100 - (100 - rain_risk) * (1 - climate_priors.get("rain", 0))
+        
+        # Calculate overall risk (weighted average)
+        overall_risk = (snow_risk * 0.2 + rain_risk * 0.2 + fire_risk * 0.3 + traffic_risk * 0.3)
+        
+        return {
+            "overall_risk": overall_risk,
+            "snow_risk": snow_risk,
+            "rain_risk": rain_risk,
+            "fire_risk": fire_risk,
+            "traffic_risk": traffic_risk,
+            "climate_priors": dict(climate_priors or {}),
+            "risk_level": "High" if overall_risk > 70 else "Medium" if overall_risk > 40 else "Low"
+        }
+    
+    @staticmethod
+    @shared_resource
+    def road_graph():
+        """Shared offline road graph, or None when none is configured"""
+        from .roads import RoadGraph
+
+        path = Config.ROAD_GRAPH_PATH
+        if not path or not os.path.exists(path):
+            return None
+        return RoadGraph.load(path)
+
+    @staticmethod
+    @shared_resource
+    def climate_priors():
+        """Shared climatology prior table, or None when the normals are unavailable"""
+        from .climate import ClimatePriors, ClimateStore, load_station_coordinates
+
+        try:
+            store = ClimateStore.open()
+            coordinates = (load_station_coordinates(Config.CLIMATE_STATIONS_PATH)
+                           if Config.CLIMATE_STATIONS_PATH else None)
+        except (OSError, ValueError, KeyError):
+            return None
+        return ClimatePriors(store, coordinates)
+
+    @staticmethod
+    def graph_edge_costs(graph, snow_zones, fire_zones, rain_zones, hazard_index):
+        """Per-edge cost in minutes: free-flow time raised inside hazard zones"""
+        midpoints = graph.edge_midpoints()
+        penalty = np.zeros(graph.num_edges)
+        for kind, zones in (("snow", snow_zones), ("fire", fire_zones), ("rain", rain_zones)):
+            if not zones:
+                continue
+            zones = ZoneSet.coerce(zones)
+            radius_km = zones.effective_radius / 1000
+            reach = float(radius_km.max())
+
+            # Only edges inside the zones' bounding box can be affected
+            dlat = reach / HazardIndex.KM_PER_DEG_LAT
+            dlon = dlat / np.cos(np.radians(min(89.0, float(np.abs(zones.lat).max()) + dlat)))
+            near = np.flatnonzero((midpoints[:, 0] >= zones.lat.min() - dlat) &
+                                  (midpoints[:, 0] <= zones.lat.max() + dlat) &
+                                  (midpoints[:, 1] >= zones.lon.min() - dlon) &
+                                  (midpoints[:, 1] <= zones.lon.max() + dlon))
+            point_idx, zone_idx, dist = hazard_index[kind].query_radius_many(
+                midpoints[near, 0], midpoints[near, 1], reach)
+            edge_idx = near[point_idx]
+            inside = dist < radius_km[zone_idx]
+            _, weight = Config.ROUTE_HAZARD_RULES[kind]
+            penalty += weight * np.bincount(edge_idx[inside], weights=zones.effective_intensity[zone_idx[inside]],
+                                            minlength=graph.num_edges)
+        return graph.travel_minutes() * (1 + Config.GRAPH_HAZARD_PENALTY * penalty)
+
+    @staticmethod
+    def hazard_avoiding_route(graph, start_lat, start_lon, end_lat, end_lon,
+                              snow_zones, fire_zones, rain_zones, hazard_index):
+        """Least-cost path over the road graph as a Directions-shaped route, or None"""
+        costs = DataProcessor.graph_edge_costs(graph, snow_zones, fire_zones, rain_zones, hazard_index)
+        path, _ = graph.shortest_path(graph.nearest_node(start_lat, start_lon),
+                                      graph.nearest_node(end_lat, end_lon), costs)
+        if len(path) < 2:
+            return None
+
+        points = np.column_stack((graph.lat[path], graph.lon[path]))
+        edges = graph.path_edges(path)
+        meters = graph.length_km[edges].astype(np.float64) * 1000
+        seconds = graph.travel_minutes()[edges].astype(np.float64) * 60
+
+        def distance(value):
+            return {"text": f"{value / 1000:.1f} km", "value": int(round(value))}
+
+        def duration(value):
+            hours, minutes = divmod(int(round(value / 60)), 60)
+            text = f"{hours} hours {minutes} mins" if hours else f"{minutes} mins"
+            return {"text": text, "value": int(round(value))}
+
+        def location(i):
+            return {"lat": float(points[i, 0]), "lng": float(points[i, 1])}
+
+        # Group graph nodes into steps; consecutive steps share a node
+        steps = []
+        for first in range(0, len(path) - 1, Config.GRAPH_STEP_NODES):
+            last = min(first + Config.GRAPH_STEP_NODES, len(path) - 1)
+            steps.append({
+                "start_location": location(first),
+                "end_location": location(last),
+                "html_instructions": "Continue on the hazard-avoiding detour",
+                "distance": distance(meters[first:last].sum()),
+                "duration": duration(seconds[first:last].sum()),
+                "polyline": {"points": Polyline.encode(points[first:last + 1])}
+            })
+
+        return {
+            "summary": "Hazard-avoiding detour (offline road graph)",
+            "overview_polyline": {"points": Polyline.encode(points)},
+            "legs": [{
+                "start_location": location(0),
+                "end_location": location(len(path) - 1),
+                "distance": distance(meters.sum()),
+                "duration": duration(seconds.sum()),
+                "steps": steps
+            }]
+        }
+
+    @staticmethod
+    def route_exposures(routes, snow_zones, fire_zones, rain_zones, hazard_index, max_factor=1.0):
+        """RouteExposure per hazard type (None where there are no zones)
+
+        The exposures hold every pair the zone radii reach at intensity
+        factors up to max_factor (and at least 1, the radii as generated).
+        """
+        radius_scale = float(DataProcessor.radius_factor(max(max_factor, 1.0)))
+        exposures = {}
+        for kind, zones in (("snow", snow_zones), ("fire", fire_zones), ("rain", rain_zones)):
+            if not zones or not routes:
+                exposures[kind] = None
+                continue
+            buffer_km, _ = Config.ROUTE_HAZARD_RULES[kind]
+            max_radius_km = float(ZoneSet.coerce(zones).radius.max()) / 1000 * radius_scale
+            exposures[kind] = RouteExposure(routes, hazard_index[kind], buffer_km, max_radius_km)
+        return exposures
+
+    @staticmethod
+    def route_hazard_sums(exposures, radii, intensities):
+        """Per-route (snow, fire, rain) exposure scores
+
+        radii (km) and intensities hold one per-zone array (or None) per hazard type.
+        """
+        n_routes = next((exposure.n_routes for exposure in exposures.values() if exposure), 0)
+        sums = np.zeros((n_routes, 3))
+        for column, kind in enumerate(("snow", "fire", "rain")):
+            if exposures[kind] is not None and intensities[column] is not None:
+                sums[:, column] = exposures[kind].scores(radii[column], intensities[column])
+        return sums
+    
+    @staticmethod
+    def select_best_route(routes, snow_zones, fire_zones, rain_zones, 
+                         snow_factor, fire_factor, rain_factor, hazard_index=None):
+        """Select the best route based on weather conditions"""
+        route_scores = []
+        if hazard_index is None:
+            hazard_index = DataProcessor.build_hazard_index(snow_zones, fire_zones, rain_zones)
+        if not routes:
+            return []
+
+        hazards = [("snow", snow_zones, snow_factor), ("fire", fire_zones, fire_factor), ("rain", rain_zones, rain_factor)]
+        zone_sets = [ZoneSet.coerce(zones) if zones else None for _, zones, _ in hazards]
+        exposures = DataProcessor.route_exposures(routes, snow_zones, fire_zones, rain_zones, hazard_index,
+                                                  max(snow_factor, fire_factor, rain_factor))
+        sums = DataProcessor.route_hazard_sums(
+            exposures,
+            [zones.effective_radius / 1000 if zones else None for zones in zone_sets],
+            [zones.effective_intensity if zones else None for zones in zone_sets])
+
+        # Each zone adds weight * factor * intensity per km of road inside it,
+        # plus up to one unit more as the road passes within the buffer
+        weights = np.array([Config.ROUTE_HAZARD_RULES[kind][1] * factor for kind, _, factor in hazards])
+        risk_scores = sums @ weights
+
+        for idx, route in enumerate(routes):
+            risk_score = float(risk_scores[idx])
+
+            # Add base score from route duration
+            duration_seconds = route["legs"][0]["duration"]["value"]
+            duration_score = duration_seconds / 60  # 1 point per minute
+            
+            # Total score (lower is better)
+            total_score = risk_score + duration_score
+            
+            route_scores.append({
+                "route_index": idx,
+                "risk_score": risk_score,
+                "duration_score": duration_score,
+                "total_score": total_score
+            })
+        
+        # Sort routes by total score (lower is better)
+        route_scores.sort(key=lambda x: x["total_score"])
+        
+        # Return the sorted route indices
+        return [score["route_index"] for score in route_scores]
+
+# Cached hazard proximity for incremental re-scoring
+class HazardScoreCache:
+    """Per-hazard-type proximity sums for the current routes and exit candidates.
+
+    The intensity sliders only rescale zones: after apply_intensity_factor a
+    zone contributes weight * factor * (intensity * factor) to a score, while
+    which zones lie near which exits never changes. Caching the sums of base
+    intensity per exit and hazard type turns a slider change into an (n, 3) x
+    (3,) recombination instead of a spatial search. Route exposure also
+    depends on the scaled zone radii, so routes keep their RouteExposure
+    segment/zone pairs and only re-evaluate the circle geometry.
+    """
+    def __init__(self, snow_zones, fire_zones, rain_zones, hazard_index):
+        self.hazard_index = hazard_index
+        self.base_intensity = [ZoneSet.coerce(zones).intensity if zones else None
+                               for zones in (snow_zones, fire_zones, rain_zones)]
+        self.base_radius = [ZoneSet.coerce(zones).radius if zones else None
+                            for zones in (snow_zones, fire_zones, rain_zones)]
+        self.zones = (snow_zones, fire_zones, rain_zones)
+        self.route_exposures = None
+        self.route_minutes = None
+        self.exit_candidates = None
+        self.exit_sums = None
+        self.exit_details = None
+
+    @staticmethod
+    def _scales(rules, snow_factor, fire_factor, rain_factor):
+        factors = {"snow": snow_factor, "fire": fire_factor, "rain": rain_factor}
+        return np.array([rules[kind][1] * factors[kind] ** 2 for kind in ("snow", "fire", "rain")])
+
+    def cache_routes(self, routes, max_factor=1.0):
+        """Cache the exposure geometry and durations of the given routes, for factors up to max_factor"""
+        self.route_exposures = DataProcessor.route_exposures(routes, *self.zones, self.hazard_index, max_factor)
+        self.route_minutes = np.array([route["legs"][0]["duration"]["value"] / 60 for route in routes])
+
+    def cache_exits(self, lat, lon, weather_data=None, traffic_data=None, highway_exits=None):
+        """Build exit candidates around a location and cache their hazard sums"""
+        self.exit_candidates = DataProcessor.build_exit_candidates(lat, lon, weather_data, traffic_data,
+                                                                   highway_exits)
+        self.exit_details = {}
+        exit_lats, exit_lons = self.exit_candidates["lat"], self.exit_candidates["lon"]
+
+        self.exit_sums = np.zeros((len(exit_lats), 3))
+        for column, (kind, intensity) in enumerate(zip(("snow", "fire", "rain"), self.base_intensity)):
+            if intensity is not None:
+                threshold_km, _ = Config.EXIT_HAZARD_RULES[kind]
+                self.exit_sums[:, column] = self.hazard_index[kind].sum_within_dense(
+                    exit_lats, exit_lons, threshold_km, intensity)
+
+    def route_order(self, snow_factor, fire_factor, rain_factor):
+        """Route indices from best to worst, as select_best_route would rank them"""
+        risk_scores = self.route_risk(snow_factor, fire_factor, rain_factor)
+        total_scores = risk_scores + self.route_minutes
+        return [int(idx) for idx in np.argsort(total_scores, kind="stable")]
+
+    def route_risk(self, snow_factor, fire_factor, rain_factor):
+        """Hazard part of each cached route's score"""
+        factors = np.array([snow_factor, fire_factor, rain_factor])
+        radii = [radius * DataProcessor.radius_factor(factor) / 1000 if radius is not None else None
+                 for radius, factor in zip(self.base_radius, factors)]
+        intensities = [intensity * np.float32(factor) if intensity is not None else None
+                       for intensity, factor in zip(self.base_intensity, factors)]
+        sums = DataProcessor.route_hazard_sums(self.route_exposures, radii, intensities)
+
+        weights = np.array([Config.ROUTE_HAZARD_RULES[kind][1] for kind in ("snow", "fire", "rain")]) * factors
+        return sums @ weights
+
+    def safe_exits(self, snow_factor, fire_factor, rain_factor):
+        """Top safe exits among the cached candidates, as suggest_safe_exits would rank them"""
+        scales = self._scales(Config.EXIT_HAZARD_RULES, snow_factor, fire_factor, rain_factor)
+        return DataProcessor.rank_exit_candidates(self.exit_candidates, self.exit_sums * scales,
+                                                  details=self.exit_details)
+
+# Exit analytics, also available as DataProcessor.generate_exit_analytics
+def generate_exit_analytics(exit_point, snow_zones, fire_zones, rain_zones, 
+                          snow_factor, fire_factor, rain_factor, hazard_index=None,
+                          weather_data=None, simulation=None):
+    """Generate detailed analytics for an exit point
+
+    The 24-hour forecast follows the hazards as simulation (by default a
+    HazardSimulation around the exit, driven by weather_data) evolves them.
+    """
+    if hazard_index is None:
+        hazard_index = DataProcessor.build_hazard_index(snow_zones, fire_zones, rain_zones)
+
+    # Calculate distance to nearest hazards
+    _, nearest_snow = hazard_index["snow"].nearest(exit_point['lat'], exit_point['lon'])
+    _, nearest_fire = hazard_index["fire"].nearest(exit_point['lat'], exit_point['lon'])
+    _, nearest_rain = hazard_index["rain"].nearest(exit_point['lat'], exit_point['lon'])
+    
+    # Generate time-based safety forecast
+    if simulation is None:
+        simulation = HazardSimulation.around(exit_point['lat'], exit_point['lon'],
+                                             snow_zones, fire_zones, rain_zones, weather_data).run()
+    hours = np.arange(24)
+    impacts = {}
+    for kind, factor in (("snow", snow_factor), ("fire", fire_factor), ("rain", rain_factor)):
+        threshold_km, weight = Config.EXIT_HAZARD_RULES[kind]
+        sums = simulation.sum_within(kind, exit_point['lat'], exit_point['lon'], threshold_km)
+        sums = np.interp(hours, np.arange(len(sums)) * simulation.step_hours, sums)
+        # Scale the exit's current impact with the simulated intensity, so
+        # hour 0 matches its safety score
+        if sums[0] > 0:
+            impacts[kind] = exit_point['weather_impacts'][f'{kind}_impact'] * sums / sums[0]
+        else:
+            impacts[kind] = weight * factor ** 2 * sums
+    
+    base_safety = exit_point['safety_score'] + sum(exit_point['weather_impacts'].values())
+    hourly_safety = np.clip(base_safety - impacts["snow"] - impacts["fire"] - impacts["rain"], 0, 100)
+    safety_forecast = [{
+        'hour': int(hour),
+        'safety_score': float(hourly_safety[hour]),
+        'snow_impact': float(impacts["snow"][hour]),
+        'fire_impact': float(impacts["fire"][hour]),
+        'rain_impact': float(impacts["rain"][hour])
+    } for hour in hours]
+    
+    # Generate comparative data with other exits
+    comparative_metrics = {
+        'emergency_service_proximity': random.uniform(60, 95),
+        'road_accessibility': random.uniform(70, 98),
+        'evacuation_speed': random.uniform(65, 90),
+        'shelter_availability': random.uniform(50, 85),
+        'communication_reliability': random.uniform(75, 95)
+    }
+    
+    # Generate resource availability data
+    resources = [
+        {'name': 'Fuel Stations', 'availability': random.uniform(50, 100)},
+        {'name': 'Medical Facilities', 'availability': random.uniform(40, 90)},
+        {'name': 'Food & Water', 'availability': random.uniform(60, 95)},
+        {'name': 'Shelter', 'availability': random.uniform(55, 85)},
+        {'name': 'Communication', 'availability': random.uniform(70, 100)}
+    ]
+    
+    # Generate historical evacuation success data
+    historical_evac = []
+    for i in range(10):
+        year = 2015 + i
+        historical_evac.append({
+            'year': year,
+            'success_rate': random.uniform(70, 95),
+            'avg_evacuation_time': random.uniform(20, 60),
+            'incidents': random.randint(1, 8)
+        })
+    
+    return {
+        'nearest_hazards': {
+            'snow_distance_km': nearest_snow if nearest_snow != float('inf') else None,
+            'fire_distance_km': nearest_fire if nearest_fire != float('inf') else None,
+            'rain_distance_km': nearest_rain if nearest_rain != float('inf') else None
+        },
+        'safety_forecast': safety_forecast,
+        'comparative_metrics': comparative_metrics,
+        'resource_availability': resources,
+        'historical_evacuation': historical_evac,
+        'terrain_analysis': {
+            'elevation': random.uniform(100, 1000),
+            'slope': random.uniform(1, 15),
+            'vegetation_density': random.uniform(10, 80),
+            'water_bodies': random.randint(0, 5)
+        }
+    }
+
+DataProcessor.generate_exit_analytics = generate_exit_analytics
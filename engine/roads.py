@@ -0,0 +1,258 @@
+import argparse
+import bz2
+import gzip
+import heapq
+import math
+import re
+
+import numpy as np
+
+from .geo import DistanceEngine
+
+# Arrays stored in a graph file (numpy .npz)
+GRAPH_ARRAYS = ("lat", "lon", "indptr", "indices", "length_km", "speed_kmh")
+
+# Routable OSM highway classes and their speed (km/h) when a way has no
+# usable maxspeed tag
+OSM_SPEEDS_KMH = {
+    "motorway": 105, "motorway_link": 60,
+    "trunk": 90, "trunk_link": 50,
+    "primary": 80, "primary_link": 50,
+    "secondary": 70, "secondary_link": 50,
+    "tertiary": 60, "tertiary_link": 40,
+    "unclassified": 50, "residential": 40, "living_street": 15, "service": 25
+}
+
+# oneway tag values meaning "along the way only"; "-1" means against it
+OSM_ONEWAY = ("yes", "true", "1")
+
+MPH_TO_KMH = 1.609344
+
+
+def parse_maxspeed(value):
+    """km/h of an OSM maxspeed tag ("50", "65 mph"), or None if it holds no speed"""
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(mph)?", value or "")
+    if not match or float(match.group(1)) <= 0:
+        return None
+    return float(match.group(1)) * (MPH_TO_KMH if match.group(2) else 1.0)
+
+
+# Offline road network
+class RoadGraph:
+    """Directed road graph in compressed sparse row (CSR) form.
+
+    Node i sits at (lat[i], lon[i]); its outgoing edges are
+    indices[indptr[i]:indptr[i + 1]], with per-edge road length and speed in
+    the same slots of length_km and speed_kmh. A graph file is an .npz holding
+    exactly these arrays, so an OSM extract only has to be converted once
+    (see from_edges) and loads in a single read.
+    """
+    def __init__(self, lat, lon, indptr, indices, length_km, speed_kmh):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.length_km = np.asarray(length_km, dtype=np.float32)
+        self.speed_kmh = np.asarray(speed_kmh, dtype=np.float32)
+        self._adjacency = None
+
+    @classmethod
+    def from_edges(cls, lat, lon, src, dst, speed_kmh=50.0, length_km=None, bidirectional=True):
+        """Build a graph from node coordinates and an edge list
+
+        length_km defaults to the straight-line length of each edge and
+        speed_kmh may be a scalar or one value per edge. Bidirectional edges
+        are added in both directions.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        if length_km is None:
+            length_km = DistanceEngine.haversine(lat[src], lon[src], lat[dst], lon[dst])
+        length_km = np.broadcast_to(np.asarray(length_km, dtype=np.float32), src.shape)
+        speed_kmh = np.broadcast_to(np.asarray(speed_kmh, dtype=np.float32), src.shape)
+
+        if bidirectional:
+            src, dst = np.concatenate((src, dst)), np.concatenate((dst, src))
+            length_km = np.concatenate((length_km, length_km))
+            speed_kmh = np.concatenate((speed_kmh, speed_kmh))
+
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(len(lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(lat)), out=indptr[1:])
+        return cls(lat, lon, indptr, dst[order], length_km[order], speed_kmh[order])
+
+    @classmethod
+    def from_osm(cls, path):
+        """Build a graph from the routable highways of an OSM XML extract
+
+        path may be a plain, .gz or .bz2 compressed .osm file. Every
+        consecutive pair of nodes on a way whose highway class is in
+        OSM_SPEEDS_KMH becomes an edge, two-way unless the way is tagged
+        oneway (motorways and roundabouts are one-way by default). Nodes no
+        such way uses are dropped.
+        """
+        import xml.etree.ElementTree as ET
+
+        opener = gzip.open if path.endswith(".gz") else bz2.open if path.endswith(".bz2") else open
+        node_index, lat, lon = {}, [], []
+        src, dst, speeds = [], [], []
+        with opener(path, "rb") as f:
+            for _, element in ET.iterparse(f):
+                if element.tag == "node":
+                    node_index[element.get("id")] = len(lat)
+                    lat.append(float(element.get("lat")))
+                    lon.append(float(element.get("lon")))
+                elif element.tag == "way":
+                    tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                    highway = tags.get("highway")
+                    if highway in OSM_SPEEDS_KMH:
+                        nodes = [node_index.get(nd.get("ref")) for nd in element.iter("nd")]
+                        # Skip segments touching nodes clipped out of the extract
+                        pairs = [(u, v) for u, v in zip(nodes[:-1], nodes[1:]) if u is not None and v is not None]
+                        speed = parse_maxspeed(tags.get("maxspeed")) or OSM_SPEEDS_KMH[highway]
+                        implied = "yes" if highway == "motorway" or tags.get("junction") == "roundabout" else "no"
+                        oneway = tags.get("oneway", implied)
+                        forward, backward = [u for u, _ in pairs], [v for _, v in pairs]
+                        if oneway == "-1":
+                            forward, backward = backward, forward
+                        src.extend(forward)
+                        dst.extend(backward)
+                        if oneway not in OSM_ONEWAY and oneway != "-1":
+                            src.extend(backward)
+                            dst.extend(forward)
+                        speeds.extend([speed] * (len(src) - len(speeds)))
+                elif element.tag != "relation":
+                    continue
+                element.clear()
+
+        # Renumber the nodes the roads use as 0..n-1
+        src, dst = np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64)
+        used, renumbered = np.unique(np.concatenate((src, dst)), return_inverse=True)
+        return cls.from_edges(np.array(lat)[used], np.array(lon)[used], renumbered[:len(src)],
+                              renumbered[len(src):], np.array(speeds, dtype=np.float32), bidirectional=False)
+
+    @classmethod
+    def grid(cls, origin_lat, origin_lon, rows, cols, spacing_km=1.0, speed_kmh=80.0):
+        """Synthetic rows x cols grid of two-way roads spacing_km apart (test fixture)"""
+        dlat = spacing_km / (np.pi * DistanceEngine.EARTH_RADIUS_KM / 180)
+        dlon = dlat / np.cos(np.radians(origin_lat))
+        row, col = np.divmod(np.arange(rows * cols), cols)
+        node = row * cols + col
+
+        right = node[col < cols - 1]
+        up = node[row < rows - 1]
+        src = np.concatenate((right, up))
+        dst = np.concatenate((right + 1, up + cols))
+        return cls.from_edges(origin_lat + row * dlat, origin_lon + col * dlon, src, dst, speed_kmh)
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph saved with save()"""
+        with np.load(path) as data:
+            return cls(*(data[name] for name in GRAPH_ARRAYS))
+
+    def save(self, path):
+        """Write the graph arrays to an .npz file"""
+        np.savez_compressed(path, **{name: getattr(self, name) for name in GRAPH_ARRAYS})
+
+    @property
+    def num_nodes(self):
+        return len(self.lat)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def edge_sources(self):
+        """Source node of every edge, aligned with indices"""
+        return np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+
+    def edge_midpoints(self):
+        """(num_edges, 2) lat/lon midpoint of every edge"""
+        src = self.edge_sources()
+        return np.column_stack(((self.lat[src] + self.lat[self.indices]) / 2,
+                                (self.lon[src] + self.lon[self.indices]) / 2))
+
+    def travel_minutes(self):
+        """Free-flow travel time of every edge in minutes"""
+        return self.length_km / self.speed_kmh * 60
+
+    def path_edges(self, path):
+        """Edge index of each consecutive node pair of a path"""
+        edges = []
+        for u, v in zip(path[:-1], path[1:]):
+            targets = self.indices[self.indptr[u]:self.indptr[u + 1]]
+            edges.append(self.indptr[u] + int(np.flatnonzero(targets == v)[0]))
+        return np.array(edges, dtype=np.int64)
+
+    def nearest_node(self, lat, lon):
+        """Index of the node closest to a position"""
+        return int(np.argmin(DistanceEngine.haversine(lat, lon, self.lat, self.lon)))
+
+    def shortest_path(self, source, target, edge_cost=None):
+        """A* search from source to target; returns (node list, total cost)
+
+        edge_cost holds one cost (minutes) per edge and defaults to the
+        free-flow travel time. Costs must not fall below the free-flow time,
+        which keeps the straight-line / top-speed heuristic admissible.
+        Returns ([], inf) when target is unreachable.
+        """
+        if self._adjacency is None:
+            # Plain lists make the inner loop several times faster than
+            # indexing NumPy arrays one scalar at a time
+            self._adjacency = (self.indptr.tolist(), self.indices.tolist(),
+                               self.lat.tolist(), self.lon.tolist())
+        indptr, indices, lat, lon = self._adjacency
+        cost = (self.travel_minutes() if edge_cost is None else np.asarray(edge_cost)).tolist()
+
+        minutes_per_km = 60 / float(self.speed_kmh.max()) if self.num_edges else 0.0
+        target_lat, target_lon = math.radians(lat[target]), math.radians(lon[target])
+        cos_target = math.cos(target_lat)
+
+        def heuristic(node):
+            node_lat, node_lon = math.radians(lat[node]), math.radians(lon[node])
+            a = (math.sin((target_lat - node_lat) / 2) ** 2 +
+                 math.cos(node_lat) * cos_target * math.sin((target_lon - node_lon) / 2) ** 2)
+            return 2 * DistanceEngine.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))) * minutes_per_km
+
+        best = {source: 0.0}
+        parent = {source: -1}
+        frontier = [(heuristic(source), 0.0, source)]
+        while frontier:
+            _, so_far, node = heapq.heappop(frontier)
+            if node == target:
+                path = [node]
+                while parent[path[-1]] != -1:
+                    path.append(parent[path[-1]])
+                return path[::-1], so_far
+            if so_far > best[node]:
+                continue  # stale queue entry
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbour = indices[edge]
+                candidate = so_far + cost[edge]
+                if candidate < best.get(neighbour, math.inf):
+                    best[neighbour] = candidate
+                    parent[neighbour] = node
+                    heapq.heappush(frontier, (candidate + heuristic(neighbour), candidate, neighbour))
+        return [], math.inf
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert an OSM extract, or write a synthetic grid (test "
+                                                 "fixture), to a road graph file")
+    parser.add_argument("path", help="output .npz file")
+    parser.add_argument("--osm", help="OSM XML extract (.osm, .osm.gz or .osm.bz2) to convert instead of a grid")
+    parser.add_argument("--origin", type=float, nargs=2, default=(32.5, -124.5), metavar=("LAT", "LON"))
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--cols", type=int, default=200)
+    parser.add_argument("--spacing-km", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.osm:
+        graph = RoadGraph.from_osm(args.osm)
+    else:
+        graph = RoadGraph.grid(args.origin[0], args.origin[1], args.rows, args.cols, args.spacing_km)
+    graph.save(args.path)
+    print(f"Wrote {graph.num_nodes} nodes and {graph.num_edges} edges to {args.path}")
@@ -0,0 +1,232 @@
+import numpy as np
+
+from .config import Config
+from .geo import DistanceEngine, Polyline
+
+# Spatial index over hazard zones
+class HazardIndex:
+    """Geohash-style bucket grid over one list of hazard zones.
+
+    Zones are hashed into lat/lon cells about cell_km on a side and stored
+    sorted by cell key, so a radius query only looks at the cells its circle
+    overlaps and its cost grows with local zone density rather than with the
+    total zone count. The index holds geometry only, so it is built once when
+    the zones are generated and stays valid when their intensities change.
+    """
+    KM_PER_DEG_LAT = np.pi * DistanceEngine.EARTH_RADIUS_KM / 180
+
+    def __init__(self, zones, cell_km=25):
+        """Bucket the zones into a grid of cell_km cells"""
+        self.cell_km = cell_km
+        if zones:
+            lat, lon, _ = DistanceEngine.zone_arrays(zones)
+        else:
+            lat = lon = np.empty(0)
+
+        # Cells are cell_km tall; longitude cells are sized at the highest
+        # zone latitude so every cell holding a zone is at least cell_km wide
+        self.cell_lat = cell_km / self.KM_PER_DEG_LAT
+        ref_lat = min(89.0, float(np.abs(lat).max()) + self.cell_lat) if len(lat) else 0.0
+        self.cell_lon = self.cell_lat / np.cos(np.radians(ref_lat))
+        self.n_cols = int(np.ceil(360 / self.cell_lon))
+
+        keys = self._cell_keys(lat, lon)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.zone_ids = order
+        self.lat = lat[order]
+        self.lon = lon[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _cell_rows_cols(self, lat, lon):
+        rows = np.floor((np.asarray(lat, dtype=np.float64) + 90) / self.cell_lat).astype(np.int64)
+        cols = np.floor((np.asarray(lon, dtype=np.float64) + 180) / self.cell_lon).astype(np.int64) % self.n_cols
+        return rows, cols
+
+    def _cell_keys(self, lat, lon):
+        rows, cols = self._cell_rows_cols(lat, lon)
+        return rows * self.n_cols + cols
+
+    def query_radius_many(self, lats, lons, radius_km):
+        """Return (point_idx, zone_idx, distance_km) for every zone within radius_km of each point.
+
+        zone_idx refers to positions in the zone list the index was built from.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        point_idx, slots, dist = self._query_slots(lats, lons, radius_km)
+        return point_idx, self.zone_ids[slots], dist
+
+    def _query_slots(self, lats, lons, radius_km):
+        """query_radius_many with zones given by their position in the sorted index"""
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+        if not len(self) or not len(lats):
+            return empty
+
+        # Number of cells the query circle can span in each direction. The
+        # longitude half-width of a spherical cap is asin(sin(d) / cos(lat)),
+        # evaluated at the most poleward latitude the circle reaches.
+        dlat = radius_km / self.KM_PER_DEG_LAT
+        row_rings = int(np.ceil(dlat / self.cell_lat))
+        max_lat = min(90.0, float(np.abs(lats).max()) + dlat)
+        sin_ratio = np.sin(radius_km / DistanceEngine.EARTH_RADIUS_KM) / max(np.cos(np.radians(max_lat)), 1e-12)
+        if sin_ratio >= 1:
+            col_rings = self.n_cols // 2
+        else:
+            col_rings = min(self.n_cols // 2, int(np.ceil(np.degrees(np.arcsin(sin_ratio)) / self.cell_lon)))
+
+        rows, cols = self._cell_rows_cols(lats, lons)
+        d_rows, d_cols = np.meshgrid(np.arange(-row_rings, row_rings + 1),
+                                     np.unique(np.arange(-col_rings, col_rings + 1) % self.n_cols),
+                                     indexing="ij")
+        cell_keys = ((rows[:, None] + d_rows.ravel()[None, :]) * self.n_cols +
+                     (cols[:, None] + d_cols.ravel()[None, :]) % self.n_cols)
+
+        # Expand each searched cell into the run of zones stored under its key
+        starts = np.searchsorted(self.keys, cell_keys, side="left").ravel()
+        counts = np.searchsorted(self.keys, cell_keys, side="right").ravel() - starts
+        total = int(counts.sum())
+        if total == 0:
+            return empty
+        point_idx = np.repeat(np.repeat(np.arange(len(lats)), cell_keys.shape[1]), counts)
+        run_offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        slots = np.repeat(starts, counts) + run_offsets
+
+        dist = DistanceEngine.haversine(lats[point_idx], lons[point_idx], self.lat[slots], self.lon[slots])
+        hit = dist < radius_km
+        return point_idx[hit], slots[hit], dist[hit]
+
+    def query_radius(self, lat, lon, radius_km):
+        """Return (zone_idx, distance_km) for all zones within radius_km of a point"""
+        _, zone_idx, dist = self.query_radius_many([lat], [lon], radius_km)
+        return zone_idx, dist
+
+    def sum_within(self, lats, lons, radius_km, weights):
+        """Per point, the sum of weights[zone] over zones within radius_km"""
+        point_idx, zone_idx, _ = self.query_radius_many(lats, lons, radius_km)
+        return np.bincount(point_idx, weights=np.asarray(weights, dtype=np.float64)[zone_idx],
+                           minlength=len(np.atleast_1d(lats)))
+
+    def sum_within_dense(self, lats, lons, radius_km, weights):
+        """sum_within for points packed around one place, as one matrix product
+
+        One index query gathers every zone within radius_km of any point,
+        then all point/zone pairs are tested at once: two places are closer
+        than d exactly when their unit vectors' dot product exceeds
+        cos(d / R). Faster than sum_within when the points share most of
+        their zones, as the exit candidates around a start do.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        if not len(self) or not len(lats):
+            return np.zeros(len(lats))
+        centre_lat, centre_lon = float(lats.mean()), float(lons.mean())
+        reach_km = float(DistanceEngine.haversine(centre_lat, centre_lon, lats, lons).max())
+        _, slots, _ = self._query_slots(np.array([centre_lat]), np.array([centre_lon]), reach_km + radius_km)
+        if not len(slots):
+            return np.zeros(len(lats))
+
+        near = (DistanceEngine.unit_vectors(lats, lons) @ DistanceEngine.unit_vectors(self.lat[slots], self.lon[slots]).T >
+                np.cos(radius_km / DistanceEngine.EARTH_RADIUS_KM))
+        return near @ np.asarray(weights, dtype=np.float64)[self.zone_ids[slots]]
+
+    def nearest(self, lat, lon):
+        """Return (zone_idx, distance_km) of the closest zone, or (None, inf) if empty"""
+        if not len(self):
+            return None, float('inf')
+
+        # Grow an exact radius query until it catches at least one zone
+        radius_km = self.cell_km
+        while radius_km < np.pi * DistanceEngine.EARTH_RADIUS_KM:
+            zone_idx, dist = self.query_radius(lat, lon, radius_km)
+            if len(zone_idx):
+                best = int(np.argmin(dist))
+                return int(zone_idx[best]), float(dist[best])
+            radius_km *= 2
+
+        dist = DistanceEngine.haversine(lat, lon, self.lat, self.lon)
+        best = int(np.argmin(dist))
+        return int(self.zone_ids[best]), float(dist[best])
+
+# Road exposure to hazard zones
+class RouteExposure:
+    """Road length inside each zone's circle and clearance to it, per route.
+
+    Route polylines are split into segments of at most
+    Config.EXPOSURE_SEGMENT_KM and every segment is paired (through the
+    spatial index) with the zones whose circles could come within buffer_km
+    of it. For each pair the segment length L, the position t of the zone
+    centre's projection along the segment and its perpendicular offset h are
+    kept in a local flat-earth frame (km), so exposure can be recomputed for
+    any zone radii up to max_radius_km without another spatial search. Cost
+    follows the road length, not the number of points describing it.
+    """
+    def __init__(self, routes, hazard_index, buffer_km, max_radius_km):
+        self.n_routes = len(routes)
+        self.buffer_km = buffer_km
+
+        paths = [Polyline.densify(Polyline.route_path(route), Config.EXPOSURE_SEGMENT_KM) for route in routes]
+        seg_start = np.concatenate([path[:-1] for path in paths])
+        seg_end = np.concatenate([path[1:] for path in paths])
+        seg_route = np.repeat(np.arange(len(paths)), [max(len(path) - 1, 0) for path in paths])
+
+        # A zone can only matter if its centre lies within reach of the
+        # segment midpoint: half the segment plus the buffer plus the radius
+        mid = (seg_start + seg_end) / 2
+        half_length = DistanceEngine.haversine(seg_start[:, 0], seg_start[:, 1], seg_end[:, 0], seg_end[:, 1]) / 2
+        reach = (half_length.max() if len(half_length) else 0.0) + buffer_km + max_radius_km
+        seg_idx, self.zone_idx, _ = hazard_index.query_radius_many(mid[:, 0], mid[:, 1], reach)
+        self.route_idx = seg_route[seg_idx]
+
+        # Local equirectangular frame anchored at each segment start
+        a, b = seg_start[seg_idx], seg_end[seg_idx]
+        zone_lat, zone_lon = np.empty(len(hazard_index)), np.empty(len(hazard_index))
+        zone_lat[hazard_index.zone_ids], zone_lon[hazard_index.zone_ids] = hazard_index.lat, hazard_index.lon
+        zone_lat, zone_lon = zone_lat[self.zone_idx], zone_lon[self.zone_idx]
+        km_lat = HazardIndex.KM_PER_DEG_LAT
+        km_lon = km_lat * np.cos(np.radians(a[:, 0]))
+        dx, dy = (b[:, 1] - a[:, 1]) * km_lon, (b[:, 0] - a[:, 0]) * km_lat
+        px, py = (zone_lon - a[:, 1]) * km_lon, (zone_lat - a[:, 0]) * km_lat
+
+        self.length = np.hypot(dx, dy)
+        safe_length = np.where(self.length > 0, self.length, 1.0)
+        self.along = np.where(self.length > 0, (px * dx + py * dy) / safe_length, 0.0)
+        self.offset = np.where(self.length > 0, np.abs(dx * py - dy * px) / safe_length, np.hypot(px, py))
+
+        # (route, zone) groups for aggregating over segments
+        n_zones = len(hazard_index)
+        self.groups, self.pair_group = np.unique(self.route_idx * max(n_zones, 1) + self.zone_idx,
+                                                 return_inverse=True)
+        self.group_route = self.groups // max(n_zones, 1)
+        self.group_zone = self.groups % max(n_zones, 1)
+
+    def exposure(self, radius_km):
+        """Per (route, zone) group: km of road inside the circle and minimum clearance (km)
+
+        radius_km holds one radius per zone, indexed like the hazard index.
+        """
+        radius = np.asarray(radius_km, dtype=np.float64)[self.zone_idx]
+
+        # Chord of the circle on the segment's line, clipped to the segment
+        half_chord = np.sqrt(np.maximum(radius ** 2 - self.offset ** 2, 0.0))
+        inside = (np.clip(self.along + half_chord, 0, self.length) -
+                  np.clip(self.along - half_chord, 0, self.length))
+        inside = np.where(self.offset < radius, inside, 0.0)
+
+        # Distance from the zone centre to the nearest point of the segment
+        beyond = self.along - np.clip(self.along, 0, self.length)
+        clearance = np.maximum(np.hypot(self.offset, beyond) - radius, 0.0)
+
+        exposed_km = np.bincount(self.pair_group, weights=inside, minlength=len(self.groups))
+        min_clearance = np.full(len(self.groups), np.inf)
+        np.minimum.at(min_clearance, self.pair_group, clearance)
+        return exposed_km, min_clearance
+
+    def scores(self, radius_km, intensity):
+        """Per route, sum over zones of intensity * (exposed km + proximity within the buffer)"""
+        exposed_km, min_clearance = self.exposure(radius_km)
+        proximity = np.maximum(0.0, 1 - min_clearance / self.buffer_km)
+        terms = np.asarray(intensity, dtype=np.float64)[self.group_zone] * (exposed_km + proximity)
+        return np.bincount(self.group_route, weights=terms, minlength=self.n_routes)
@@ -0,0 +1,460 @@
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from .cache import ResponseCache, shared_resource
+from .config import Config
+from .geo import DistanceEngine, Polyline
+from .processing import DataProcessor
+from .spatial import HazardIndex
+from .zones import ZoneSet
+
+KINDS = ("snow", "fire", "rain")
+
+# A region directory holds a lock file, a pointer to the published version
+# and that version's directory of levels, zones and manifest
+LOCK = ".lock"
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"
+ZONES = "zones.npz"
+
+# Precomputed hazard proximity over a region
+class SafetyRaster:
+    """Hazard proximity sums on a grid, as a pyramid of memory-mapped tiles.
+
+    For each hazard type the finest level holds, at every grid node, the
+    sum of base zone intensities within the EXIT_HAZARD_RULES threshold
+    (what suggest_safe_exits adds up at an exit), and the sum over the
+    zones whose circle contains the node at the radius the intensity
+    sliders give at factors 0, 0.5 and 1 (what select_best_route adds up
+    per km of road inside zones). The values do not depend on the sliders,
+    so lookups apply the rule weights and factors as HazardScoreCache does.
+    Each coarser level halves the resolution with a [1 2 1] / 4 filter.
+
+    The raster is a side channel for point and path queries (the /safety
+    endpoints of route_avoider.py); the scoring pipeline keeps computing
+    exact proximity. Its zones are those of the last trip scored in the
+    region, a background build behind, and bilinear lookups smooth each
+    threshold and circle edge over a cell (see exit_impacts), where route
+    ranking and exit selection need exact decisions.
+
+    Levels are .npy files under Config.TILE_DIR, opened with mmap, so
+    processes serving the same region share one copy through the page
+    cache and a lookup reads a few pages whatever the number of zones.
+    update() rebuilds only the tiles within reach of zones that were added,
+    removed or changed since the last build. Published versions are never
+    written to: an update copies the levels into a new version directory,
+    rebuilds tiles there and swaps the CURRENT pointer to it, so readers
+    keep sampling the version they mapped. An exclusive file lock
+    serialises updates across processes and opens wait for it.
+    """
+    # Slider factors the inside sums are stored at; the channels are the
+    # exit sums of each hazard type, then its inside sums at each factor
+    INSIDE_FACTORS = (0.0, 0.5, 1.0)
+    EXIT, INSIDE = 0, 3
+    CHANNELS = 3 + 3 * len(INSIDE_FACTORS)
+
+    @staticmethod
+    def region(bbox, step_deg=None):
+        """bbox widened outward to multiples of step_deg (Config.TILE_REGION_DEG)
+
+        Nearby trips then share a region, and its raster, instead of each
+        opening one for its own bounding box.
+        """
+        step = step_deg or Config.TILE_REGION_DEG
+        south, west, north, east = (float(value) for value in bbox)
+        return (float(np.floor(south / step) * step), float(np.floor(west / step) * step),
+                float(np.ceil(north / step) * step), float(np.ceil(east / step) * step))
+
+    def __init__(self, bbox, directory=None, cell_km=None, tile_cells=None, levels=None):
+        """Open the raster of a (min_lat, min_lon, max_lat, max_lon) region; empty until its first update"""
+        self.cell_km = cell_km or Config.TILE_CELL_KM
+        self.tile_cells = tile_cells or Config.TILE_CELLS
+        self.n_levels = levels or Config.TILE_LEVELS
+        if self.tile_cells % 2 ** (self.n_levels - 1):
+            raise ValueError("tile_cells must be divisible by 2 ** (levels - 1)")
+        south, west, north, east = (float(value) for value in bbox)
+        self.bbox = [south, west, north, east]
+        self.directory = directory or os.path.join(
+            Config.TILE_DIR, ResponseCache.content_key(bbox, self.cell_km, self.tile_cells, self.n_levels))
+
+        # Node (0, 0) is the south-west corner; columns are cell_km apart at
+        # the middle latitude
+        self.south, self.west = south, west
+        self.dlat = self.cell_km / HazardIndex.KM_PER_DEG_LAT
+        self.dlon = self.dlat / np.cos(np.radians((south + north) / 2))
+        self.tile_rows = int(np.ceil((north - south) / self.dlat / self.tile_cells)) or 1
+        self.tile_cols = int(np.ceil((east - west) / self.dlon / self.tile_cells)) or 1
+        self.shape = (self.tile_rows * self.tile_cells, self.tile_cols * self.tile_cells)
+
+        # update_async state: the zone records waiting for the builder, the
+        # content key of the last submitted ones and the Future building them
+        self._queue_lock = threading.Lock()
+        self._queued = None
+        self._queued_key = None
+        self._future = None
+
+        self._published = None
+        with self._file_lock(shared=True):
+            self._load()
+
+    @staticmethod
+    def _lock(directory, shared=False, blocking=True):
+        """Lock a region directory across threads and processes; returns a release function
+
+        Returns None instead when blocking is False and the lock is held.
+        Uses flock where fcntl exists; elsewhere the lock file is created
+        exclusively while held, and shared locks are exclusive.
+        """
+        lock_path = os.path.join(directory, LOCK)
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+
+        while True:
+            os.makedirs(directory, exist_ok=True)
+            if fcntl is None:
+                try:
+                    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT | os.O_EXCL)
+                except FileExistsError:
+                    if not blocking:
+                        return None
+                    time.sleep(0.01)
+                    continue
+
+                def release():
+                    os.close(fd)
+                    try:
+                        os.remove(lock_path)
+                    except OSError:
+                        pass
+                return release
+
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB))
+                # prune() may have removed the directory while we waited
+                if os.path.exists(lock_path) and os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                    return lambda: os.close(fd)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Hold a shared or exclusive lock on the region directory"""
+        release = self._lock(self.directory, shared)
+        try:
+            yield
+        finally:
+            release()
+
+    def _load(self):
+        """Map the published version, or empty levels if there is none (lock held)"""
+        try:
+            with open(os.path.join(self.directory, CURRENT)) as f:
+                published = f.read().strip()
+            with open(os.path.join(self.directory, published, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            published = manifest = None
+        if published is not None and published == self._published:
+            return
+
+        if manifest is not None and manifest.get("shape") == list(self.shape):
+            levels = [np.load(os.path.join(self.directory, published, f"level_{level}.npy"), mmap_mode="r")
+                      for level in range(self.n_levels)]
+            with np.load(os.path.join(self.directory, published, ZONES)) as zones:
+                self.zones = {kind: zones[kind] for kind in KINDS}
+        else:
+            published = None
+            manifest = {"bbox": self.bbox, "shape": list(self.shape), "version": 0}
+            levels = [np.zeros((self.CHANNELS, self.shape[0] >> level, self.shape[1] >> level), dtype=np.float32)
+                      for level in range(self.n_levels)]
+            self.zones = {kind: np.empty((0, 4)) for kind in KINDS}
+        self.levels, self.manifest, self._published = levels, manifest, published
+
+    @property
+    def version(self):
+        """Number of updates built into the raster; 0 until the first one completes"""
+        return self.manifest["version"]
+
+    @staticmethod
+    @shared_resource
+    def builder():
+        """Background thread running raster updates in the order they were submitted"""
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="tiles")
+
+    @staticmethod
+    def _records(snow_zones, fire_zones, rain_zones):
+        """{kind: (n, 4) lat, lon, intensity, radius} of zones at their base intensity and radius"""
+        zone_sets = [ZoneSet.coerce(zones) for zones in (snow_zones, fire_zones, rain_zones)]
+        return {kind: np.column_stack((zones.lat, zones.lon, zones.intensity, zones.radius)).astype(np.float64)
+                for kind, zones in zip(KINDS, zone_sets)}
+
+    def update_async(self, snow_zones, fire_zones, rain_zones):
+        """Run update() on the background builder; returns its Future
+
+        Zones with the content of the last submitted ones are not built
+        again, and zones submitted while an update is still queued replace
+        its zones and share its Future, so a region is rebuilt at most once
+        per builder turn whatever the request rate.
+        """
+        records = self._records(snow_zones, fire_zones, rain_zones)
+        key = ResponseCache.content_key(records)
+        with self._queue_lock:
+            if key == self._queued_key:
+                return self._future
+            self._queued_key = key
+            if self._queued is None:
+                self._future = SafetyRaster.builder().submit(self._build_queued)
+            self._queued = records
+            return self._future
+
+    def _build_queued(self):
+        with self._queue_lock:
+            records, self._queued = self._queued, None
+        return self._build(records)
+
+    def update(self, snow_zones, fire_zones, rain_zones):
+        """Rebuild the tiles the zone changes since the last update reach; returns their number
+
+        Zones are taken at their base intensity and radius, as generated.
+        """
+        return self._build(self._records(snow_zones, fire_zones, rain_zones))
+
+    def _build(self, records):
+        with self._file_lock():
+            # Start from the latest version, whichever process published it
+            self._load()
+            changed = {kind: self._changed(self.zones[kind], records[kind]) for kind in KINDS}
+            if self.version and not any(len(kind_changes) for kind_changes in changed.values()):
+                return 0
+            dirty = np.zeros((self.tile_rows, self.tile_cols), dtype=bool)
+            for kind in KINDS:
+                dirty |= self._dirty_tiles(changed[kind], kind)
+
+            # Build the next version beside the published one
+            version = self.version + 1
+            name = f"v{version:06d}"
+            staging = os.path.join(self.directory, name + ".tmp")
+            for leftover in (staging, os.path.join(self.directory, name)):
+                shutil.rmtree(leftover, ignore_errors=True)
+            os.makedirs(staging)
+            levels = []
+            for level in range(self.n_levels):
+                path = os.path.join(staging, f"level_{level}.npy")
+                if self._published is None:
+                    levels.append(np.lib.format.open_memmap(path, mode="w+", dtype=np.float32,
+                                                            shape=self.levels[level].shape))
+                else:
+                    shutil.copyfile(os.path.join(self.directory, self._published, f"level_{level}.npy"), path)
+                    levels.append(np.load(path, mmap_mode="r+"))
+
+            zone_sets = [ZoneSet(kind.title(), *records[kind].T) for kind in KINDS]
+            indexes = {kind: HazardIndex(zones) for kind, zones in zip(KINDS, zone_sets)}
+            tiles = np.argwhere(dirty)
+            for tile_row, tile_col in tiles:
+                rows = (tile_row * self.tile_cells, (tile_row + 1) * self.tile_cells)
+                cols = (tile_col * self.tile_cells, (tile_col + 1) * self.tile_cells)
+                levels[0][:, rows[0]:rows[1], cols[0]:cols[1]] = self._tile_values(rows, cols, zone_sets, indexes)
+
+                # Coarse nodes whose [1 2 1] support overlaps the rebuilt rows and columns
+                for level in range(1, self.n_levels):
+                    rows = (rows[0] // 2, min(rows[1] // 2 + 1, levels[level].shape[1]))
+                    cols = (cols[0] // 2, min(cols[1] // 2 + 1, levels[level].shape[2]))
+                    levels[level][:, rows[0]:rows[1], cols[0]:cols[1]] = self._downsample(
+                        levels[level - 1], rows, cols)
+
+            for level in levels:
+                level.flush()
+            del levels
+            np.savez(os.path.join(staging, ZONES), **records)
+            manifest = dict(self.manifest, version=version, updated_at=time.time(), tiles_rebuilt=len(tiles))
+            with open(os.path.join(staging, MANIFEST), "w") as f:
+                json.dump(manifest, f, indent=2)
+
+            # Publish: the renames are atomic, so CURRENT always names a complete version
+            os.rename(staging, os.path.join(self.directory, name))
+            with open(os.path.join(self.directory, CURRENT + ".tmp"), "w") as f:
+                f.write(name)
+            os.replace(os.path.join(self.directory, CURRENT + ".tmp"), os.path.join(self.directory, CURRENT))
+            self._load()
+
+            # Earlier versions stay readable through existing maps after removal
+            for entry in os.listdir(self.directory):
+                if entry not in (LOCK, CURRENT, name):
+                    shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+            return len(tiles)
+
+    @staticmethod
+    def prune(root=None, keep=None):
+        """Remove all but the keep (Config.TILE_MAX_REGIONS) most recently updated region directories
+
+        Regions being updated are skipped; rasters open on a removed region
+        keep reading the version they mapped and start over on their next
+        update.
+        """
+        root = root or Config.TILE_DIR
+        keep = Config.TILE_MAX_REGIONS if keep is None else keep
+        try:
+            entries = [os.path.join(root, entry) for entry in os.listdir(root)]
+        except OSError:
+            return []
+
+        def updated_at(directory):
+            try:
+                return os.stat(os.path.join(directory, CURRENT)).st_mtime
+            except OSError:
+                return os.stat(directory).st_mtime
+        regions = sorted((entry for entry in entries if os.path.isdir(entry)), key=updated_at, reverse=True)
+
+        removed = []
+        for directory in regions[keep:]:
+            try:
+                release = SafetyRaster._lock(directory, blocking=False)
+            except OSError:
+                continue
+            if release is None:
+                continue
+            try:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed.append(directory)
+            finally:
+                release()
+        return removed
+
+    @staticmethod
+    def _changed(old, new):
+        """(lat, lon, intensity, radius) records in only one of old and new"""
+        def rows(records):
+            records = np.ascontiguousarray(records)
+            return records.view(np.dtype((np.void, records.dtype.itemsize * records.shape[1]))).ravel()
+        old_rows, new_rows = rows(old), rows(new)
+        return np.concatenate((old[~np.isin(old_rows, new_rows)], new[~np.isin(new_rows, old_rows)]))
+
+    def _dirty_tiles(self, records, kind):
+        """(tile_rows, tile_cols) mask of the tiles holding a node within reach of any of the records"""
+        if not len(records):
+            return np.zeros((self.tile_rows, self.tile_cols), dtype=bool)
+        # A zone reaches the exit threshold and its own largest circle
+        reach_km = np.maximum(Config.EXIT_HAZARD_RULES[kind][0],
+                              records[:, 3] * float(DataProcessor.radius_factor(1)) / 1000)
+        reach_rows = reach_km / self.cell_km
+        reach_cols = reach_rows * self.dlat / self.dlon / np.cos(np.radians(records[:, 0]))
+        row = (records[:, 0] - self.south) / self.dlat
+        col = (records[:, 1] - self.west) / self.dlon
+
+        # Mark each record's range of tiles in a 2-D difference array
+        first_row = np.clip(np.floor((row - reach_rows) / self.tile_cells), 0, self.tile_rows).astype(np.int64)
+        last_row = np.clip(np.floor((row + reach_rows) / self.tile_cells), -1, self.tile_rows - 1).astype(np.int64)
+        first_col = np.clip(np.floor((col - reach_cols) / self.tile_cells), 0, self.tile_cols).astype(np.int64)
+        last_col = np.clip(np.floor((col + reach_cols) / self.tile_cells), -1, self.tile_cols - 1).astype(np.int64)
+        inside = (first_row <= last_row) & (first_col <= last_col)
+        marks = np.zeros((self.tile_rows + 1, self.tile_cols + 1), dtype=np.int64)
+        for rows, cols, sign in ((first_row, first_col, 1), (first_row, last_col + 1, -1),
+                                 (last_row + 1, first_col, -1), (last_row + 1, last_col + 1, 1)):
+            np.add.at(marks, (rows[inside], cols[inside]), sign)
+        return marks.cumsum(axis=0).cumsum(axis=1)[:-1, :-1] > 0
+
+    def _tile_values(self, rows, cols, zone_sets, indexes):
+        """(CHANNELS, rows, cols) values of the nodes in a block of the finest level"""
+        node_lat = self.south + np.arange(*rows) * self.dlat
+        node_lon = self.west + np.arange(*cols) * self.dlon
+        lat, lon = (grid.ravel() for grid in np.meshgrid(node_lat, node_lon, indexing="ij"))
+        values = np.zeros((self.CHANNELS, len(lat)))
+        scales = [float(DataProcessor.radius_factor(factor)) for factor in self.INSIDE_FACTORS]
+        for column, (kind, zones) in enumerate(zip(KINDS, zone_sets)):
+            if not len(zones):
+                continue
+            threshold_km = Config.EXIT_HAZARD_RULES[kind][0]
+            radius_km = zones.radius.astype(np.float64) / 1000
+            point_idx, zone_idx, dist = indexes[kind].query_radius_many(
+                lat, lon, max(threshold_km, float(radius_km.max()) * max(scales)))
+            intensity = zones.intensity.astype(np.float64)[zone_idx]
+            near = dist < threshold_km
+            values[self.EXIT + column] = np.bincount(point_idx[near], intensity[near], minlength=len(lat))
+            for step, scale in enumerate(scales):
+                near = dist < radius_km[zone_idx] * scale
+                values[self.INSIDE + 3 * step + column] = np.bincount(point_idx[near], intensity[near],
+                                                                      minlength=len(lat))
+        return values.reshape(self.CHANNELS, rows[1] - rows[0], cols[1] - cols[0]).astype(np.float32)
+
+    @staticmethod
+    def _downsample(fine, rows, cols):
+        """Coarse nodes rows x cols of a node-aligned [1 2 1] / 4 decimation of a finer level"""
+        taps = np.array([-1, 0, 1])
+        weights = np.array([0.25, 0.5, 0.25])
+        fine_rows = np.clip(2 * np.arange(*rows)[:, None] + taps, 0, fine.shape[1] - 1)
+        fine_cols = np.clip(2 * np.arange(*cols)[:, None] + taps, 0, fine.shape[2] - 1)
+        block = np.asarray(fine[:, fine_rows[:, :, None, None], fine_cols[None, None, :, :]], dtype=np.float64)
+        return np.einsum("krajb,a,b->krj", block, weights, weights).astype(np.float32)
+
+    def sample(self, channels, lat, lon, level=0):
+        """(len(channels), n) bilinear values at points; NaN outside the region"""
+        grid = self.levels[level]
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        y = (lat - self.south) / (self.dlat * 2 ** level)
+        x = (lon - self.west) / (self.dlon * 2 ** level)
+        # The tolerance keeps nodes on the north and east edges inside despite rounding
+        inside = (y >= -1e-9) & (y <= grid.shape[1] - 1 + 1e-9) & (x >= -1e-9) & (x <= grid.shape[2] - 1 + 1e-9)
+
+        y0 = np.clip(np.floor(y), 0, grid.shape[1] - 2).astype(np.int64)
+        x0 = np.clip(np.floor(x), 0, grid.shape[2] - 2).astype(np.int64)
+        fy, fx = np.clip(y - y0, 0, 1), np.clip(x - x0, 0, 1)
+        channels = np.asarray(channels)[:, None]
+        values = ((grid[channels, y0, x0] * (1 - fx) + grid[channels, y0, x0 + 1] * fx) * (1 - fy) +
+                  (grid[channels, y0 + 1, x0] * (1 - fx) + grid[channels, y0 + 1, x0 + 1] * fx) * fy)
+        return np.where(inside, values, np.nan)
+
+    def exit_impacts(self, lat, lon, snow_factor, fire_factor, rain_factor, level=0):
+        """(n, 3) snow, fire and rain impacts at points, as suggest_safe_exits computes them for exits
+
+        Exact at the nodes of the finest level. Between nodes the bilinear
+        lookup blends the sums of the cell's four corners, so a zone whose
+        threshold circle passes through the cell counts there with a weight
+        between 0 and 1 instead of all or nothing: a point just outside a
+        zone's threshold can pick up most of its impact. The error in a
+        hazard type's column is at most weight * factor ** 2 times the
+        summed intensity of the zones whose distance to the point lies
+        within the cell diagonal of the threshold. Coarser levels widen
+        that band by the reach of their filter, 2 ** level cells per side.
+        path_risk has the same bound at the zone circle edges.
+        """
+        factors = np.array([snow_factor, fire_factor, rain_factor])
+        weights = np.array([Config.EXIT_HAZARD_RULES[kind][1] for kind in KINDS]) * factors ** 2
+        return self.sample(self.EXIT + np.arange(3), lat, lon, level).T * weights
+
+    def path_risk(self, points, snow_factor, fire_factor, rain_factor, level=0):
+        """Hazard risk along an (n, 2) lat/lon path; NaN if it leaves the region
+
+        Sums weight * factor * intensity * factor per km of the path inside
+        zones at the sliders' radius, the part of select_best_route's score
+        that grows with road length; its bonus for passing near a zone is
+        taken once per zone, which a sum over the path cannot express.
+        Factors between INSIDE_FACTORS interpolate the stored sums.
+        """
+        points = Polyline.resample(points, self.cell_km * 2 ** level)
+        if len(points) < 2:
+            return 0.0
+        km = DistanceEngine.haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+        mid_lat, mid_lon = (points[:-1, 0] + points[1:, 0]) / 2, (points[:-1, 1] + points[1:, 1]) / 2
+        inside = (self.sample(self.INSIDE + np.arange(3 * len(self.INSIDE_FACTORS)), mid_lat, mid_lon, level) @
+                  km).reshape(len(self.INSIDE_FACTORS), 3)
+        factors = np.array([snow_factor, fire_factor, rain_factor])
+        inside = np.array([np.interp(factor, self.INSIDE_FACTORS, inside[:, column])
+                           for column, factor in enumerate(factors)])
+        weights = np.array([Config.ROUTE_HAZARD_RULES[kind][1] for kind in KINDS]) * factors ** 2
+        return float(inside @ weights)
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Columnar hazard zone storage
+class ZoneSet:
+    """Hazard zones stored as contiguous arrays (struct of arrays).
+
+    Positions are float64, intensities and radii float32. Zone names are not
+    stored; they are derived from the label and position on demand, e.g.
+    "Snow Zone 12". Indexing or iterating yields the legacy dict records.
+    """
+    def __init__(self, label, lat, lon, intensity, radius):
+        self.label = label
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.intensity = np.ascontiguousarray(intensity, dtype=np.float32)
+        self.radius = np.ascontiguousarray(radius, dtype=np.float32)
+        self.adjusted_intensity = None
+        self.adjusted_radius = None
+
+    @classmethod
+    def from_records(cls, zones, label=None):
+        """Build a ZoneSet from a list of zone dicts"""
+        if label is None:
+            label = zones[0]["name"].rsplit(" ", 1)[0] if zones and "name" in zones[0] else "Zone"
+        zone_set = cls(label,
+                       [zone["lat"] for zone in zones],
+                       [zone["lon"] for zone in zones],
+                       [zone["intensity"] for zone in zones],
+                       [zone.get("radius", 0) for zone in zones])
+        if zones and "adjusted_intensity" in zones[0]:
+            zone_set.adjusted_intensity = np.asarray([zone["adjusted_intensity"] for zone in zones], dtype=np.float32)
+            zone_set.adjusted_radius = np.asarray([zone["adjusted_radius"] for zone in zones], dtype=np.float32)
+        return zone_set
+
+    @staticmethod
+    def coerce(zones, label=None):
+        """Return zones as a ZoneSet, converting a list of dicts if needed"""
+        # Duck-typed: when Streamlit reloads a changed module, a ZoneSet kept
+        # in st.session_state belongs to an earlier class object
+        if hasattr(zones, "effective_intensity"):
+            return zones
+        return ZoneSet.from_records(zones or [], label)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, i):
+        record = {
+            "lat": float(self.lat[i]),
+            "lon": float(self.lon[i]),
+            "intensity": float(self.intensity[i]),
+            "radius": float(self.radius[i]),
+            "name": self.name(i)
+        }
+        if self.adjusted_intensity is not None:
+            record["adjusted_intensity"] = float(self.adjusted_intensity[i])
+            record["adjusted_radius"] = float(self.adjusted_radius[i])
+        return record
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def name(self, i):
+        """Name of the zone at position i"""
+        return f"{self.label} {i + 1}"
+
+    @property
+    def names(self):
+        return [self.name(i) for i in range(len(self))]
+
+    @property
+    def effective_intensity(self):
+        """Adjusted intensity if a factor has been applied, else the base intensity"""
+        return self.intensity if self.adjusted_intensity is None else self.adjusted_intensity
+
+    @property
+    def effective_radius(self):
+        """Adjusted radius (m) if a factor has been applied, else the base radius"""
+        return self.radius if self.adjusted_radius is None else self.adjusted_radius
+
+    def to_frame(self):
+        """Columns for map layers: position, radius, base intensity, 0-255 alpha and name"""
+        import pandas as pd
+
+        return pd.DataFrame({
+            "lat": self.lat,
+            "lon": self.lon,
+            "radius": self.effective_radius,
+            "intensity": self.intensity,
+            "alpha": (255 * np.clip(self.effective_intensity, 0, 1)).astype(np.uint8),
+            "name": self.names
+        })
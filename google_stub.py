@@ -0,0 +1,165 @@
+"""Offline stand-in for the Google Directions and OpenWeatherMap forecast APIs.
+
+Run it and point the app or the routing service at it:
+
+    python google_stub.py --port 8001
+    DIRECTIONS_URL=http://127.0.0.1:8001/maps/api/directions/json \
+    WEATHER_URL=http://127.0.0.1:8001/data/2.5/forecast \
+    uvicorn route_avoider:app
+
+Responses are deterministic for a given request, shaped like the real APIs
+and cover only the fields this repo reads.
+"""
+import argparse
+import hashlib
+import math
+import time
+
+from fastapi import FastAPI
+
+app = FastAPI()
+
+# Places the stub can geocode; other names hash to a point in California
+KNOWN_PLACES = {
+    "los angeles": (34.0522, -118.2437),
+    "san francisco": (37.7749, -122.4194),
+    "san jose": (37.3382, -121.8863),
+    "santa cruz": (36.9741, -122.0308),
+    "sacramento": (38.5816, -121.4944),
+    "lake tahoe": (39.0968, -120.0324),
+    "san diego": (32.7157, -117.1611),
+    "fresno": (36.7378, -119.7871)
+}
+
+# Alternatives returned per request: (sideways bow in degrees, speed km/h)
+ALTERNATIVES = ((0.0, 95), (0.25, 85), (-0.3, 80))
+POINTS_PER_ROUTE = 200
+POINTS_PER_STEP = 20
+
+
+def _seed(*parts):
+    return int(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+def geocode(place):
+    """(lat, lon) for "lat,lng", a known place name or any other string"""
+    try:
+        lat, lon = (float(part) for part in place.split(","))
+        return lat, lon
+    except ValueError:
+        pass
+    key = " ".join(place.lower().replace(",", " ").split()[:2])
+    if key in KNOWN_PLACES:
+        return KNOWN_PLACES[key]
+    seed = _seed(place.lower())
+    return 33.0 + (seed % 8000) / 1000, -122.5 + (seed // 8000 % 6000) / 1000
+
+
+def encode_polyline(points):
+    """Google encoded polyline of (lat, lon) points"""
+    chars = []
+    previous = (0, 0)
+    for point in points:
+        current = (int(round(point[0] * 1e5)), int(round(point[1] * 1e5)))
+        for value in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                chars.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chars.append(chr(value + 63))
+        previous = current
+    return "".join(chars)
+
+
+def _km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(h))
+
+
+def _distance(meters):
+    return {"text": f"{meters / 1000:.1f} km", "value": int(meters)}
+
+
+def _duration(seconds):
+    hours, minutes = divmod(int(round(seconds / 60)), 60)
+    return {"text": f"{hours} hours {minutes} mins" if hours else f"{minutes} mins", "value": int(seconds)}
+
+
+def _location(point):
+    return {"lat": point[0], "lng": point[1]}
+
+
+def build_route(start, end, bow, speed_kmh):
+    """A Directions route bowing sideways off the straight line by bow degrees"""
+    points = []
+    for i in range(POINTS_PER_ROUTE + 1):
+        t = i / POINTS_PER_ROUTE
+        offset = bow * math.sin(math.pi * t)
+        points.append((start[0] + (end[0] - start[0]) * t + offset,
+                       start[1] + (end[1] - start[1]) * t - offset))
+
+    steps = []
+    for first in range(0, POINTS_PER_ROUTE, POINTS_PER_STEP):
+        segment = points[first:first + POINTS_PER_STEP + 1]
+        meters = sum(_km(a, b) for a, b in zip(segment[:-1], segment[1:])) * 1000
+        steps.append({
+            "start_location": _location(segment[0]),
+            "end_location": _location(segment[-1]),
+            "html_instructions": f"Continue for {meters / 1000:.1f} km",
+            "distance": _distance(meters),
+            "duration": _duration(meters / 1000 / speed_kmh * 3600),
+            "polyline": {"points": encode_polyline(segment)}
+        })
+
+    meters = sum(step["distance"]["value"] for step in steps)
+    return {
+        "summary": f"Stub route via {'direct' if bow == 0 else 'north' if bow > 0 else 'south'}",
+        "overview_polyline": {"points": encode_polyline(points[::4] + [points[-1]])},
+        "legs": [{
+            "start_location": _location(points[0]),
+            "end_location": _location(points[-1]),
+            "distance": _distance(meters),
+            "duration": _duration(sum(step["duration"]["value"] for step in steps)),
+            "steps": steps
+        }]
+    }
+
+
+@app.get("/maps/api/directions/json")
+def directions(origin: str, destination: str, alternatives: str = "false", key: str = ""):
+    start, end = geocode(origin), geocode(destination)
+    if start == end:
+        return {"status": "ZERO_RESULTS", "routes": []}
+    options = ALTERNATIVES if alternatives.lower() == "true" else ALTERNATIVES[:1]
+    return {"status": "OK", "routes": [build_route(start, end, bow, speed) for bow, speed in options]}
+
+
+@app.get("/data/2.5/forecast")
+def forecast(lat: float, lon: float, appid: str = "", units: str = "metric"):
+    seed = _seed(round(lat, 2), round(lon, 2))
+    issued = int(time.time()) // 10800 * 10800
+    entries = []
+    for i in range(40):
+        wave = math.sin((seed % 360 + i * 20) * math.pi / 180)
+        entry = {
+            "dt": issued + i * 10800,
+            "main": {"temp": 12 + 8 * wave - (lat - 34), "humidity": int(60 + 30 * wave)},
+            "wind": {"speed": round(4 + 3 * abs(wave), 1), "deg": (seed + i * 15) % 360}
+        }
+        if wave > 0.6:
+            entry["rain"] = {"3h": round(2 * (wave - 0.6), 2)}
+        if wave > 0.8 and lat > 38:
+            entry["snow"] = {"3h": round(5 * (wave - 0.8), 2)}
+        entries.append(entry)
+    return {"cod": "200", "cnt": len(entries), "list": entries}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve stub Directions and forecast APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
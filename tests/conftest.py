@@ -0,0 +1,66 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import APIService, Config  # noqa: E402
+
+
+def start_server(app):
+    """Run an ASGI app with uvicorn on a free local port in a daemon thread; returns (base URL, server)"""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", server
+
+
+@pytest.fixture(scope="session")
+def google_stub():
+    """Base URL of google_stub.py served for the whole test session"""
+    import google_stub
+
+    url, server = start_server(google_stub.app)
+    yield url
+    server.should_exit = True
+
+
+@pytest.fixture
+def serve():
+    """Function serving an ASGI app for the test; returns its base URL"""
+    servers = []
+
+    def serve(app):
+        url, server = start_server(app)
+        servers.append(server)
+        return url
+    yield serve
+    for server in servers:
+        server.should_exit = True
+
+
+@pytest.fixture
+def stub_api(google_stub, tmp_path, monkeypatch):
+    """Point APIService at the stub, with fresh response caches under tmp_path"""
+    monkeypatch.setattr(Config, "DIRECTIONS_URL", f"{google_stub}/maps/api/directions/json")
+    monkeypatch.setattr(Config, "WEATHER_URL", f"{google_stub}/data/2.5/forecast")
+    monkeypatch.setattr(Config, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "TILE_DIR", str(tmp_path / "tiles"))
+    APIService.directions_cache.cache_clear()
+    APIService.weather_cache.cache_clear()
+    yield google_stub
+    APIService.directions_cache.cache_clear()
+    APIService.weather_cache.cache_clear()
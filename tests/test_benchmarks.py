@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.suite import cases, compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def benchmarks(*args):
+    return subprocess.run([sys.executable, "-m", "benchmarks", *args], cwd=ROOT, capture_output=True, text=True)
+
+
+def test_every_case_on_the_route_field_runs():
+    names = [name for name, _ in cases()]
+    assert len(names) == len(set(names))
+    # The statewide field and the larger alternative counts only take longer
+    for name, setup in cases():
+        if "statewide" in name or ",10]" in name or ",50]" in name:
+            continue
+        setup()()
+
+
+def test_run_and_compare_from_the_command_line(tmp_path):
+    out = tmp_path / "results.json"
+    result = benchmarks("run", "-k", "select_best_route[short,route,3]", "--min-time", "0", "--out", str(out))
+    assert result.returncode == 0, result.stderr
+    with open(out) as f:
+        document = json.load(f)
+    assert list(document["results"]) == ["select_best_route[short,route,3]"]
+    timing = document["results"]["select_best_route[short,route,3]"]
+    assert timing["iterations"] >= 5 and 0 < timing["min_ms"] <= timing["p50_ms"] <= timing["p99_ms"]
+    assert set(document["environment"]) >= {"timestamp", "commit", "python", "numpy"}
+
+    # A run against itself shows no regression; twice the p50 is one
+    assert benchmarks("compare", str(out), str(out)).returncode == 0
+    slower = json.loads(json.dumps(document))
+    slower["results"]["select_best_route[short,route,3]"]["p50_ms"] *= 2
+    (tmp_path / "slower.json").write_text(json.dumps(slower))
+    result = benchmarks("compare", str(out), str(tmp_path / "slower.json"))
+    assert result.returncode == 1 and "slower" in result.stdout
+
+
+def test_compare_statuses():
+    baseline = {"results": {"a": {"p50_ms": 10.0}, "b": {"p50_ms": 10.0}, "c": {"p50_ms": 10.0}, "gone": {"p50_ms": 1}}}
+    current = {"results": {"a": {"p50_ms": 10.5}, "b": {"p50_ms": 12.0}, "c": {"p50_ms": 5.0}, "new": {"p50_ms": 1}}}
+    assert [(name, status) for name, *_, status in compare(baseline, current)] == [
+        ("a", ""), ("b", "slower"), ("c", "faster")]
+    assert [status for *_, status in compare(baseline, current, threshold=0.5)] == ["", "", ""]
@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from engine import APIService, Config, ResponseCache
+from engine import cache as cache_module
+
+
+class Clock:
+    """Stand-in for time.time() that only moves when told to"""
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+    cache.set("key", {"value": 1})
+    clock.now += 59
+    assert cache.get("key") == {"value": 1}
+    clock.now += 2
+    assert cache.get("key") is None
+
+    # A per-entry TTL overrides the cache's
+    cache.set("short", [1], ttl_seconds=5)
+    clock.now += 6
+    assert cache.get("short") is None
+
+
+def test_disk_tier_survives_a_new_process(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path).set("key", {"value": 1})
+    reopened = ResponseCache(path)
+    assert reopened.get("key") == {"value": 1}
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("key") == {"value": 1}
+    assert reopened.stats()["memory_hits"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2, max_disk_entries=3)
+    for key in ("a", "b", "c", "d"):
+        cache.set(key, key)
+        clock.now += 1
+    cache.get("b")  # now more recently used than c
+    clock.now += 1
+    cache.set("e", "e")
+
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.stats()["disk_entries"] == 3
+    fresh = ResponseCache(cache.path)
+    assert [key for key in "abcde" if fresh.get(key) is not None] == ["b", "d", "e"]
+
+
+def test_concurrent_misses_share_one_fetch(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        futures = [pool.submit(cache.get_or_fetch, "key", fetch) for _ in range(16)]
+        while cache.stats()["coalesced"] + len(calls) < 16:
+            pass
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert calls == [1]
+    assert results == [{"value": 42}] * 16
+    assert cache.get_or_fetch("key", fetch) == {"value": 42}
+    assert calls == [1]
+
+
+def test_fetch_errors_reach_every_waiter_and_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(cache.get_or_fetch, "key", failing) for _ in range(4)]
+        while cache.stats()["coalesced"] < 3:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="upstream down"):
+                future.result(timeout=5)
+    assert cache.get_or_fetch("key", lambda: "recovered") == "recovered"
+
+
+def test_directions_are_served_from_the_cache(stub_api):
+    directions, error = APIService.get_directions("Los Angeles", "San Francisco")
+    assert error is None and directions["status"] == "OK"
+    with mock.patch.object(APIService.http(), "get", side_effect=AssertionError("not cached")):
+        again, error = APIService.get_directions("los angeles ", "San  Francisco")
+    assert error is None and again == directions
+    assert APIService.directions_cache().stats()["memory_hits"] == 1
+
+
+def test_concurrent_forecasts_for_one_cell_fetch_once(stub_api):
+    fetch = mock.Mock(wraps=APIService._fetch_forecast)
+    with mock.patch.object(APIService, "_fetch_forecast", fetch):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            # Points a few hundred metres apart share a geohash cell
+            results = list(pool.map(lambda i: APIService.get_weather_data(38.58 + i * 1e-4, -121.49), range(8)))
+    assert fetch.call_count == 1
+    assert all(error is None and forecast == results[0][0] for forecast, error in results)
+    assert len(results[0][0]) == 40
+
+
+def test_forecasts_expire_one_interval_after_their_issuance(stub_api, clock):
+    # An issuance that is not on a UTC multiple of the interval
+    issued = clock.now - 600
+    assert issued % Config.WEATHER_ISSUE_INTERVAL
+    fetch = mock.Mock(return_value=[{"timestamp": issued, "temperature": 10.0}])
+    with mock.patch.object(APIService, "_fetch_forecast", fetch):
+        APIService.get_weather_data(38.58, -121.49)
+        clock.now = issued + Config.WEATHER_ISSUE_INTERVAL - 1
+        APIService.get_weather_data(38.58, -121.49)
+        assert fetch.call_count == 1
+        clock.now += 2
+        APIService.get_weather_data(38.58, -121.49)
+        assert fetch.call_count == 2
@@ -0,0 +1,82 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean import clean_chunk, legacy_clean, load, read_chunks
+
+# Two interleaved stations with gaps at their start, in the middle and
+# across every 2-row chunk boundary; B's first values only appear after
+# A's have been carried over several chunks
+NORMALS_CSV = """STATION,DATE,DLY-TMAX-NORMAL,DLY-TMIN-NORMAL,DLY-PRCP-80PCTL
+A,01-01,50.5,30.1,
+B,01-01,,,
+A,01-02,,31.2,0.2
+B,01-02,,,0.4
+A,01-03,52.0,,
+B,01-03,61.5,,
+A,01-04,,,
+B,01-04,,40.0,
+A,01-05,53.5,33.0,0.1
+B,02-30,,,
+"""
+
+
+@pytest.fixture
+def normals_csv(tmp_path):
+    path = tmp_path / "normals.csv"
+    path.write_text(NORMALS_CSV)
+    return str(path)
+
+
+def chunked_clean(csv_file, chunk_size):
+    carry = None
+    frames = []
+    for chunk in read_chunks(csv_file, chunk_size):
+        df, carry = clean_chunk(chunk, carry)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def assert_same_rows(df, expected):
+    assert list(df.columns) == list(expected.columns)
+    assert df["station_id"].astype(str).tolist() == expected["station_id"].astype(str).tolist()
+    pd.testing.assert_series_equal(pd.to_datetime(df["date"]).reset_index(drop=True),
+                                   expected["date"].reset_index(drop=True), check_names=False)
+    values = [col for col in expected.columns if col not in ("station_id", "date")]
+    np.testing.assert_allclose(df[values].to_numpy(dtype=np.float64), expected[values].to_numpy(dtype=np.float64),
+                               rtol=1e-6)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 100])
+def test_forward_fill_stays_within_each_station_across_chunks(normals_csv, chunk_size):
+    df = chunked_clean(normals_csv, chunk_size)
+    expected = legacy_clean(normals_csv, per_station=True)
+    assert_same_rows(df, expected)
+
+    # B's leading gap stays empty rather than taking A's values
+    first_b = df[df["station_id"] == "B"].iloc[0]
+    assert np.isnan(first_b["temp_max_normal"]) and np.isnan(first_b["temp_min_normal"])
+    # The invalid 02-30 date is reported as missing, not dropped
+    assert pd.isna(df["date"].iloc[-1])
+
+
+def test_untyped_fallback_matches(tmp_path):
+    # A non-numeric value in a later chunk switches read_chunks to coercing per column
+    path = tmp_path / "normals.csv"
+    path.write_text(NORMALS_CSV.replace("A,01-04,,,", "A,01-04,n/a,,"))
+    expected = legacy_clean(str(path), per_station=True)
+    assert_same_rows(chunked_clean(str(path), 2), expected)
+
+
+def test_sqlite_target_gets_the_same_rows(normals_csv, tmp_path):
+    db_path = tmp_path / "climate.db"
+    rows, bad_dates = load(normals_csv, f"sqlite:///{db_path}", table="climate_data", chunk_size=2)
+    assert (rows, bad_dates) == (10, 1)
+
+    with sqlite3.connect(db_path) as connection:
+        stored = pd.read_sql_query("SELECT * FROM climate_data ORDER BY rowid", connection)
+    expected = legacy_clean(normals_csv, per_station=True)
+    stored["date"] = pd.to_datetime(stored["date"])
+    assert_same_rows(stored, expected)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from engine.climate import ClimatePriors, ClimateStore, build_store, load_station_coordinates
+
+# Three stations over two days; C has no rain normal on 01-02 and B reports
+# none for snow depth
+NORMALS_CSV = """STATION,DATE,DLY-SNOW-PCTALL-GE001TI,DLY-SNWD-PCTALL-GE001WI,DLY-PRCP-PCTALL-GE010HI
+A,01-01,10.0,30.0,20.0
+A,01-02,12.0,8.0,40.0
+B,01-01,50.0,,60.0
+B,01-02,70.0,,80.0
+C,01-01,0.0,0.0,10.0
+C,01-02,0.0,0.0,-9999
+"""
+
+STATIONS_CSV = """STATION,LATITUDE,LONGITUDE
+A,36.0,-120.0
+B,36.0,-119.0
+C,37.0,-120.0
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "normals.csv"
+    path.write_text(NORMALS_CSV)
+    return build_store(str(path), str(tmp_path / "store"))
+
+
+@pytest.fixture
+def coordinates(tmp_path):
+    path = tmp_path / "stations.csv"
+    path.write_text(STATIONS_CSV)
+    return load_station_coordinates(str(path))
+
+
+def test_station_coordinates_are_read_from_the_csv(coordinates):
+    assert coordinates == {"A": (36.0, -120.0), "B": (36.0, -119.0), "C": (37.0, -120.0)}
+
+
+def test_a_location_at_a_station_gets_that_station_s_probabilities(store, coordinates):
+    priors = ClimatePriors(store, coordinates)
+    # Snow is the larger of snowfall and snow depth; the other stations only
+    # weigh in through the distance floor
+    assert priors.prior(36.0, -120.0, "01-01") == pytest.approx({"snow": 0.3, "rain": 0.2}, rel=1e-5)
+    assert priors.prior(36.0, -119.0, "01-02") == pytest.approx({"snow": 0.7, "rain": 0.8}, rel=1e-5)
+    # A missing normal falls back to the statewide mean of the day
+    assert priors.prior(37.0, -120.0, "01-02")["rain"] == pytest.approx(0.6, rel=1e-5)
+
+
+def test_priors_between_stations_are_inverse_distance_weighted(store, coordinates):
+    priors = ClimatePriors(store, coordinates, neighbours=2)
+    # Halfway between A and B, C being farther away: the plain mean of A and B
+    assert priors.prior(36.0, -119.5, "01-01") == pytest.approx({"snow": 0.4, "rain": 0.4})
+
+    # Nearer A counts more
+    lat, lon = 36.0, -119.75
+    dx = np.cos(np.radians(lat))
+    weights = np.array([1 / (0.25 * dx), 1 / (0.75 * dx)])
+    expected = weights @ [0.2, 0.6] / weights.sum()
+    assert priors.prior(lat, lon, "01-01")["rain"] == pytest.approx(expected)
+    assert 0.2 < expected < 0.4
+
+    # With every station counted the probabilities stay within their range
+    everywhere = ClimatePriors(store, coordinates, neighbours=5)
+    for lat, lon in ((35.0, -121.0), (36.5, -119.5), (38.0, -118.0)):
+        rain = everywhere.prior(lat, lon, 0)["rain"]
+        assert 0.1 <= rain <= 0.6
+
+
+def test_without_coordinates_every_location_gets_the_statewide_mean(store):
+    priors = ClimatePriors(store)
+    assert priors.prior(36.0, -120.0, "01-01") == pytest.approx({"snow": 0.8 / 3, "rain": 0.3})
+    assert priors.prior(40.0, -115.0, "01-01") == priors.prior(36.0, -120.0, "01-01")
+    # Stations missing from the coordinates file are left out
+    located = ClimatePriors(store, {"B": (36.0, -119.0)})
+    assert located.prior(36.0, -120.0, "01-01") == pytest.approx({"snow": 0.5, "rain": 0.6})
+
+
+def test_store_round_trip(tmp_path, store):
+    assert store.stations == ["A", "B", "C"]
+    assert sorted(store.columns) == ["DLY-PRCP-PCTALL-GE010HI", "DLY-SNOW-PCTALL-GE001TI", "DLY-SNWD-PCTALL-GE001WI"]
+    column = store.column("DLY-PRCP-PCTALL-GE010HI")
+    assert column.shape == (3, 366) and column.dtype == np.float32 and isinstance(column, np.memmap)
+    assert store.value("DLY-PRCP-PCTALL-GE010HI", "A", "01-02") == pytest.approx(40.0)
+    assert store.value("DLY-SNOW-PCTALL-GE001TI", "B", 1) == pytest.approx(70.0)
+    # Sentinels, empty cells and days without a row read back as NaN
+    assert np.isnan(store.value("DLY-PRCP-PCTALL-GE010HI", "C", "01-02"))
+    assert np.isnan(store.value("DLY-SNWD-PCTALL-GE001WI", "B", "01-01"))
+    assert np.isnan(store.day("DLY-PRCP-PCTALL-GE010HI", "07-04")).all()
+    np.testing.assert_allclose(store.day("DLY-PRCP-PCTALL-GE010HI", "01-01"), [20.0, 60.0, 10.0])
+    with pytest.raises(KeyError):
+        store.column("DLY-TMAX-NORMAL")
+
+    # A reopened store reads the same arrays without the CSV
+    csv_path = tmp_path / "normals.csv"
+    store_dir = str(tmp_path / "store")
+    assert not ClimateStore.is_stale(store_dir, str(csv_path))
+    reopened = ClimateStore.open(store_dir, str(tmp_path / "missing.csv"))
+    assert np.array_equal(reopened.column("DLY-SNOW-PCTALL-GE001TI"), store.column("DLY-SNOW-PCTALL-GE001TI"),
+                          equal_nan=True)
+
+    # A changed CSV makes the store stale and open rebuilds it
+    csv_path.write_text(NORMALS_CSV.replace("A,01-02,12.0", "A,01-02,15.25"))
+    assert ClimateStore.is_stale(store_dir, str(csv_path))
+    rebuilt = ClimateStore.open(store_dir, str(csv_path))
+    assert rebuilt.value("DLY-SNOW-PCTALL-GE001TI", "A", "01-02") == pytest.approx(15.25)
+    assert not ClimateStore.is_stale(store_dir, str(csv_path))
+    assert ClimateStore.is_stale(str(tmp_path / "empty"), str(csv_path))
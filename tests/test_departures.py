@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from engine import APIService, Config, DataProcessor, DeparturePlanner, DistanceEngine, Polyline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+START_TIME = 1_700_000_000.0
+EMPTY = DataProcessor.generate_hazard_field((0, 0, 1, 1), {"label": "Zone", "clusters": 0})
+
+
+class Field:
+    """Stand-in simulation: intensity where lon < west_of, from hour `after` on"""
+    def __init__(self, intensity=1.0, after=0.0, west_of=180.0):
+        self.start_time = START_TIME
+        self.intensity, self.after, self.west_of = intensity, after, west_of
+
+    def sample(self, kind, hours, lat, lon):
+        hours, lon = np.broadcast_arrays(np.asarray(hours, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        return np.where((hours >= self.after) & (lon < self.west_of), self.intensity, 0.0)
+
+
+def straight_route(lat, lon_from, lon_to, minutes, summary):
+    points = np.column_stack((np.full(21, lat), np.linspace(lon_from, lon_to, 21)))
+    return {"summary": summary,
+            "legs": [{"steps": [{"start_location": {"lat": lat, "lng": lon_from},
+                                 "polyline": {"points": Polyline.encode(points)}}],
+                      "end_location": {"lat": lat, "lng": lon_to},
+                      "duration": {"value": minutes * 60}}]}
+
+
+def route_km(route):
+    points = Polyline.resample(Polyline.route_path(route), Config.DEPARTURE_SAMPLE_KM)
+    return float(DistanceEngine.haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1]).sum())
+
+
+ROUTES = [straight_route(36.0, -120.0, -119.0, 60, "fast"), straight_route(36.2, -120.0, -118.5, 100, "long")]
+HAZARD_WEIGHTS = {kind: rule[1] for kind, rule in Config.ROUTE_HAZARD_RULES.items()}
+
+
+def planner(simulation, forecast=None, route_weather=None):
+    return DeparturePlanner(ROUTES, EMPTY, EMPTY, EMPTY, forecast, route_weather, simulation=simulation,
+                            start_time=START_TIME, step_minutes=60, horizon_hours=6)
+
+
+def test_hazard_exposure_is_intensity_times_km_weighted_by_the_route_rules():
+    plan = planner(Field(intensity=0.5))
+    assert plan.exposure.shape == (2, 7, 5)
+    for route, exposure in zip(ROUTES, plan.exposure):
+        np.testing.assert_allclose(exposure[:, :3], 0.5 * route_km(route), rtol=1e-9)
+
+    factors = (0.2, 0.7, 1.0)
+    weights = sum(HAZARD_WEIGHTS[kind] * factor ** 2 for kind, factor in zip(("snow", "fire", "rain"), factors))
+    expected = np.array([[0.5 * route_km(route) * weights + route["legs"][0]["duration"]["value"] / 60] * 7
+                         for route in ROUTES])
+    np.testing.assert_allclose(plan.scores(*factors), expected, rtol=1e-9)
+
+
+def test_segments_meet_the_hazard_when_they_are_driven():
+    # The hazard covers the western half of the fast route from hour 3; the
+    # route starts in the west and drives that half in its first 30 minutes
+    plan = planner(Field(after=3.0, west_of=-119.5))
+    fast = plan.exposure[0, :, 0] / route_km(ROUTES[0])
+    assert fast[:3] == pytest.approx([0, 0, 0])
+    assert fast[3:] == pytest.approx([0.5] * 4, abs=0.03)
+
+
+def test_forecast_precipitation_in_force_when_driven():
+    forecast = [{"timestamp": START_TIME + hours * 3600, "rain": rain, "snow": 0}
+                for hours, rain in ((0, 0.0), (3, 2.0), (6, 0.0))]
+    plan = planner(Field(intensity=0.0), forecast=forecast)
+    rain = plan.exposure[0, :, 3] / route_km(ROUTES[0])
+    # Departures from hour 3 drive through the 2 mm period until hour 6
+    assert rain[:2] == pytest.approx([0, 0])
+    assert rain[3:5] == pytest.approx([2.0, 2.0])
+    weather = plan.scores(0.5, 0.5, 0.5)[0] - ROUTES[0]["legs"][0]["duration"]["value"] / 60
+    np.testing.assert_allclose(weather, plan.exposure[0, :, 3] * Config.DEPARTURE_WEATHER_WEIGHTS["rain"])
+
+
+def test_plan_ranks_route_and_departure_pairs():
+    plan = planner(Field(after=3.0, west_of=-119.5))
+    ranked = plan.plan(0.5, 0.5, 0.5)
+    assert len(ranked) == 2 * 7
+    totals = [entry["total_score"] for entry in ranked]
+    assert totals == sorted(totals)
+    best = ranked[0]
+    # Leaving before the hazard on the faster route wins
+    assert (best["route"], best["departure_minutes"]) == (0, 0)
+    assert best["arrival_time"] - best["departure_time"] == pytest.approx(3600)
+    assert best["total_score"] == pytest.approx(best["hazard_exposure"] + best["weather_exposure"] +
+                                                best["travel_minutes"])
+    assert len(plan.plan(0.5, 0.5, 0.5, top_k=3)) == 3
+
+
+def test_recorded_trip_with_the_hazard_simulation():
+    with open(os.path.join(FIXTURES, "directions_short.json")) as f:
+        routes = json.load(f)["routes"]
+    with open(os.path.join(FIXTURES, "forecast.json")) as f:
+        forecast = APIService.parse_forecast(json.load(f))
+    leg = routes[0]["legs"][0]
+    zones = DataProcessor.generate_zone_fields(leg["start_location"]["lat"], leg["start_location"]["lng"],
+                                               leg["end_location"]["lat"], leg["end_location"]["lng"], seed=0)
+    plan = DeparturePlanner(routes, *zones, forecast, start_time=forecast[0]["timestamp"])
+    scores = plan.scores(0.5, 0.5, 0.5)
+    assert scores.shape == (len(routes), len(plan.departures))
+    assert np.all(np.isfinite(scores)) and np.all(plan.exposure >= 0)
+    assert np.all(scores >= plan.travel_minutes[:, None])
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from engine import Config, HazardSimulation, ZoneSet
+
+# About 111 x 108 km: 56 x 54 cells of 2 km
+BBOX = (36.0, -120.0, 37.0, -118.8)
+RULES = Config.HAZARD_EVOLUTION
+
+
+def zone_set(kind, lat, lon, intensity):
+    return ZoneSet(f"{kind.title()} Zone", lat, lon, intensity, np.full(len(lat), 5000.0))
+
+
+def empty(kind):
+    return zone_set(kind, [], [], [])
+
+
+def weather(**values):
+    return dict({"timestamp": 0, "wind_speed": 0.0, "wind_deg": 0.0, "humidity": 50, "temperature": -5.0,
+                 "rain": 0, "snow": 0}, **values)
+
+
+def simulation(snow=None, fire=None, rain=None, forecast=None):
+    return HazardSimulation(BBOX, snow or empty("snow"), fire or empty("fire"), rain or empty("rain"),
+                            forecast or [weather()], cell_km=2, start_time=0)
+
+
+def centroid(grid):
+    rows, cols = np.indices(grid.shape)
+    total = grid.sum(dtype=np.float64)
+    return (rows * grid).sum(dtype=np.float64) / total, (cols * grid).sum(dtype=np.float64) / total
+
+
+def cells(n=20, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(36.4, 36.6, n), rng.uniform(-119.5, -119.3, n), rng.uniform(0.2, 1.0, n)
+
+
+def test_deposit_keeps_the_intensity_inside_the_grid():
+    lat, lon, intensity = cells()
+    # Two more zones fall outside the grid
+    sim = simulation(rain=zone_set("rain", np.r_[lat, 35.5, 36.5], np.r_[lon, -119.4, -117.0],
+                                   np.r_[intensity, 0.9, 0.9]))
+    assert sim.state["rain"].sum() == pytest.approx(intensity.sum(), rel=1e-6)
+    assert sim.state["snow"].sum() == sim.state["fire"].sum() == 0
+
+
+@pytest.mark.parametrize("wind_deg, direction", [(270, (0, 1)), (0, (-1, 0)), (135, (1, -1))])
+def test_rain_and_snow_drift_downwind_and_decay_without_precipitation(wind_deg, direction):
+    lat, lon, intensity = cells()
+    sim = simulation(snow=zone_set("snow", lat, lon, intensity), rain=zone_set("rain", lat, lon, intensity),
+                     forecast=[weather(wind_speed=2.5, wind_deg=wind_deg)])
+    before = {kind: (sim.state[kind].sum(dtype=np.float64), centroid(sim.state[kind])) for kind in ("rain", "snow")}
+    sim.step(0, 1)
+
+    # 2.5 m/s is 9 km/h, 4.5 cells an hour; snow drifts at half the speed
+    unit = np.array(direction) / np.hypot(*direction)
+    for kind in ("rain", "snow"):
+        total, (row, col) = before[kind]
+        spec = RULES[kind]
+        assert sim.state[kind].sum(dtype=np.float64) == pytest.approx(total * np.exp(-1 / spec["lifetime_hours"]),
+                                                                     rel=1e-5)
+        moved = np.array(centroid(sim.state[kind])) - (row, col)
+        np.testing.assert_allclose(moved, 4.5 * spec["drift"] * unit, atol=1e-4)
+
+
+def test_forecast_precipitation_grows_rain_and_snow_and_warmth_melts_snow():
+    lat, lon, intensity = cells()
+    forecast = [weather(rain=3.0, snow=6.0)]
+    sim = simulation(snow=zone_set("snow", lat, lon, intensity), rain=zone_set("rain", lat, lon, intensity),
+                     forecast=forecast)
+    sim.step(0, 1)
+    # Amounts are per 3 hours: 1 mm/h of rain and 2 mm/h of snow
+    assert sim.state["rain"].sum() == pytest.approx(
+        intensity.sum() * np.exp(-1 / 6) * (1 + RULES["rain"]["growth_per_mm"]), rel=1e-5)
+    assert sim.state["snow"].sum() == pytest.approx(
+        intensity.sum() * np.exp(-1 / 18) * (1 + 2 * RULES["snow"]["growth_per_mm"]), rel=1e-5)
+
+    warm = simulation(snow=zone_set("snow", lat, lon, intensity), forecast=[weather(temperature=11.0)])
+    warm.step(0, 1)
+    melt = RULES["snow"]["melt_rate"] * (11.0 - RULES["snow"]["freezing_c"])
+    assert warm.state["snow"].sum() == pytest.approx(intensity.sum() * np.exp(-1 / 18 - melt), rel=1e-5)
+
+
+def test_fire_spreads_faster_downwind_and_uses_up_its_fuel():
+    fire = zone_set("fire", [36.5], [-119.4], [0.8])
+    calm = simulation(fire=fire).run(horizon_hours=6)
+    grid = calm.state["fire"]
+    row, col = np.unravel_index(grid.argmax(), grid.shape)
+    # Without wind the spread is symmetric
+    assert grid[row, col + 3] == pytest.approx(grid[row, col - 3], rel=1e-5)
+    assert grid[row + 3, col] == pytest.approx(grid[row - 3, col], rel=1e-5)
+    assert np.count_nonzero(grid > 1e-3) > 9 and np.all(grid <= 1)
+    assert calm.fuel[row, col] < 1 and calm.fuel.min() >= 0
+
+    # Wind from the west carries it east
+    windy = simulation(fire=fire, forecast=[weather(wind_speed=8.0, wind_deg=270)]).run(horizon_hours=6)
+    grid = windy.state["fire"]
+    assert grid[row, col + 3] > 2 * grid[row, col - 3]
+    assert centroid(grid)[1] > col and centroid(grid)[0] == pytest.approx(row, abs=1e-3)
+
+    # Humid air and rain slow it
+    damp = simulation(fire=fire, forecast=[weather(humidity=95, rain=6.0)]).run(horizon_hours=6)
+    assert damp.state["fire"].sum() < calm.state["fire"].sum()
+
+
+def test_history_is_interpolated_in_time_and_space():
+    lat, lon, intensity = cells()
+    forecast = [weather(wind_speed=2.5, wind_deg=270), weather(timestamp=3 * 3600, wind_speed=0.0)]
+    sim = simulation(rain=zone_set("rain", lat, lon, intensity), forecast=forecast).run(horizon_hours=6)
+    assert sim.history.shape == (7, 3) + sim.shape and sim.horizon_hours == 6
+    assert sim.weather_at(2.5)["wind_speed"] == 2.5 and sim.weather_at(3)["wind_speed"] == 0.0
+
+    # The drift stops when the forecast wind does
+    centres = [centroid(sim.field("rain", hours))[1] for hours in range(7)]
+    np.testing.assert_allclose(np.diff(centres[:4]), 4.5, atol=0.01)
+    np.testing.assert_allclose(np.diff(centres[3:]), 0, atol=0.01)
+    np.testing.assert_allclose(sim.field("rain", 1.5), (sim.field("rain", 1) + sim.field("rain", 2)) / 2, atol=1e-6)
+
+    # Sampling at a cell centre reads the cell
+    grid = sim.field("rain", 2)
+    row, col = np.unravel_index(grid.argmax(), grid.shape)
+    cell_lat = sim.min_lat + (row + 0.5) * sim.cell_lat
+    cell_lon = sim.min_lon + (col + 0.5) * sim.cell_lon
+    assert sim.sample("rain", 2, cell_lat, cell_lon) == pytest.approx(grid[row, col], rel=1e-6)
+    assert sim.sample("rain", 2, 40.0, -119.4) == 0
+    assert sim.sum_within("rain", 36.5, -119.4, 200)[0] == pytest.approx(intensity.sum(), rel=1e-3)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from engine import Config, DataProcessor, DistanceEngine, ZoneSet
+
+START = (36.5, -119.5)
+HIGHWAY_EXITS = [{"exit_name": "Exit 12", "exit_lat": 36.55, "exit_lon": -119.45},
+                 {"exit_name": "Exit 14", "exit_lat": 36.6, "exit_lon": -119.4}]
+
+
+@pytest.fixture
+def pois(tmp_path, monkeypatch):
+    """Points of interest file of one shelter inside the outer ring and one beyond it"""
+    path = tmp_path / "pois.csv"
+    path.write_text("name,lat,lon\nShelter,36.6,-119.6\nFar shelter,37.5,-119.5\n")
+    monkeypatch.setattr(Config, "EXIT_POI_PATH", str(path))
+    DataProcessor.exit_pois.cache_clear()
+    yield
+    DataProcessor.exit_pois.cache_clear()
+
+
+@pytest.fixture
+def no_pois(monkeypatch):
+    monkeypatch.setattr(Config, "EXIT_POI_PATH", None)
+    DataProcessor.exit_pois.cache_clear()
+    yield
+    DataProcessor.exit_pois.cache_clear()
+
+
+def test_ring_candidates(no_pois):
+    candidates = DataProcessor.exit_candidates(*START)
+    n_ring = len(Config.EXIT_RING_RADII_KM) * Config.EXIT_RING_POINTS
+    assert len(candidates["lat"]) == len(candidates["name"]) == n_ring
+    distance = DistanceEngine.haversine(*START, candidates["lat"], candidates["lon"])
+    np.testing.assert_allclose(distance, candidates["distance_km"], rtol=1e-9)
+    assert sorted(set(candidates["distance_km"].round(6).tolist())) == list(Config.EXIT_RING_RADII_KM)
+    assert candidates["name"][0] == "North 5 km (0°)"
+
+    with_exits = DataProcessor.exit_candidates(*START, HIGHWAY_EXITS)
+    assert len(with_exits["lat"]) == n_ring + 2 and with_exits["name"][-2:] == ["Exit 12", "Exit 14"]
+
+
+def test_points_of_interest_within_the_outer_ring_are_candidates(pois):
+    candidates = DataProcessor.exit_candidates(*START)
+    assert len(candidates["lat"]) == len(Config.EXIT_RING_RADII_KM) * Config.EXIT_RING_POINTS + 1
+    assert candidates["name"][-1] == "Shelter"
+    assert candidates["distance_km"][-1] == pytest.approx(DistanceEngine.haversine(*START, 36.6, -119.6))
+
+
+def greedy_reference(candidates, safety_scores, top_k):
+    """Safest first, nearer first on ties, skipping any too close to one chosen"""
+    order = sorted(range(len(safety_scores)), key=lambda i: (-safety_scores[i], candidates["distance_km"][i], i))
+    chosen = []
+    for i in order:
+        if len(chosen) == top_k:
+            break
+        if all(DistanceEngine.haversine(candidates["lat"][i], candidates["lon"][i],
+                                        candidates["lat"][j], candidates["lon"][j]) >= Config.EXIT_MIN_SEPARATION_KM
+               for j in chosen):
+            chosen.append(i)
+    return chosen
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ranked_exits_are_the_safest_separated_candidates(no_pois, seed):
+    rng = np.random.default_rng(seed)
+    candidates = DataProcessor.build_exit_candidates(*START, highway_exits=HIGHWAY_EXITS)
+    # Impacts concentrated on one side, so the safest candidates crowd together
+    bearing = np.radians(rng.uniform(0, 360))
+    dy, dx = candidates["lat"] - START[0], candidates["lon"] - START[1]
+    impacts = np.column_stack([np.clip(np.cos(np.arctan2(dx, dy) - bearing), 0, None) * rng.uniform(10, 60)
+                               for _ in range(3)])
+    impacts += rng.uniform(0, 0.5, impacts.shape)
+
+    for top_k in (3, 8):
+        exits = DataProcessor.rank_exit_candidates(candidates, impacts, top_k=top_k)
+        assert len(exits) == top_k
+        safety_scores = np.clip(candidates["base_score"] - impacts.sum(axis=1), 0, 100)
+        chosen = greedy_reference(candidates, safety_scores, top_k)
+        assert [exit_point["direction"] for exit_point in exits] == [candidates["name"][i] for i in chosen]
+        assert [exit_point["safety_score"] for exit_point in exits] == pytest.approx(safety_scores[chosen])
+        for a in range(top_k):
+            for b in range(a):
+                assert DistanceEngine.haversine(exits[a]["lat"], exits[a]["lon"], exits[b]["lat"],
+                                                exits[b]["lon"]) >= Config.EXIT_MIN_SEPARATION_KM - 1e-6
+
+
+def test_ties_go_to_the_nearer_candidate_and_details_are_kept(no_pois):
+    candidates = DataProcessor.build_exit_candidates(*START)
+    impacts = np.zeros((len(candidates["lat"]), 3))
+    details = {}
+    exits = DataProcessor.rank_exit_candidates(candidates, impacts, details=details)
+    # Without hazards the inner ring is safest; its points are 0.25 km apart,
+    # so the suggestions are spread around it
+    assert [exit_point["distance_km"] for exit_point in exits] == pytest.approx([5, 5, 5])
+    assert exits[0]["direction"] == "North 5 km (0°)"
+    assert len(details) == 3
+    again = DataProcessor.rank_exit_candidates(candidates, impacts, details=details)
+    assert [exit_point["emergency_services"] for exit_point in again] == [
+        exit_point["emergency_services"] for exit_point in exits]
+
+
+def test_suggested_exits_lead_away_from_the_hazard(no_pois):
+    # Fire clusters 10 to 30 km north of the start
+    rng = np.random.default_rng(0)
+    n = 60
+    lat = START[0] + rng.uniform(10, 30, n) / 111
+    lon = START[1] + rng.uniform(-0.3, 0.3, n)
+    fire = ZoneSet("Fire Zone", lat, lon, np.full(n, 0.9), np.full(n, 5000.0))
+    exits = DataProcessor.suggest_safe_exits(*START, fire_zones=fire, fire_factor=1.0)
+    assert len(exits) == 3
+    for exit_point in exits:
+        assert exit_point["lat"] < START[0] + 0.01
+        assert exit_point["weather_impacts"]["fire_impact"] == 0
@@ -0,0 +1,62 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from engine import Polyline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+# The example of Google's encoded polyline algorithm documentation
+GOOGLE_EXAMPLE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def test_decodes_the_documented_example():
+    np.testing.assert_allclose(Polyline.decode(GOOGLE_EXAMPLE), GOOGLE_POINTS, atol=1e-9)
+    assert Polyline.encode(GOOGLE_POINTS) == GOOGLE_EXAMPLE
+
+
+def test_round_trip_at_the_encoding_precision():
+    rng = np.random.default_rng(0)
+    # Large jumps and sign changes exercise multi-chunk values and the zigzag sign
+    points = np.round(np.column_stack((rng.uniform(-89, 89, 500), rng.uniform(-179, 179, 500))), 5)
+    np.testing.assert_allclose(Polyline.decode(Polyline.encode(points)), points, atol=1e-9)
+    assert Polyline.decode("").shape == (0, 2)
+
+
+def step(points):
+    return {"start_location": {"lat": points[0][0], "lng": points[0][1]},
+            "polyline": {"points": Polyline.encode(points)}}
+
+
+def test_route_path_joins_the_step_polylines():
+    path = [(37.0, -122.0), (37.01, -122.02), (37.03, -122.03), (37.1, -122.1), (37.12, -122.3), (37.2, -122.31)]
+    # Consecutive steps share their boundary point
+    route = {"legs": [{"steps": [step(path[:3]), step(path[2:4]), step(path[3:])],
+                       "end_location": {"lat": 37.2, "lng": -122.31}}],
+             "overview_polyline": {"points": Polyline.encode([path[0], path[-1]])}}
+    np.testing.assert_allclose(Polyline.route_path(route), path, atol=1e-9)
+
+    # Without step polylines the overview is used, then the step start points
+    del route["legs"][0]["steps"][1]["polyline"]
+    np.testing.assert_allclose(Polyline.route_path(route), [path[0], path[-1]], atol=1e-9)
+    del route["overview_polyline"]
+    np.testing.assert_allclose(Polyline.route_path(route), [path[0], path[2], path[3], path[-1]], atol=1e-9)
+
+
+@pytest.mark.parametrize("fixture", ["directions_short.json", "directions_long.json"])
+def test_recorded_routes_decode_to_continuous_geometry(fixture):
+    with open(os.path.join(FIXTURES, fixture)) as f:
+        route = json.load(f)["routes"][0]
+    leg = route["legs"][0]
+    path = Polyline.route_path(route)
+
+    assert len(path) > len(leg["steps"]) + 1
+    assert path[0] == pytest.approx((leg["start_location"]["lat"], leg["start_location"]["lng"]), abs=1e-4)
+    assert path[-1] == pytest.approx((leg["end_location"]["lat"], leg["end_location"]["lng"]), abs=1e-4)
+    # Every step starts where the path passes
+    for s in leg["steps"]:
+        start = np.array([s["start_location"]["lat"], s["start_location"]["lng"]])
+        assert np.abs(path - start).max(axis=1).min() < 1e-4
@@ -0,0 +1,166 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from engine import http as http_module
+from engine.http import LATENCY_BUCKETS_MS, HTTPClient
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeTime:
+    """Stand-in for engine.http's time module: sleeps and requests only advance the clock"""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Session:
+    """Stub requests.Session answering from a script of (latency, response or exception)"""
+    def __init__(self, clock, script):
+        self.clock = clock
+        self.script = list(script)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, timeout))
+        latency, outcome = self.script.pop(0)
+        self.clock.now += latency
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(http_module, "time", clock)
+    return clock
+
+
+def client_with(clock, script, **kwargs):
+    client = HTTPClient(**kwargs)
+    client.session = Session(clock, script)
+    return client
+
+
+def test_retries_rate_limits_and_server_errors(clock):
+    client = client_with(clock, [(0.1, Response(503)), (0.1, Response(429)), (0.1, Response(200))])
+    response = client.get("http://api.test/forecast", endpoint="forecast")
+
+    assert response.status_code == 200
+    assert len(client.session.calls) == 3
+    assert len(clock.sleeps) == 2
+    stats = client.latency_stats()["forecast"]
+    assert (stats["count"], stats["errors"], stats["retries"]) == (3, 2, 2)
+
+
+def test_client_errors_are_not_retried(clock):
+    client = client_with(clock, [(0.1, Response(404))])
+    assert client.get("http://api.test/forecast").status_code == 404
+    assert clock.sleeps == []
+
+
+def test_retry_after_is_honoured(clock):
+    client = client_with(clock, [(0.0, Response(429, {"Retry-After": "3"})), (0.0, Response(200))])
+    assert client.get("http://api.test/directions").status_code == 200
+    assert clock.sleeps == [3.0]
+
+
+def test_connection_errors_are_retried_then_raised(clock):
+    error = requests.ConnectionError("refused")
+    client = client_with(clock, [(0.0, error)] * 3, max_retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://api.test/directions")
+    assert len(client.session.calls) == 3
+
+
+@pytest.mark.parametrize("attempt", range(6))
+def test_backoff_jitter_stays_within_the_capped_exponential(attempt):
+    client = HTTPClient(backoff_base=0.5, backoff_cap=8.0)
+    random.seed(attempt)
+    delays = [client._backoff(attempt, Response(503)) for _ in range(2000)]
+    bound = min(8.0, 0.5 * 2 ** attempt)
+    assert min(delays) >= 0 and max(delays) <= bound
+    # Full jitter spreads over the whole interval
+    assert min(delays) < 0.05 * bound and max(delays) > 0.95 * bound
+
+
+def test_budget_stops_retries_that_would_overrun_it(clock):
+    script = [(1.0, Response(503, {"Retry-After": "2"}))] * 4
+    client = client_with(clock, script, max_retries=3, budgets={"directions": 4.0})
+    response = client.get("http://api.test/directions", endpoint="directions")
+
+    # 1 s request + 2 s wait + 1 s request reaches the 4 s budget: no third attempt
+    assert response.status_code == 503
+    assert len(client.session.calls) == 2
+    assert clock.sleeps == [2.0]
+    # Every attempt's timeout is what is left of the budget
+    assert [timeout for _, timeout in client.session.calls] == [pytest.approx(4.0), pytest.approx(1.0)]
+
+
+def test_budget_is_per_endpoint(clock):
+    script = [(0.0, Response(503, {"Retry-After": "5"})), (0.0, Response(200))]
+    client = client_with(clock, script, budgets={"directions": 4.0}, default_budget=10.0)
+    assert client.get("http://api.test/forecast", endpoint="forecast").status_code == 200
+    assert clock.sleeps == [5.0]
+
+
+def test_requests_per_host_are_limited():
+    client = HTTPClient(max_per_host=2)
+    lock = threading.Lock()
+    active = {}
+    peak = {}
+    release = threading.Event()
+
+    class BlockingSession:
+        def get(self, url, params=None, timeout=None):
+            host = url.split("/")[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            release.wait(5)
+            with lock:
+                active[host] -= 1
+            return Response(200)
+
+    client.session = BlockingSession()
+    urls = ["http://a.test/x"] * 6 + ["http://b.test/x"] * 6
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        futures = [pool.submit(client.get, url) for url in urls]
+        # Wait until both hosts have filled their slots
+        while sum(active.values()) < 4:
+            pass
+        release.set()
+        assert all(future.result(timeout=5).status_code == 200 for future in futures)
+    assert peak == {"a.test": 2, "b.test": 2}
+
+
+def test_latency_histogram_buckets(clock):
+    latencies = [0.01, 0.04, 0.2, 0.7, 20.0]
+    client = client_with(clock, [(latency, Response(200)) for latency in latencies])
+    for _ in latencies:
+        client.get("http://api.test/forecast", endpoint="forecast")
+
+    stats = client.latency_stats()["forecast"]
+    assert stats["count"] == 5 and stats["errors"] == 0
+    assert stats["mean_ms"] == pytest.approx(sum(latencies) * 1000 / 5)
+    expected = {f"<={bound}ms": 0 for bound in LATENCY_BUCKETS_MS}
+    expected.update({"<=50ms": 2, "<=250ms": 1, "<=1000ms": 1, f">{LATENCY_BUCKETS_MS[-1]}ms": 1})
+    assert stats["histogram"] == expected
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from engine import Config, MapDetail
+
+KM_PER_DEG_LAT = MapDetail.KM_PER_DEG_LAT
+
+
+def planar(lat, lon, lat0):
+    """Local equirectangular (x, y) km, as MapDetail measures"""
+    return np.column_stack((np.asarray(lon) * KM_PER_DEG_LAT * np.cos(np.radians(lat0)),
+                            np.asarray(lat) * KM_PER_DEG_LAT))
+
+
+def distance_to_path(points, path, lat0):
+    """Distance (km) from each point to the nearest segment of path"""
+    p, a, b = planar(*points.T, lat0), planar(*path[:-1].T, lat0), planar(*path[1:].T, lat0)
+    segment = b - a
+    length_sq = np.maximum((segment ** 2).sum(axis=1), 1e-18)
+    t = np.clip(((p[:, None, :] - a[None]) * segment[None]).sum(axis=2) / length_sq, 0, 1)
+    closest = a[None] + t[:, :, None] * segment[None]
+    return np.hypot(*(p[:, None, :] - closest).transpose(2, 0, 1)).min(axis=1)
+
+
+def wiggly_path(n=2000, seed=0):
+    # A 100 km road with turns every few km and sub-pixel jitter
+    rng = np.random.default_rng(seed)
+    s = np.linspace(0, 1, n)
+    lat = 36.0 + 0.5 * s + 0.02 * np.sin(40 * s) + rng.normal(0, 2e-5, n)
+    lon = -120.0 + 0.8 * s + 0.03 * np.cos(25 * s) + rng.normal(0, 2e-5, n)
+    return np.column_stack((lat, lon))
+
+
+@pytest.mark.parametrize("tolerance_km", [0.01, 0.1, 1.0])
+def test_simplified_paths_stay_within_the_tolerance(tolerance_km):
+    path = wiggly_path()
+    simplified = MapDetail.simplify(path, tolerance_km)
+    assert 2 <= len(simplified) < len(path)
+    assert np.array_equal(simplified[0], path[0]) and np.array_equal(simplified[-1], path[-1])
+    # Kept vertices are original ones, in order
+    kept = [int(np.flatnonzero((path == point).all(axis=1))[0]) for point in simplified]
+    assert kept == sorted(kept)
+    assert distance_to_path(path, simplified, path[:, 0].mean()).max() <= tolerance_km * (1 + 1e-9)
+
+
+def test_larger_tolerances_keep_fewer_vertices():
+    path = wiggly_path()
+    counts = [len(MapDetail.simplify(path, tolerance_km)) for tolerance_km in (0.01, 0.1, 1.0, 10.0)]
+    assert counts == sorted(counts, reverse=True) and counts[0] > counts[-1]
+    # A straight line needs only its ends
+    line = np.column_stack((np.linspace(36, 37, 50), np.linspace(-120, -119, 50)))
+    assert len(MapDetail.simplify(line, 0.001)) == 2
+
+
+def test_paths_that_double_back_keep_the_turn():
+    path = np.array([(36.0, -120.0), (36.0, -119.5), (36.0, -119.0), (36.0, -119.5), (36.0, -119.8)])
+    simplified = MapDetail.simplify(path, 0.1)
+    assert (36.0, -119.0) in [tuple(point) for point in simplified]
+    assert np.array_equal(MapDetail.simplify(path[:2], 10), path[:2])
+    assert np.array_equal(MapDetail.simplify(path, 0), path)
+
+
+def test_hex_bins_count_every_point_in_its_nearest_hexagon():
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(36.0, 36.5, 5000), rng.uniform(-120.0, -119.4, 5000)
+    intensity = rng.uniform(0, 1, 5000)
+    size_km = 3.0
+    bins = MapDetail.hex_bin(lat, lon, size_km, intensity=intensity)
+    assert bins["count"].sum() == len(lat) and np.all(bins["count"] > 0)
+
+    # Hexagons are the cells of their centres' Voronoi diagram: every point
+    # belongs to the nearest centre, no further away than a corner
+    lat0 = lat.mean()
+    points, centres = planar(lat, lon, lat0), planar(bins["lat"], bins["lon"], lat0)
+    dist = np.hypot(*(points[:, None, :] - centres[None]).transpose(2, 0, 1))
+    nearest = dist.argmin(axis=1)
+    assert dist.min(axis=1).max() <= size_km * (1 + 1e-9)
+    np.testing.assert_array_equal(np.bincount(nearest, minlength=len(centres)), bins["count"])
+
+    # Weights keep their largest value per bin
+    largest = np.full(len(centres), -np.inf)
+    np.maximum.at(largest, nearest, intensity)
+    np.testing.assert_allclose(bins["intensity"], largest)
+
+    # Neighbouring centres sit sqrt(3) sizes apart
+    spacing = np.hypot(*(centres[:, None, :] - centres[None]).transpose(2, 0, 1))
+    spacing[np.diag_indices(len(centres))] = np.inf
+    np.testing.assert_allclose(spacing.min(axis=1), np.sqrt(3) * size_km, rtol=1e-9)
+
+
+def test_hex_bins_of_separate_clusters_and_no_points():
+    lat = np.r_[np.full(30, 36.0), np.full(12, 37.0)]
+    lon = np.r_[np.full(30, -120.0), np.full(12, -119.0)]
+    bins = MapDetail.hex_bin(lat, lon, 2.0)
+    assert sorted(bins["count"].tolist()) == [12, 30]
+    empty = MapDetail.hex_bin([], [], 2.0, intensity=[])
+    assert len(empty["count"]) == len(empty["lat"]) == len(empty["intensity"]) == 0
+
+
+def test_fit_view_shows_every_point():
+    points = np.array([(34.05, -118.24), (37.77, -122.42), (36.6, -121.9)])
+    lat, lon, zoom = MapDetail.fit_view(points)
+    assert (lat, lon) == pytest.approx((35.91, -120.33))
+    width_km = np.ptp(points[:, 1]) * KM_PER_DEG_LAT * np.cos(np.radians(lat))
+    height_km = np.ptp(points[:, 0]) * KM_PER_DEG_LAT
+    fits = [width_km <= MapDetail.km_per_px(z, lat) * Config.MAP_VIEW_WIDTH_PX and
+            height_km <= MapDetail.km_per_px(z, lat) * Config.MAP_VIEW_HEIGHT_PX for z in (zoom, zoom + 1)]
+    assert fits == [True, False]
+    assert MapDetail.fit_view([(36.0, -120.0)])[2] == Config.MAP_MAX_ZOOM
@@ -0,0 +1,124 @@
+import heapq
+import math
+
+import numpy as np
+import pytest
+
+from engine import DataProcessor, DistanceEngine, Polyline, ZoneSet
+from engine.roads import RoadGraph, parse_maxspeed
+
+OSM_EXTRACT = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="34.00" lon="-118.00"/>
+  <node id="2" lat="34.01" lon="-118.00"/>
+  <node id="3" lat="34.02" lon="-118.00"><tag k="highway" v="traffic_signals"/></node>
+  <node id="4" lat="34.02" lon="-118.01"/>
+  <node id="5" lat="35.00" lon="-119.00"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="residential"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><nd ref="99"/><tag k="highway" v="motorway"/><tag k="maxspeed" v="65 mph"/></way>
+  <way id="12"><nd ref="4"/><nd ref="1"/><tag k="highway" v="primary"/><tag k="oneway" v="-1"/></way>
+  <way id="13"><nd ref="1"/><nd ref="5"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+
+def dijkstra(graph, source, target, cost):
+    """Reference least cost from source to target"""
+    best = {source: 0.0}
+    frontier = [(0.0, source)]
+    while frontier:
+        so_far, node = heapq.heappop(frontier)
+        if node == target:
+            return so_far
+        if so_far > best[node]:
+            continue
+        for edge in range(graph.indptr[node], graph.indptr[node + 1]):
+            candidate = so_far + cost[edge]
+            if candidate < best.get(graph.indices[edge], math.inf):
+                best[graph.indices[edge]] = candidate
+                heapq.heappush(frontier, (candidate, graph.indices[edge]))
+    return math.inf
+
+
+@pytest.fixture(scope="module")
+def grid():
+    return RoadGraph.grid(36.0, -120.0, 30, 40, spacing_km=2.0)
+
+
+def path_cost(graph, path, cost):
+    return float(np.sum(cost[graph.path_edges(path)]))
+
+
+def test_grid_fixture_shape(grid):
+    assert grid.num_nodes == 30 * 40
+    assert grid.num_edges == 2 * (30 * 39 + 29 * 40)
+    assert np.allclose(grid.length_km, 2.0, rtol=0.01)
+
+
+def test_a_star_matches_dijkstra(grid):
+    rng = np.random.default_rng(0)
+    cost = grid.travel_minutes().astype(np.float64) * rng.uniform(1.0, 3.0, grid.num_edges)
+    for source, target in rng.integers(0, grid.num_nodes, (10, 2)):
+        path, total = grid.shortest_path(int(source), int(target), cost)
+        assert path[0] == source and path[-1] == target
+        assert total == pytest.approx(path_cost(grid, path, cost))
+        assert total == pytest.approx(dijkstra(grid, int(source), int(target), cost))
+
+
+def test_a_star_free_flow_is_manhattan_on_the_grid(grid):
+    path, total = grid.shortest_path(0, grid.num_nodes - 1)
+    assert len(path) == 30 + 40 - 1
+    assert total == pytest.approx(float(np.sum(grid.travel_minutes()[grid.path_edges(path)])))
+
+
+def test_unreachable_target():
+    graph = RoadGraph.from_edges([36.0, 36.1, 36.2], [-120.0, -120.0, -120.0], [0], [1])
+    assert graph.shortest_path(0, 2) == ([], math.inf)
+
+
+def test_detour_avoids_a_hazard_zone(grid):
+    start, end = (grid.lat[15 * 40], grid.lon[15 * 40]), (grid.lat[15 * 40 + 39], grid.lon[15 * 40 + 39])
+    middle = (grid.lat[15 * 40 + 20], grid.lon[15 * 40 + 20])
+    fire = DataProcessor.apply_intensity_factor(ZoneSet("Fire Zone", [middle[0]], [middle[1]], [1.0], [12000.0]),
+                                                1.0)
+    empty = ZoneSet("Zone", [], [], [], [])
+    hazard_index = DataProcessor.build_hazard_index(empty, fire, empty)
+
+    straight, _ = grid.shortest_path(grid.nearest_node(*start), grid.nearest_node(*end))
+    route = DataProcessor.hazard_avoiding_route(grid, *start, *end, empty, fire, empty, hazard_index)
+    # Edges are penalised by the zones their midpoints lie in
+    def closest_midpoint_km(points):
+        midpoints = (points[:-1] + points[1:]) / 2
+        return DistanceEngine.haversine(*middle, midpoints[:, 0], midpoints[:, 1]).min()
+    assert closest_midpoint_km(np.column_stack((grid.lat[straight], grid.lon[straight]))) < 12
+    assert closest_midpoint_km(Polyline.route_path(route)) >= 12
+
+
+def test_save_and_load_round_trip(grid, tmp_path):
+    grid.save(str(tmp_path / "graph.npz"))
+    loaded = RoadGraph.load(str(tmp_path / "graph.npz"))
+    for name in ("lat", "lon", "indptr", "indices", "length_km", "speed_kmh"):
+        assert np.array_equal(getattr(loaded, name), getattr(grid, name))
+
+
+def test_parse_maxspeed():
+    assert parse_maxspeed("50") == 50
+    assert parse_maxspeed("65 mph") == pytest.approx(104.607, abs=1e-3)
+    assert parse_maxspeed("none") is None
+    assert parse_maxspeed(None) is None
+
+
+def test_from_osm(tmp_path):
+    path = tmp_path / "extract.osm"
+    path.write_text(OSM_EXTRACT)
+    graph = RoadGraph.from_osm(str(path))
+
+    # The footway and its far node are dropped; the segment to the clipped node 99 too
+    assert graph.num_nodes == 4
+    edges = {(int(u), int(v)): float(speed)
+             for u, v, speed in zip(graph.edge_sources(), graph.indices, graph.speed_kmh)}
+    # Residential two-way, motorway one-way at its maxspeed, primary against its way order
+    assert edges == {(0, 1): 40, (1, 0): 40, (1, 2): 40, (2, 1): 40,
+                     (2, 3): pytest.approx(104.607, abs=1e-3), (0, 3): 80}
+    assert graph.shortest_path(0, 3)[0] == [0, 3]
+    assert graph.shortest_path(3, 0) == ([], math.inf)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from benchmarks.scenarios import Scenario
+from engine import Config, DataProcessor, DistanceEngine, HazardScoreCache, Polyline, ZoneSet
+
+# DistanceEngine is within ~0.5% of the WGS-84 geodesic; route risk built
+# from those distances must stay within twice that of a geodesic reference
+RISK_TOLERANCE = 0.01
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+
+def geodesic_km(lat1, lon1, lat2, lon2, iterations=50):
+    """Element-wise Vincenty inverse distance on the WGS-84 ellipsoid (km), the reference geopy used"""
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.radians(np.asarray(v, dtype=np.float64))
+                                                   for v in (lat1, lon1, lat2, lon2)))
+    f = WGS84_F
+    u1, u2 = np.arctan((1 - f) * np.tan(lat1)), np.arctan((1 - f) * np.tan(lat2))
+    sin_u1, cos_u1, sin_u2, cos_u2 = np.sin(u1), np.cos(u1), np.sin(u2), np.cos(u2)
+    lon_diff = lam = lon2 - lon1
+    for _ in range(iterations):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_u1 * cos_u2 * sin_lam / np.where(sin_sigma == 0, 1.0, sin_sigma)
+        cos2_alpha = 1 - sin_alpha ** 2
+        cos_2sm = np.where(cos2_alpha == 0, 0.0,
+                           cos_sigma - 2 * sin_u1 * sin_u2 / np.where(cos2_alpha == 0, 1.0, cos2_alpha))
+        c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        lam = lon_diff + (1 - c) * f * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sm + c * cos_sigma * (-1 + 2 * cos_2sm ** 2)))
+    u_sq = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    k1 = (np.sqrt(1 + u_sq) - 1) / (np.sqrt(1 + u_sq) + 1)
+    a = (1 + k1 ** 2 / 4) / (1 - k1)
+    b = k1 * (1 - 3 * k1 ** 2 / 8)
+    delta_sigma = b * sin_sigma * (cos_2sm + b / 4 * (cos_sigma * (-1 + 2 * cos_2sm ** 2) -
+                                   b / 6 * cos_2sm * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sm ** 2)))
+    return WGS84_B * a * (sigma - delta_sigma) / 1000
+
+
+def geodesic_route_risk(routes, zones, factors, spacing_km=0.1):
+    """Route risk from the exposure rule, measured on densely sampled routes with geodesic distances"""
+    risks = np.zeros(len(routes))
+    for r, route in enumerate(routes):
+        path = Polyline.densify(Polyline.route_path(route), spacing_km)
+        segment_km = geodesic_km(path[:-1, 0], path[:-1, 1], path[1:, 0], path[1:, 1])
+        middle = (path[:-1] + path[1:]) / 2
+        for kind, zone_set, factor in zip(("snow", "fire", "rain"), zones, factors):
+            buffer_km, weight = Config.ROUTE_HAZARD_RULES[kind]
+            scaled = DataProcessor.apply_intensity_factor(ZoneSet.coerce(zone_set), factor)
+            for lat, lon, intensity, radius_m in zip(scaled.lat, scaled.lon, scaled.effective_intensity,
+                                                     scaled.effective_radius):
+                radius_km = radius_m / 1000
+                near = DistanceEngine.haversine(lat, lon, path[:, 0], path[:, 1]) < radius_km + buffer_km + 1
+                if not near.any():
+                    continue
+                exposed_km = segment_km[geodesic_km(lat, lon, middle[:, 0], middle[:, 1]) < radius_km].sum()
+                clearance = max(geodesic_km(lat, lon, path[near, 0], path[near, 1]).min() - radius_km, 0.0)
+                risks[r] += weight * factor * intensity * (exposed_km + max(0.0, 1 - clearance / buffer_km))
+    return risks
+
+
+def test_geodesic_reference():
+    # Vincenty's published Flinders Peak - Buninyong example: 54972.271 m
+    assert geodesic_km(-(37 + 57 / 60 + 3.72030 / 3600), 144 + 25 / 60 + 29.52440 / 3600,
+                       -(37 + 39 / 60 + 10.15610 / 3600), 143 + 55 / 60 + 35.38390 / 3600) == pytest.approx(
+        54.972271, abs=1e-5)
+
+
+def test_haversine_within_documented_tolerance():
+    rng = np.random.default_rng(0)
+    lat1, lat2 = rng.uniform(32.5, 42.0, (2, 1000))
+    lon1, lon2 = rng.uniform(-124.4, -114.1, (2, 1000))
+    geodesic = geodesic_km(lat1, lon1, lat2, lon2)
+    assert np.all(np.abs(DistanceEngine.haversine(lat1, lon1, lat2, lon2) - geodesic) <= 0.005 * geodesic)
+
+
+@pytest.mark.parametrize("trip", ["short", "long"])
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("factors", [(0.5, 0.5, 0.5), (1.0, 0.2, 0.8)])
+def test_route_ranking_matches_geodesic_reference(trip, seed, factors):
+    s = Scenario(trip, "route", 3, seed=seed)
+    cache = HazardScoreCache(*s.zones, s.hazard_index)
+    cache.cache_routes(s.routes, max(factors))
+    risk = cache.route_risk(*factors)
+    reference = geodesic_route_risk(s.routes, s.zones, factors)
+    np.testing.assert_allclose(risk, reference, rtol=RISK_TOLERANCE, atol=0.05)
+
+    # Routes whose reference totals differ by more than the tolerance keep their order
+    minutes = np.array([route["legs"][0]["duration"]["value"] / 60 for route in s.routes])
+    total = reference + minutes
+    scaled = [DataProcessor.apply_intensity_factor(zones, factor) for zones, factor in zip(s.zones, factors)]
+    order = DataProcessor.select_best_route(s.routes, *scaled, *factors)
+    position = {route: rank for rank, route in enumerate(order)}
+    for i in range(len(total)):
+        for j in range(len(total)):
+            if total[i] < total[j] * (1 - RISK_TOLERANCE):
+                assert position[i] < position[j]
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+import requests
+
+import route_avoider
+from engine import SafetyRaster
+
+PAIRS = [
+    {"start": "Los Angeles", "end": "San Francisco"},
+    {"start": "San Jose", "end": "Santa Cruz"},
+    {"start": "Sacramento", "end": "Sacramento"},  # the stub has no route to the same place
+    {"start": "San Diego", "end": "Fresno"}
+]
+
+
+@pytest.fixture
+def service(stub_api, serve, monkeypatch):
+    """Base URL of the routing service, backed by the stub APIs"""
+    monkeypatch.setattr(route_avoider, "safety_rasters", type(route_avoider.safety_rasters)())
+    yield serve(route_avoider.app)
+    # Let background raster builds finish before their directory goes away
+    SafetyRaster.builder().submit(lambda: None).result()
+
+
+def batch(url, **body):
+    with requests.post(f"{url}/route/batch", json=body, stream=True, timeout=120) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_batch_streams_one_line_per_pair(service):
+    lines = batch(service, pairs=PAIRS, seed=3)
+
+    assert sorted(line["index"] for line in lines) == list(range(len(PAIRS)))
+    by_index = {line["index"]: line for line in lines}
+    for index, pair in enumerate(PAIRS):
+        assert (by_index[index]["start"], by_index[index]["end"]) == (pair["start"], pair["end"])
+    assert "ZERO_RESULTS" in by_index[2]["error"]
+
+    for index in (0, 1, 3):
+        result = by_index[index]
+        assert "error" not in result
+        assert len(result["routes"]) == 3
+        assert result["recommended_route"] == result["routes"][0]["index"]
+        totals = [route["total_score"] for route in result["routes"]]
+        assert totals == sorted(totals)
+        assert 0 <= result["risk"]["overall_risk"] <= 100
+        assert result["safe_exits"]
+
+
+def test_batch_matches_single_route_scoring(service):
+    lines = batch(service, pairs=PAIRS[:2], seed=3, snow_factor=0.9, fire_factor=0.1)
+    for line in lines:
+        pair = PAIRS[line["index"]]
+        single = requests.get(f"{service}/route", params=dict(pair, seed=3, snow_factor=0.9, fire_factor=0.1),
+                              timeout=60).json()
+        assert line["recommended_route"] == single["recommended_route"]
+        assert [route["risk_score"] for route in line["routes"]] == pytest.approx(
+            [route["risk_score"] for route in single["routes"]])
+
+
+def test_factors_outside_the_slider_range_are_rejected(service):
+    response = requests.post(f"{service}/route/batch", json={"pairs": PAIRS[:1], "snow_factor": 1.5}, timeout=10)
+    assert response.status_code == 422
+    response = requests.get(f"{service}/route", params={"start": "a", "end": "b", "fire_factor": -0.1}, timeout=10)
+    assert response.status_code == 422
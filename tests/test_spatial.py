@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from engine import DistanceEngine, HazardIndex, ZoneSet
+
+
+def random_zones(rng, n, lat_range, lon_range):
+    return ZoneSet("Fire Zone", rng.uniform(*lat_range, n), rng.uniform(*lon_range, n),
+                   rng.uniform(0.1, 1.0, n), rng.uniform(1000, 20000, n))
+
+
+def brute_force_pairs(lats, lons, zones, radius_km):
+    dist = DistanceEngine.haversine_matrix(lats, lons, zones.lat, zones.lon)
+    return {(int(point), int(zone)) for point, zone in zip(*np.nonzero(dist < radius_km))}, dist
+
+
+# Mid-latitudes, far north where longitude cells narrow, and across the antimeridian
+@pytest.mark.parametrize("lat_range, lon_range", [((34.0, 40.0), (-124.0, -116.0)),
+                                                  ((70.0, 78.0), (-30.0, 30.0)),
+                                                  ((-20.0, -10.0), (176.0, 184.0))])
+@pytest.mark.parametrize("radius_km", [5.0, 60.0, 400.0])
+def test_radius_queries_match_brute_force(lat_range, lon_range, radius_km):
+    rng = np.random.default_rng(0)
+    zones = random_zones(rng, 400, lat_range, lon_range)
+    index = HazardIndex(zones)
+    lats, lons = rng.uniform(*lat_range, 200), rng.uniform(*lon_range, 200)
+
+    point_idx, zone_idx, dist = index.query_radius_many(lats, lons, radius_km)
+    expected, matrix = brute_force_pairs(lats, lons, zones, radius_km)
+    pairs = set(zip(point_idx.tolist(), zone_idx.tolist()))
+    assert len(pairs) == len(point_idx) and pairs == expected
+    np.testing.assert_allclose(dist, matrix[point_idx, zone_idx])
+
+    weights = zones.intensity.astype(np.float64)
+    expected_sums = (matrix < radius_km) @ weights
+    np.testing.assert_allclose(index.sum_within(lats, lons, radius_km, weights), expected_sums)
+
+    zone_idx, dist = index.query_radius(lats[0], lons[0], radius_km)
+    assert sorted(zone_idx.tolist()) == sorted(zone for point, zone in expected if point == 0)
+
+
+def test_dense_sums_match_brute_force():
+    rng = np.random.default_rng(1)
+    zones = random_zones(rng, 1000, (34.0, 40.0), (-124.0, -116.0))
+    index = HazardIndex(zones)
+    # Points packed around one place, as the exit candidates are
+    lats, lons = rng.uniform(36.5, 37.5, 300), rng.uniform(-120.5, -119.5, 300)
+    weights = zones.intensity.astype(np.float64)
+    for radius_km in (5.0, 30.0):
+        _, matrix = brute_force_pairs(lats, lons, zones, radius_km)
+        np.testing.assert_allclose(index.sum_within_dense(lats, lons, radius_km, weights),
+                                   (matrix < radius_km) @ weights)
+        np.testing.assert_allclose(index.sum_within_dense(lats, lons, radius_km, weights),
+                                   index.sum_within(lats, lons, radius_km, weights))
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(2)
+    zones = random_zones(rng, 50, (34.0, 40.0), (-124.0, -116.0))
+    index = HazardIndex(zones)
+    # Near the zones and thousands of km away
+    for lat, lon in ((36.0, -120.0), (39.9, -116.1), (-33.9, 151.2), (60.0, 10.0)):
+        dist = DistanceEngine.haversine(lat, lon, zones.lat, zones.lon)
+        zone, distance = index.nearest(lat, lon)
+        assert zone == int(np.argmin(dist)) and distance == pytest.approx(dist.min())
+
+
+def test_empty_index():
+    index = HazardIndex(ZoneSet("Rain Zone", [], [], [], []))
+    assert len(index) == 0
+    point_idx, zone_idx, dist = index.query_radius_many([36.0, 37.0], [-120.0, -119.0], 50)
+    assert len(point_idx) == len(zone_idx) == len(dist) == 0
+    assert index.sum_within([36.0, 37.0], [-120.0, -119.0], 50, []).tolist() == [0.0, 0.0]
+    assert index.sum_within_dense([36.0], [-120.0], 50, []).tolist() == [0.0]
+    assert index.nearest(36.0, -120.0) == (None, float("inf"))
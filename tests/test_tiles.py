@@ -0,0 +1,215 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from engine import Config, DataProcessor, DistanceEngine, SafetyRaster, ZoneSet
+from engine.tiles import CURRENT, LOCK
+
+# About 111 x 108 km: 14 x 14 tiles of 8 x 8 one-km cells
+BBOX = (36.0, -120.0, 37.0, -118.8)
+KINDS = ("snow", "fire", "rain")
+FACTORS = (0.3, 0.9, 0.6)
+
+
+def open_raster(directory, bbox=BBOX):
+    return SafetyRaster(bbox, directory=str(directory), cell_km=1, tile_cells=8, levels=2)
+
+
+def zone_set(kind, lat, lon, intensity, radius_m):
+    return ZoneSet(f"{kind.title()} Zone", lat, lon, intensity, radius_m)
+
+
+def random_zones(seed, n=12):
+    rng = np.random.default_rng(seed)
+    return [zone_set(kind, rng.uniform(36.1, 36.9, n), rng.uniform(-119.9, -118.9, n),
+                     rng.uniform(0.2, 1.0, n), rng.uniform(2000, 9000, n)) for kind in KINDS]
+
+
+def empty(kind):
+    return zone_set(kind, [], [], [], [])
+
+
+def direct_exit_impacts(lat, lon, zones, factors):
+    """Impacts at points as suggest_safe_exits adds them up, by brute force"""
+    impacts = np.zeros((len(lat), 3))
+    for column, (kind, base, factor) in enumerate(zip(KINDS, zones, factors)):
+        threshold_km, weight = Config.EXIT_HAZARD_RULES[kind]
+        dist = DistanceEngine.haversine_matrix(lat, lon, base.lat, base.lon)
+        impacts[:, column] = weight * factor * ((dist < threshold_km) @ (base.intensity * np.float32(factor)))
+    return impacts
+
+
+def node_points(raster):
+    rows, cols = np.meshgrid(np.arange(raster.shape[0]), np.arange(raster.shape[1]), indexing="ij")
+    return raster.south + rows.ravel() * raster.dlat, raster.west + cols.ravel() * raster.dlon
+
+
+def test_region_snaps_out_to_the_grid():
+    assert SafetyRaster.region((33.7, -121.0, 38.1, -117.5), 2.0) == (32.0, -122.0, 40.0, -116.0)
+    # Trips within the same cells share a region
+    assert SafetyRaster.region((36.2, -119.9, 36.9, -119.1), 2.0) == (36.0, -120.0, 38.0, -118.0)
+    assert SafetyRaster.region((36.0, -120.0, 37.5, -118.5), 2.0) == (36.0, -120.0, 38.0, -118.0)
+
+
+def test_node_lookups_match_the_direct_computation(tmp_path):
+    zones = random_zones(0)
+    raster = open_raster(tmp_path)
+    raster.update(*zones)
+
+    lat, lon = node_points(raster)
+    np.testing.assert_allclose(raster.exit_impacts(lat, lon, *FACTORS),
+                               direct_exit_impacts(lat, lon, zones, FACTORS), rtol=1e-5, atol=1e-4)
+
+    # Inside sums at each stored factor: zones whose scaled circle contains the node
+    for step, factor in enumerate(SafetyRaster.INSIDE_FACTORS):
+        stored = raster.sample(SafetyRaster.INSIDE + 3 * step + np.arange(3), lat, lon)
+        for column, base in enumerate(zones):
+            dist = DistanceEngine.haversine_matrix(lat, lon, base.lat, base.lon)
+            radius_km = base.radius * DataProcessor.radius_factor(factor) / 1000
+            np.testing.assert_allclose(stored[column], (dist < radius_km) @ base.intensity, rtol=1e-5, atol=1e-5)
+
+
+def test_lookups_between_nodes_stay_within_the_documented_bound(tmp_path):
+    zones = random_zones(1)
+    raster = open_raster(tmp_path)
+    raster.update(*zones)
+
+    rng = np.random.default_rng(2)
+    lat, lon = rng.uniform(36.05, 36.95, 2000), rng.uniform(-119.95, -118.85, 2000)
+    error = np.abs(raster.exit_impacts(lat, lon, *FACTORS) - direct_exit_impacts(lat, lon, zones, FACTORS))
+
+    # Zones within a cell diagonal of their threshold may count partly
+    diagonal_km = np.hypot(raster.cell_km, raster.cell_km * 1.01)
+    for column, (kind, base, factor) in enumerate(zip(KINDS, zones, FACTORS)):
+        threshold_km, weight = Config.EXIT_HAZARD_RULES[kind]
+        dist = DistanceEngine.haversine_matrix(lat, lon, base.lat, base.lon)
+        edge = np.abs(dist - threshold_km) <= diagonal_km
+        bound = weight * factor ** 2 * (edge @ base.intensity)
+        assert np.all(error[:, column] <= bound + 1e-4)
+        # Away from every threshold edge the lookup is exact
+        assert np.all(error[~edge.any(axis=1), column] < 1e-4)
+
+
+def test_a_point_just_outside_the_threshold_picks_up_part_of_a_zone(tmp_path):
+    raster = open_raster(tmp_path)
+    rain = zone_set("rain", [36.5], [-119.4], [1.0], [3000])
+    raster.update(empty("snow"), empty("fire"), rain)
+
+    threshold_km, weight = Config.EXIT_HAZARD_RULES["rain"]
+    lat, lon = DistanceEngine.destination(36.5, -119.4, 90, threshold_km + 0.2)
+    assert direct_exit_impacts([lat], [lon], [empty("snow"), empty("fire"), rain], FACTORS)[0, 2] == 0
+    impact = raster.exit_impacts(lat, lon, *FACTORS)[0, 2]
+    assert 0 < impact <= weight * FACTORS[2] ** 2
+
+
+def test_partial_rebuild_leaves_other_tiles_alone(tmp_path, monkeypatch):
+    raster = open_raster(tmp_path)
+    # Rain reaches 15 km: a zone in each corner, about 80 km apart
+    corner = zone_set("rain", [36.1, 36.9], [-119.9, -118.9], [0.8, 0.6], [4000, 4000])
+    raster.update(empty("snow"), empty("fire"), corner)
+    before = [np.array(level) for level in raster.levels]
+
+    rebuilt = []
+    tile_values = raster._tile_values
+    monkeypatch.setattr(raster, "_tile_values", lambda rows, cols, *args: rebuilt.append((rows[0], cols[0])) or
+                        tile_values(rows, cols, *args))
+    moved = zone_set("rain", [36.1, 36.88], [-119.9, -118.92], [0.8, 0.6], [4000, 4000])
+    count = raster.update(empty("snow"), empty("fire"), moved)
+
+    # Only tiles within reach of the north-east zone, old or new, were rebuilt
+    assert count == len(rebuilt) and 0 < count < raster.tile_rows * raster.tile_cols / 4
+    rebuilt_mask = np.zeros(raster.shape, dtype=bool)
+    for row, col in rebuilt:
+        rebuilt_mask[row:row + raster.tile_cells, col:col + raster.tile_cells] = True
+        node_lat, node_lon = raster.south + row * raster.dlat, raster.west + col * raster.dlon
+        assert DistanceEngine.haversine(node_lat, node_lon, 36.89, -118.91) < 15 + 2 * raster.tile_cells
+    assert np.array_equal(raster.levels[0][:, ~rebuilt_mask], before[0][:, ~rebuilt_mask])
+    assert not np.array_equal(raster.levels[0], before[0])
+
+    # The result is what a build from scratch gives, on every level
+    fresh = open_raster(tmp_path / "fresh")
+    fresh.update(empty("snow"), empty("fire"), moved)
+    for level, fresh_level in zip(raster.levels, fresh.levels):
+        np.testing.assert_allclose(level, fresh_level, atol=1e-6)
+
+    # Unchanged zones rebuild nothing and publish no new version
+    version = raster.version
+    assert raster.update(empty("snow"), empty("fire"), moved) == 0
+    assert raster.version == version
+
+
+def test_a_failed_build_leaves_the_published_version(tmp_path, monkeypatch):
+    raster = open_raster(tmp_path)
+    raster.update(*random_zones(3))
+    published = np.array(raster.levels[0])
+
+    def crash(*args):
+        raise RuntimeError("killed mid-build")
+    monkeypatch.setattr(raster, "_tile_values", crash)
+    with pytest.raises(RuntimeError):
+        raster.update(*random_zones(4))
+
+    with open(tmp_path / CURRENT) as f:
+        assert f.read() == "v000001"
+    reopened = open_raster(tmp_path)
+    assert reopened.version == 1
+    assert np.array_equal(np.asarray(reopened.levels[0]), published)
+
+    # The next build starts over and removes the leftover staging directory
+    monkeypatch.undo()
+    assert reopened.update(*random_zones(4)) > 0
+    assert sorted(os.listdir(tmp_path)) == sorted([LOCK, CURRENT, "v000002"])
+
+
+def test_readers_see_whole_versions_while_updates_publish(tmp_path):
+    def rain(intensity):
+        return zone_set("rain", [36.5], [-119.4], [intensity], [3000])
+
+    writer = open_raster(tmp_path)
+    writer.update(empty("snow"), empty("fire"), rain(0.1))
+    first = open_raster(tmp_path)
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                reader = open_raster(tmp_path)
+                # The levels always hold the zones the version was built from
+                expected = reader.zones["rain"][0, 2]
+                value = reader.sample([SafetyRaster.EXIT + 2], 36.5, -119.4)[0, 0]
+                assert value == pytest.approx(expected, rel=1e-6), (reader.version, value, expected)
+            except Exception as e:  # reported below
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    for step in range(2, 12):
+        writer.update(empty("snow"), empty("fire"), rain(step / 10))
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert writer.version == 11
+    # A raster keeps reading the version it mapped
+    assert first.version == 1
+    assert first.sample([SafetyRaster.EXIT + 2], 36.5, -119.4)[0, 0] == pytest.approx(0.1)
+
+
+def test_lock_file_fallback_without_fcntl(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    raster = open_raster(tmp_path / "region")
+    assert raster.update(*random_zones(5)) > 0
+    # The lock file only exists while held
+    assert LOCK not in os.listdir(tmp_path / "region")
+
+    release = SafetyRaster._lock(str(tmp_path / "region"))
+    assert SafetyRaster._lock(str(tmp_path / "region"), blocking=False) is None
+    assert SafetyRaster.prune(str(tmp_path), keep=0) == []
+    release()
+    assert SafetyRaster.prune(str(tmp_path), keep=0) == [str(tmp_path / "region")]
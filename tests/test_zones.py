@@ -0,0 +1,110 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+import engine.zones
+from engine import DataProcessor, HazardIndex, ZoneSet
+
+RECORDS = [
+    {"lat": 36.1, "lon": -119.5, "intensity": 0.8, "radius": 12000.0, "name": "Fire Zone 1"},
+    {"lat": 36.4, "lon": -119.2, "intensity": 0.3, "radius": 5000.0, "name": "Fire Zone 2"},
+    {"lat": 37.0, "lon": -120.1, "intensity": 0.55, "radius": 20000.0, "name": "Fire Zone 3"}
+]
+
+
+def test_columns_are_contiguous_typed_arrays():
+    zones = ZoneSet.from_records(RECORDS)
+    assert zones.label == "Fire Zone" and len(zones) == 3
+    for name, dtype in (("lat", np.float64), ("lon", np.float64), ("intensity", np.float32), ("radius", np.float32)):
+        column = getattr(zones, name)
+        assert column.dtype == dtype and column.flags.c_contiguous
+        assert column.tolist() == pytest.approx([record[name] for record in RECORDS])
+    assert zones.names == ["Fire Zone 1", "Fire Zone 2", "Fire Zone 3"]
+
+
+def test_records_round_trip():
+    zones = ZoneSet.from_records(RECORDS)
+    for record, expected in zip(zones, RECORDS):
+        assert record["name"] == expected["name"]
+        assert [record[key] for key in ("lat", "lon", "intensity", "radius")] == pytest.approx(
+            [expected[key] for key in ("lat", "lon", "intensity", "radius")])
+    assert ZoneSet.from_records(list(zones)).intensity.tolist() == zones.intensity.tolist()
+
+
+def test_apply_intensity_factor_scales_from_the_base_values():
+    zones = ZoneSet.from_records(RECORDS)
+    assert zones.effective_intensity is zones.intensity and zones.effective_radius is zones.radius
+
+    adjusted = DataProcessor.apply_intensity_factor(zones, 0.5)
+    # The ZoneSet itself carries the adjusted columns; the base ones are kept
+    assert adjusted is zones
+    np.testing.assert_allclose(zones.effective_intensity, zones.intensity * 0.5)
+    np.testing.assert_allclose(zones.effective_radius, zones.radius * 0.75)
+    assert zones.intensity.tolist() == pytest.approx([record["intensity"] for record in RECORDS])
+
+    # A new factor replaces the previous one instead of compounding it
+    DataProcessor.apply_intensity_factor(zones, 1.0)
+    np.testing.assert_allclose(zones.effective_intensity, zones.intensity)
+    np.testing.assert_allclose(zones.effective_radius, zones.radius)
+
+    # Adjusted values survive the dict records
+    DataProcessor.apply_intensity_factor(zones, 0.2)
+    again = ZoneSet.from_records(list(zones))
+    np.testing.assert_allclose(again.effective_intensity, zones.effective_intensity)
+    np.testing.assert_allclose(again.effective_radius, zones.effective_radius)
+
+
+def test_dict_records_are_converted():
+    zones = DataProcessor.apply_intensity_factor(RECORDS, 0.5)
+    assert isinstance(zones, ZoneSet) and zones.label == "Fire Zone"
+    assert ZoneSet.coerce([], "Snow Zone").label == "Snow Zone" and len(ZoneSet.coerce(None)) == 0
+
+
+def test_zone_sets_from_an_earlier_rerun_are_used_as_they_are():
+    # Streamlit re-executes the module, so a ZoneSet kept in session state
+    # is an instance of an older copy of the class
+    spec = importlib.util.spec_from_file_location("rerun_zones", engine.zones.__file__)
+    rerun = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(rerun)
+    old = rerun.ZoneSet.from_records(RECORDS)
+    assert not isinstance(old, ZoneSet)
+
+    assert ZoneSet.coerce(old) is old
+    adjusted = DataProcessor.apply_intensity_factor(old, 0.5)
+    assert adjusted is old
+    np.testing.assert_allclose(old.effective_intensity, old.intensity * 0.5)
+    index = HazardIndex(old)
+    assert len(index) == 3
+    assert sorted(index.query_radius(36.1, -119.5, 1.0)[0].tolist()) == [0]
+
+
+def assert_same_zones(a, b):
+    assert a.label == b.label
+    for name in ("lat", "lon", "intensity", "radius"):
+        assert np.array_equal(getattr(a, name), getattr(b, name))
+
+
+def test_the_same_seed_gives_the_same_zones():
+    bbox = (34.0, -120.0, 38.0, -116.0)
+    assert_same_zones(DataProcessor.generate_hazard_field(bbox, "fire", seed=7),
+                      DataProcessor.generate_hazard_field(bbox, "fire", seed=7))
+    endpoints = (34.05, -118.24, 37.77, -122.42)
+    for a, b in zip(DataProcessor.generate_zone_fields(*endpoints, seed=7),
+                    DataProcessor.generate_zone_fields(*endpoints, seed=7)):
+        assert len(a) > 0
+        assert_same_zones(a, b)
+
+
+def test_different_seeds_give_different_zones():
+    bbox = (34.0, -120.0, 38.0, -116.0)
+    a = DataProcessor.generate_hazard_field(bbox, "fire", seed=7)
+    b = DataProcessor.generate_hazard_field(bbox, "fire", seed=8)
+    assert len(a) != len(b) or not np.array_equal(a.lat, b.lat)
+
+    endpoints = (34.05, -118.24, 37.77, -122.42)
+    snow, fire, rain = DataProcessor.generate_zone_fields(*endpoints, seed=7)
+    for a, b in zip((snow, fire, rain), DataProcessor.generate_zone_fields(*endpoints, seed=8)):
+        assert len(a) != len(b) or not np.array_equal(a.lat, b.lat)
+    # The three hazards draw from independent streams of the seed
+    assert not np.array_equal(snow.lat[:5], fire.lat[:5])